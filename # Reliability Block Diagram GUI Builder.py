@@ -1,14 +1,22 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import networkx as nx
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from itertools import combinations
+import copy
+import multiprocessing as mp
 import numpy as np
 import math
+import queue
 import random
 from datetime import datetime
 
+from rbd_analysis import (CCF_GROUP_LIMIT, LIFETIME_KINDS, AnalysisProfile, CompactGraph,
+                          generate_reliability_expression, serve_jobs, top_cut_sets, validate_ccf, validate_lifetime,
+                          validate_voting)
+from rbd_io import import_edge_list, read_any, save_project, write_report
+from rbd_layout import LayoutCache, draw_diagram
+
+
 class ReliabilityBlockDiagramApp:
     """
     Reliability Block Diagram GUI Builder
@@ -19,6 +27,8 @@ class ReliabilityBlockDiagramApp:
     ---------
     * Interactive diagram building with nodes and components
     * Component management with failure probability assignment
+    * k-out-of-n voting blocks of identical redundant components
+    * Beta-factor common-cause failure groups
     * Visualization of the reliability block diagram
     * System reliability analysis using minimal cut sets approach
     * Detailed results showing:
@@ -26,29 +36,83 @@ class ReliabilityBlockDiagramApp:
         - Minimal cut sets identification 
         - System reliability calculation
         - Reliability expression generation based on cut sets
+    * Results of any size: the panel shows the most probable cut sets, the full
+      list is paged in a browser window or exported to a text report
     Implementation Details:
     ----------------------
     The application uses the following approach for reliability calculation:
-    1. Identifies all possible paths from source to sink through graph travesrasal algorithms
+    1. Collapses series chains and parallel branches into equivalent blocks, then identifies
+       all possible paths from source to sink through graph travesrasal algorithms
     2. Determines minimal cut sets (sets of components whose failure causes system failure)
-    3. Applies inclusion-exclusion principle to calculate system reliability
+    3. Builds a binary decision diagram of the cut sets to calculate system reliability exactly
+       (inclusion-exclusion is kept as a cross-check for small systems)
     4. Presents detailed analysis results and visualization
+    The analysis itself lives in rbd_analysis, which has no GUI dependencies; this class
+    only collects the diagram and shows progress and results. Analyses run in a worker
+    process whose events are polled with root.after, so they can be cancelled.
     Parameters:
     ----------
     root : tk.Tk
             The root Tkinter window to which this application will be attached.
     Attributes:
     ----------
-    G : networkx.DiGraph
+    G : CompactGraph
             The directed graph representing the system model
     components : dict
             Dictionary mapping component names to their failure probabilities
     results_text : tk.Text
             Text widget displaying analysis results
+    worker : dict or None
+            The worker process that runs analyses and keeps the analysis cache,
+            with its task and event queues
+    diagram_version : int
+            Number of edits made to the diagram, to tell whether a finished job still matches it
+    job : dict or None
+            The running analysis: its result callback and the diagram version it started from
     fig, ax, canvas : matplotlib components
             Used for visualization of the reliability block diagram
     Note: The application assumes a directed system with a single source and sink node.
     """
+    # Number of success paths written out in full to the results panel
+    PATH_DISPLAY_LIMIT = 1000
+    
+    # Rows of the cut set, importance and expression listings in the results panel (the most probable or important first)
+    RESULTS_TOP_N = 100
+    
+    # Cut sets per page of the cut set browser
+    CUT_SET_PAGE_SIZE = 500
+    
+    # Cut sets listed per order while an analysis is still running
+    ORDER_PREVIEW_LIMIT = 20
+    
+    # How often the window checks a running analysis for new events (ms), and how many it handles per check
+    JOB_POLL_MS = 100
+    JOB_EVENTS_PER_POLL = 50
+    
+    # Edits within this many ms of each other are drawn together
+    REDRAW_DELAY_MS = 150
+    
+    # Layout choices above the diagram and the LayoutCache kind each one maps to
+    LAYOUT_CHOICES = {
+        "Layered (source → sink)": 'layered',
+        "Spring": 'spring',
+    }
+    
+    # Lifetime choices in the component panel and the lifetime kind each one maps to
+    LIFETIME_CHOICES = {
+        "Fixed probability": 'fixed',
+        "Exponential (rate)": 'exponential',
+        "Weibull (shape, scale)": 'weibull',
+        "Repairable (MTTF, MTTR)": 'repairable',
+    }
+    
+    # Cut set strategy choices in the analysis panel and the cut_strategy each one maps to
+    CUT_STRATEGY_CHOICES = {
+        "Automatic": 'auto',
+        "From paths": 'paths',
+        "Max-flow search": 'flow',
+    }
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Reliability Block Diagram Builder")
@@ -64,13 +128,35 @@ class ReliabilityBlockDiagramApp:
         ttk.Label(header_frame, text=f"Current Date/Time (UTC): {current_datetime}").pack(side=tk.LEFT)
         ttk.Label(header_frame, text=f"User: {current_user}").pack(side=tk.RIGHT)
         
-        # Initialize the graph
-        self.G = nx.DiGraph()
+        # Initialize the graph (interned and array-backed; exported to networkx only for drawing)
+        self.G = CompactGraph()
         self.G.add_node('source')
         self.G.add_node('sink')
         
         # Component data
         self.components = {}  # name: failure_prob
+        self.lifetimes = {}  # name: lifetime spec, for components with a lifetime distribution
+        self.voting = {}  # k-out-of-n block name: {'k', 'members'}, members being entries of self.components
+        self.G.graph['voting'] = self.voting
+        self.ccf = {}  # common-cause group name: {'beta', 'members'}
+        self.G.graph['ccf'] = self.ccf
+        
+        # Results of the last exact analysis, saved with the project while the diagram is unchanged
+        self.last_results = None
+        
+        # Edits made to the diagram so far; a job whose diagram has since changed has its results dropped
+        self.diagram_version = 0
+        
+        # Worker process that runs the analyses: its process, task queue and event queue. It keeps
+        # the analysis cache, so paths, cut sets and BDDs of unchanged segments are reused between runs
+        self.worker = None
+        
+        # Analysis running in the worker: its result callback and the diagram version it started from
+        self.job = None
+        
+        # Node positions are kept between redraws; redraws are debounced while editing
+        self.layout_cache = LayoutCache('layered')
+        self.redraw_pending = None
         
         # Create main frame
         main_frame = ttk.Frame(root)
@@ -80,6 +166,14 @@ class ReliabilityBlockDiagramApp:
         left_frame = ttk.LabelFrame(main_frame, text="Controls", padding=10)
         left_frame.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
         
+        # Project file section
+        file_frame = ttk.LabelFrame(left_frame, text="Project", padding=10)
+        file_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Button(file_frame, text="Open", command=self.open_system).grid(row=0, column=0, padx=2)
+        ttk.Button(file_frame, text="Save", command=self.save_system).grid(row=0, column=1, padx=2)
+        ttk.Button(file_frame, text="Import Edge List", command=self.import_edges).grid(row=0, column=2, padx=2)
+        
         # Component section
         component_frame = ttk.LabelFrame(left_frame, text="Components", padding=10)
         component_frame.pack(fill=tk.X, pady=5)
@@ -92,13 +186,26 @@ class ReliabilityBlockDiagramApp:
         self.comp_prob_var = tk.StringVar(value="0.01")
         ttk.Entry(component_frame, textvariable=self.comp_prob_var).grid(row=1, column=1, sticky=tk.W, pady=2)
         
-        ttk.Button(component_frame, text="Add Component", command=self.add_component).grid(row=2, column=0, columnspan=2, pady=5)
+        ttk.Label(component_frame, text="Lifetime:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        self.comp_lifetime_var = tk.StringVar(value="Fixed probability")
+        ttk.Combobox(component_frame, textvariable=self.comp_lifetime_var, values=list(self.LIFETIME_CHOICES),
+                     state="readonly").grid(row=2, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Label(component_frame, text="Lifetime Parameters:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        self.comp_lifetime_params_var = tk.StringVar(value="")
+        ttk.Entry(component_frame, textvariable=self.comp_lifetime_params_var).grid(row=3, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Label(component_frame, text="k out of n (blank = single):").grid(row=4, column=0, sticky=tk.W, pady=2)
+        self.comp_voting_var = tk.StringVar(value="")
+        ttk.Entry(component_frame, textvariable=self.comp_voting_var).grid(row=4, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Button(component_frame, text="Add Component", command=self.add_component).grid(row=5, column=0, columnspan=2, pady=5)
         
         # Components list
-        ttk.Label(component_frame, text="Existing Components:").grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=2)
+        ttk.Label(component_frame, text="Existing Components:").grid(row=6, column=0, columnspan=2, sticky=tk.W, pady=2)
         self.comp_listbox = tk.Listbox(component_frame, height=6, width=30)
-        self.comp_listbox.grid(row=4, column=0, columnspan=2, sticky=tk.W+tk.E, pady=2)
-        ttk.Button(component_frame, text="Remove Component", command=self.remove_component).grid(row=5, column=0, columnspan=2, pady=5)
+        self.comp_listbox.grid(row=7, column=0, columnspan=2, sticky=tk.W+tk.E, pady=2)
+        ttk.Button(component_frame, text="Remove Component", command=self.remove_component).grid(row=8, column=0, columnspan=2, pady=5)
         
         # Connection section
         connection_frame = ttk.LabelFrame(left_frame, text="Connections", padding=10)
@@ -131,17 +238,96 @@ class ReliabilityBlockDiagramApp:
         
         ttk.Button(node_frame, text="Add Node", command=self.add_node).grid(row=1, column=0, columnspan=2, pady=5)
         
+        # Common-cause failure section
+        ccf_frame = ttk.LabelFrame(left_frame, text="Common-Cause Groups", padding=10)
+        ccf_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(ccf_frame, text="Group Name:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        self.ccf_name_var = tk.StringVar()
+        ttk.Entry(ccf_frame, textvariable=self.ccf_name_var).grid(row=0, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Label(ccf_frame, text="Beta Factor:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        self.ccf_beta_var = tk.StringVar(value="0.1")
+        ttk.Entry(ccf_frame, textvariable=self.ccf_beta_var).grid(row=1, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Label(ccf_frame, text="Members (comma separated):").grid(row=2, column=0, sticky=tk.W, pady=2)
+        self.ccf_members_var = tk.StringVar()
+        ttk.Entry(ccf_frame, textvariable=self.ccf_members_var).grid(row=2, column=1, sticky=tk.W, pady=2)
+        
+        ttk.Button(ccf_frame, text="Add Group", command=self.add_ccf_group).grid(row=3, column=0, columnspan=2, pady=5)
+        self.ccf_listbox = tk.Listbox(ccf_frame, height=3)
+        self.ccf_listbox.grid(row=4, column=0, columnspan=2, sticky=tk.W+tk.E, pady=2)
+        ttk.Button(ccf_frame, text="Remove Group", command=self.remove_ccf_group).grid(row=5, column=0, columnspan=2, pady=5)
+        
         # Calculation section
         calc_frame = ttk.LabelFrame(left_frame, text="Analysis", padding=10)
         calc_frame.pack(fill=tk.X, pady=5)
         
+        ttk.Label(calc_frame, text="Max Cut Set Order (blank = all):").pack(anchor=tk.W)
+        self.max_order_var = tk.StringVar(value="")
+        ttk.Entry(calc_frame, textvariable=self.max_order_var).pack(fill=tk.X, pady=2)
+        
+        ttk.Label(calc_frame, text="Max Paths (blank = all):").pack(anchor=tk.W)
+        self.max_paths_var = tk.StringVar(value="")
+        ttk.Entry(calc_frame, textvariable=self.max_paths_var).pack(fill=tk.X, pady=2)
+        
+        ttk.Label(calc_frame, text="Path Memory Limit MB (blank = none):").pack(anchor=tk.W)
+        self.max_memory_var = tk.StringVar(value="")
+        ttk.Entry(calc_frame, textvariable=self.max_memory_var).pack(fill=tk.X, pady=2)
+        
+        ttk.Label(calc_frame, text="Cut Sets:").pack(anchor=tk.W)
+        self.cut_strategy_var = tk.StringVar(value="Automatic")
+        ttk.Combobox(calc_frame, textvariable=self.cut_strategy_var, values=list(self.CUT_STRATEGY_CHOICES),
+                     state="readonly").pack(fill=tk.X, pady=2)
+        
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(calc_frame, text="Profile analysis stages", variable=self.profile_var).pack(anchor=tk.W)
+        self.cprofile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(calc_frame, text="Include cProfile functions", variable=self.cprofile_var).pack(anchor=tk.W)
+        
         ttk.Button(calc_frame, text="Calculate Reliability", command=self.calculate_reliability).pack(fill=tk.X, pady=5)
+        ttk.Label(calc_frame, text="Bounds Rel. Tolerance:").pack(anchor=tk.W)
+        self.bounds_tol_var = tk.StringVar(value="0.01")
+        ttk.Entry(calc_frame, textvariable=self.bounds_tol_var).pack(fill=tk.X, pady=2)
+        
+        ttk.Button(calc_frame, text="Approximate (Bounds)", command=self.approximate_reliability).pack(fill=tk.X, pady=5)
+        
+        ttk.Label(calc_frame, text="Monte Carlo Target Rel. Error:").pack(anchor=tk.W)
+        self.mc_error_var = tk.StringVar(value="0.01")
+        ttk.Entry(calc_frame, textvariable=self.mc_error_var).pack(fill=tk.X, pady=2)
+        
+        ttk.Label(calc_frame, text="Monte Carlo Seed (blank = random):").pack(anchor=tk.W)
+        self.mc_seed_var = tk.StringVar(value="")
+        ttk.Entry(calc_frame, textvariable=self.mc_seed_var).pack(fill=tk.X, pady=2)
+        
+        ttk.Button(calc_frame, text="Monte Carlo Estimate", command=self.estimate_reliability_monte_carlo).pack(fill=tk.X, pady=5)
+        
+        ttk.Label(calc_frame, text="Time Horizon (blank = auto):").pack(anchor=tk.W)
+        self.horizon_var = tk.StringVar(value="")
+        ttk.Entry(calc_frame, textvariable=self.horizon_var).pack(fill=tk.X, pady=2)
+        
+        ttk.Button(calc_frame, text="Reliability Curve R(t)", command=self.plot_reliability_curve).pack(fill=tk.X, pady=5)
+        self.cancel_button = ttk.Button(calc_frame, text="Cancel Analysis", command=self.cancel_job, state="disabled")
+        self.cancel_button.pack(fill=tk.X, pady=5)
         ttk.Button(calc_frame, text="Clear System", command=self.clear_system).pack(fill=tk.X, pady=5)
         
         # Right panel for graph and results
         right_frame = ttk.LabelFrame(main_frame, text="System Diagram & Results", padding=10)
         right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
+        # Layout choice
+        view_frame = ttk.Frame(right_frame)
+        view_frame.pack(side=tk.TOP, fill=tk.X)
+        ttk.Label(view_frame, text="Layout:").pack(side=tk.LEFT)
+        self.layout_var = tk.StringVar(value="Layered (source → sink)")
+        layout_combo = ttk.Combobox(view_frame, textvariable=self.layout_var, values=list(self.LAYOUT_CHOICES),
+                                    state="readonly", width=24)
+        layout_combo.pack(side=tk.LEFT, padx=5)
+        layout_combo.bind("<<ComboboxSelected>>", lambda event: self.relayout())
+        ttk.Button(view_frame, text="Re-layout", command=self.relayout).pack(side=tk.LEFT)
+        ttk.Button(view_frame, text="Export Report", command=self.export_report).pack(side=tk.RIGHT)
+        ttk.Button(view_frame, text="Browse Cut Sets", command=self.browse_cut_sets).pack(side=tk.RIGHT, padx=5)
+        
         # Graph canvas
         self.fig = plt.Figure(figsize=(6, 4), dpi=100)
         self.ax = self.fig.add_subplot(111)
@@ -167,7 +353,7 @@ class ReliabilityBlockDiagramApp:
             messagebox.showerror("Error", "Component name cannot be empty")
             return
         
-        if name in self.components:
+        if name in self.components or name in self.voting or name in self.ccf:
             messagebox.showerror("Error", f"Component '{name}' already exists")
             return
         
@@ -179,19 +365,92 @@ class ReliabilityBlockDiagramApp:
             messagebox.showerror("Error", f"Invalid probability: {str(e)}")
             return
         
+        kind = self.LIFETIME_CHOICES[self.comp_lifetime_var.get()]
+        lifetime = None
+        if kind != 'fixed':
+            try:
+                values = self.comp_lifetime_params_var.get().replace(',', ' ').split()
+                params = LIFETIME_KINDS[kind]
+                if len(values) != len(params):
+                    raise ValueError(f"expected {len(params)} value(s): {', '.join(params)}")
+                lifetime = validate_lifetime(dict(zip(params, values), kind=kind))
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid lifetime parameters: {str(e)}")
+                return
+        
+        voting = self.comp_voting_var.get().replace(',', ' ').split()
+        if voting:
+            self.add_voting_block(name, voting, prob, lifetime)
+            return
+        
         # Add component to dictionary
         self.components[name] = prob
+        self.G.add_component(name, prob)
+        if lifetime:
+            self.lifetimes[name] = lifetime
+        self.diagram_changed()
         
         # Update GUI
-        self.comp_listbox.insert(tk.END, f"{name}: {prob:.4f}")
+        self.comp_listbox.insert(tk.END, self.component_label(name))
         self.comp_name_var.set("")
         self.comp_prob_var.set("0.01")
+        self.comp_lifetime_params_var.set("")
         self.update_combos()
         
         # Update results text instead of showing a pop-up
         self.results_text.insert(tk.END, f"Component '{name}' added with failure probability {prob:.4f}\n")
         self.results_text.see(tk.END)
     
+    def add_voting_block(self, name, voting, prob, lifetime):
+        """Add a k-out-of-n block of n identical members named name.1 ... name.n"""
+        try:
+            if len(voting) != 2:
+                raise ValueError("enter k and n, e.g. 2 3")
+            k, n = int(voting[0]), int(voting[1])
+            members = [f"{name}.{i}" for i in range(1, n + 1)]
+            taken = [member for member in members if member in self.components]
+            if taken:
+                raise ValueError(f"component '{taken[0]}' already exists")
+            spec = validate_voting(name, {'k': k, 'members': members}, dict.fromkeys(members, prob))
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid k out of n block: {str(e)}")
+            return
+        
+        for member in members:
+            self.components[member] = prob
+            self.G.add_component(member, prob)
+            if lifetime:
+                self.lifetimes[member] = lifetime
+        self.voting[name] = spec
+        self.diagram_changed()
+        
+        self.comp_listbox.insert(tk.END, self.voting_label(name))
+        for member in members:
+            self.comp_listbox.insert(tk.END, self.component_label(member))
+        self.comp_name_var.set("")
+        self.comp_prob_var.set("0.01")
+        self.comp_lifetime_params_var.set("")
+        self.comp_voting_var.set("")
+        self.update_combos()
+        
+        self.results_text.insert(tk.END, f"Voting block '{name}' added: {k} out of {n} members with failure "
+                                         f"probability {prob:.4f} each\n")
+        self.results_text.see(tk.END)
+    
+    def voting_label(self, name):
+        """Listbox text for a k-out-of-n block"""
+        spec = self.voting[name]
+        return f"{name}: {spec['k']}-of-{len(spec['members'])} [{', '.join(spec['members'])}]"
+    
+    def component_label(self, name):
+        """Listbox text for a component: its probability and any lifetime"""
+        label = f"{name}: {self.components[name]:.4f}"
+        lifetime = self.lifetimes.get(name)
+        if lifetime:
+            kind = lifetime['kind']
+            label += f" [{kind} " + ", ".join(f"{lifetime[p]:g}" for p in LIFETIME_KINDS[kind]) + "]"
+        return label
+    
     def remove_component(self):
         selected = self.comp_listbox.curselection()
         if not selected:
@@ -203,23 +462,90 @@ class ReliabilityBlockDiagramApp:
         comp_name = comp_text.split(":")[0].strip()
         
         # Check if component is used in the graph
-        component_in_use = False
-        for _, _, data in self.G.edges(data=True):
-            if data.get('component') == comp_name:
-                component_in_use = True
-                break
-        
-        if component_in_use:
+        comp_id = self.G.component_id.get(comp_name)
+        if comp_id is not None and self.G.component_uses()[comp_id]:
             messagebox.showerror("Error", f"Cannot remove component '{comp_name}' because it is used in the system")
             return
         
-        # Remove component
-        del self.components[comp_name]
-        self.comp_listbox.delete(selected[0])
+        owner = next((block for block, spec in self.voting.items() if comp_name in spec['members']), None)
+        if owner is not None:
+            messagebox.showerror("Error", f"Cannot remove component '{comp_name}' because it is a member of "
+                                          f"voting block '{owner}'; remove the block instead")
+            return
+        
+        members = self.voting[comp_name]['members'] if comp_name in self.voting else [comp_name]
+        group = next((group for group, spec in self.ccf.items() if set(members) & set(spec['members'])), None)
+        if group is not None:
+            messagebox.showerror("Error", f"Cannot remove component '{comp_name}' because it is in "
+                                          f"common-cause group '{group}'; remove the group first")
+            return
+        
+        # Remove component, or a voting block together with its members
+        removed = [comp_name]
+        if comp_name in self.voting:
+            removed += self.voting.pop(comp_name)['members']
+        else:
+            del self.components[comp_name]
+        for name in removed[1:]:
+            del self.components[name]
+        for name in removed:
+            self.lifetimes.pop(name, None)
+        self.diagram_changed()
+        for i in reversed(range(self.comp_listbox.size())):
+            if self.comp_listbox.get(i).split(":")[0].strip() in removed:
+                self.comp_listbox.delete(i)
         self.update_combos()
         
         messagebox.showinfo("Success", f"Component '{comp_name}' removed")
     
+    def add_ccf_group(self):
+        """Add a beta-factor common-cause group over existing components"""
+        name = self.ccf_name_var.get().strip()
+        members = [m.strip() for m in self.ccf_members_var.get().split(',') if m.strip()]
+        try:
+            if not name:
+                raise ValueError("group name cannot be empty")
+            if name in self.ccf or name in self.voting:
+                raise ValueError(f"'{name}' already exists")
+            spec = validate_ccf(name, {'beta': self.ccf_beta_var.get(), 'members': members}, self.components)
+            grouped = {m: group for group, other in self.ccf.items() for m in other['members']}
+            shared = [m for m in members if m in grouped]
+            if shared:
+                raise ValueError(f"component '{shared[0]}' is already in group '{grouped[shared[0]]}'")
+            if len(self.ccf) >= CCF_GROUP_LIMIT:
+                raise ValueError(f"at most {CCF_GROUP_LIMIT} groups are supported")
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid common-cause group: {str(e)}")
+            return
+        
+        self.ccf[name] = spec
+        self.diagram_changed()
+        self.ccf_listbox.insert(tk.END, self.ccf_label(name))
+        self.ccf_name_var.set("")
+        self.ccf_members_var.set("")
+        
+        self.results_text.insert(tk.END, f"Common-cause group '{name}' added: β = {spec['beta']:g} over "
+                                         f"{', '.join(spec['members'])}\n")
+        self.results_text.see(tk.END)
+    
+    def ccf_label(self, name):
+        """Listbox text for a common-cause group"""
+        spec = self.ccf[name]
+        return f"{name}: β={spec['beta']:g} [{', '.join(spec['members'])}]"
+    
+    def remove_ccf_group(self):
+        selected = self.ccf_listbox.curselection()
+        if not selected:
+            messagebox.showerror("Error", "No common-cause group selected")
+            return
+        
+        name = self.ccf_listbox.get(selected[0]).split(":")[0].strip()
+        del self.ccf[name]
+        self.diagram_changed()
+        self.ccf_listbox.delete(selected[0])
+        self.results_text.insert(tk.END, f"Common-cause group '{name}' removed\n")
+        self.results_text.see(tk.END)
+    
     def add_node(self):
         name = self.node_name_var.get().strip()
         
@@ -227,17 +553,18 @@ class ReliabilityBlockDiagramApp:
             messagebox.showerror("Error", "Node name cannot be empty")
             return
         
-        if name in self.G.nodes():
+        if self.G.has_node(name):
             messagebox.showerror("Error", f"Node '{name}' already exists")
             return
         
         # Add node to the graph
         self.G.add_node(name)
+        self.diagram_changed()
         
         # Update GUI
         self.node_name_var.set("")
         self.update_combos()
-        self.update_graph()
+        self.schedule_redraw()
         
         # Update results text instead of showing a pop-up
         self.results_text.insert(tk.END, f"Node '{name}' added to the system\n")
@@ -266,308 +593,634 @@ class ReliabilityBlockDiagramApp:
             return
         
         # Add edge to the graph
-        self.G.add_edge(from_node, to_node, 
-                        component=component, 
-                        name=component, 
-                        failure_prob=self.components[component])
+        self.G.add_edge(from_node, to_node, component)
+        self.diagram_changed()
         
-        self.update_graph()
+        self.schedule_redraw()
         
         # Update results text instead of showing a pop-up
         self.results_text.insert(tk.END, f"Added connection from '{from_node}' to '{to_node}' with component '{component}'\n")
         self.results_text.see(tk.END)
     
+    def diagram_changed(self):
+        """Forget the results of the last exact analysis, which no longer match the diagram"""
+        self.last_results = None
+        self.diagram_version += 1
+    
     def update_combos(self):
         # Update node combos
-        nodes = list(self.G.nodes())
+        nodes = list(self.G.nodes)
         self.from_node_combo['values'] = nodes
         self.to_node_combo['values'] = nodes
         
-        # Update component combo
-        components = list(self.components.keys())
+        # Update component combo: voting members are only used through their block
+        members = {member for spec in self.voting.values() for member in spec['members']}
+        components = [name for name in self.components if name not in members] + list(self.voting)
         self.conn_comp_combo['values'] = components
     
+    def schedule_redraw(self):
+        """Redraw the diagram once edits pause, instead of after every single edit"""
+        if self.redraw_pending is not None:
+            self.root.after_cancel(self.redraw_pending)
+        self.redraw_pending = self.root.after(self.REDRAW_DELAY_MS, self.update_graph)
+    
+    def relayout(self):
+        """Lay the diagram out again from scratch with the selected layout"""
+        self.layout_cache = LayoutCache(self.LAYOUT_CHOICES[self.layout_var.get()])
+        self.schedule_redraw()
+    
     def update_graph(self):
+        self.redraw_pending = None
         self.ax.clear()
         
         # Check if graph is empty
-        if len(self.G.nodes()) <= 2:  # Only source and sink
+        if self.G.number_of_nodes() <= 2:  # Only source and sink
             self.ax.text(0.5, 0.5, "Add nodes and connections to build your system", 
                         ha='center', va='center', fontsize=12)
             self.ax.axis('off')
             self.canvas.draw()
             return
         
-        # Set positions for nodes (using spring layout)
-        pos = nx.spring_layout(self.G, seed=42)  # For consistent layouts
-        
-        # Draw nodes
-        nx.draw_networkx_nodes(self.G, pos, node_size=1500, ax=self.ax)
-        
-        # Draw edges
-        nx.draw_networkx_edges(self.G, pos, width=2, arrowsize=20, ax=self.ax)
+        # Cached positions: only nodes added since the last redraw are placed
+        pos = self.layout_cache.layout(self.G)
+        draw_diagram(self.ax, self.G, pos)
         
-        # Draw edge labels (component names)
-        edge_labels = {(u, v): d['name'] for u, v, d in self.G.edges(data=True)}
-        nx.draw_networkx_edge_labels(self.G, pos, edge_labels=edge_labels, font_size=10, ax=self.ax)
-        
-        # Draw node labels
-        nx.draw_networkx_labels(self.G, pos, font_size=10, font_weight='bold', ax=self.ax)
-        
-        self.ax.set_title("Reliability Block Diagram")
-        self.ax.axis('off')
         self.fig.tight_layout()
         self.canvas.draw()
     
     def calculate_reliability(self):
         # Check if graph has both source and sink and at least one path
-        if 'source' not in self.G.nodes() or 'sink' not in self.G.nodes():
+        if not self.G.has_node('source') or not self.G.has_node('sink'):
             messagebox.showerror("Error", "System must have both 'source' and 'sink' nodes")
             return
         
         try:
-            # Check if there's at least one path from source to sink
-            paths = list(nx.all_simple_paths(self.G, 'source', 'sink'))
-            if not paths:
-                messagebox.showerror("Error", "No path found from source to sink")
-                return
-            
-            # Extract component paths
-            component_paths = []
-            for path in paths:
-                comp_path = []
-                for i in range(len(path) - 1):
-                    edge_data = self.G.get_edge_data(path[i], path[i+1])
-                    comp_path.append(edge_data['component'])
-                component_paths.append(comp_path)
-            
-            # Find minimal cut sets
-            min_cut_sets = self.find_minimal_cut_sets(component_paths)
-            
-            # Calculate reliability using cut sets
-            unreliability = self.calc_system_unreliability_from_cut_sets(min_cut_sets)
-            reliability = 1 - unreliability
-            
-            # Display results
-            self.results_text.delete(1.0, tk.END)
-            self.results_text.insert(tk.END, "===== RELIABILITY ANALYSIS RESULTS =====\n\n")
-            
-            self.results_text.insert(tk.END, "Success Paths:\n")
-            for i, path in enumerate(component_paths, 1):
-                path_str = f"  Path {i}: " + " → ".join(path) + "\n"
-                self.results_text.insert(tk.END, path_str)
-            
-            self.results_text.insert(tk.END, "\nMinimal Cut Sets:\n")
-            for i, cut_set in enumerate(min_cut_sets, 1):
-                cut_set_str = f"  Cut Set {i}: {{{', '.join(cut_set)}}} (Order {len(cut_set)})\n"
-                self.results_text.insert(tk.END, cut_set_str)
-            
-            # Generate and display reliability expression
-            reliability_expression = self.generate_reliability_expression(min_cut_sets)
-            self.results_text.insert(tk.END, f"\nReliability Expression:\n{reliability_expression}\n\n")
-            
-            self.results_text.insert(tk.END, f"System Reliability: {reliability:.12f}\n")
-            self.results_text.insert(tk.END, f"System Unreliability: {unreliability:.12f}\n\n")
-            
-            messagebox.showinfo("Success", f"Analysis complete. System reliability: {reliability:.12f}")
-        
-        except Exception as e:
-            messagebox.showerror("Error", f"Analysis failed: {str(e)}")
-    
-    def generate_reliability_expression(self, min_cut_sets):
-        """Generate a mathematical expression of system reliability based on minimal cut sets"""
-        # System reliability R = 1 - Unreliability
-        # Unreliability = P(C₁ ∪ C₂ ∪ ... ∪ Cₙ)
-        # Where Cᵢ is the event that cut set i fails
-        
-        expression = "R = 1 - P(system failure)\n"
-        expression += "  = 1 - P(at least one minimal cut set fails)\n"
-        
-        # First line shows the general form using cut sets
-        cut_sets_union = " ∪ ".join([f"C{i}" for i in range(1, len(min_cut_sets) + 1)])
-        expression += f"  = 1 - P({cut_sets_union})\n\n"
-        
-        # Define each cut set
-        for i, cut_set in enumerate(min_cut_sets, 1):
-            components_prod = " × ".join([f"q{comp}" for comp in cut_set])
-            expression += f"Where C{i} = {components_prod}\n"
-        
-        expression += "\nWhere for each component i:\n"
-        expression += "  qᵢ = component failure probability\n"
-        expression += "  rᵢ = 1 - qᵢ = component reliability\n\n"
-        
-        # Using inclusion-exclusion principle
-        expression += "Using the inclusion-exclusion principle:\n"
-        expression += "R = 1 - [∑P(Cᵢ) - ∑P(Cᵢ∩Cⱼ) + ∑P(Cᵢ∩Cⱼ∩Cₖ) - ...]\n\n"
-        
-        # First-order terms
-        expression += "First-order terms:\n"
-        for i, cut_set in enumerate(min_cut_sets, 1):
-            components_list = ", ".join(cut_set)
-            components_prod = " × ".join([f"q{comp}" for comp in cut_set])
-            expression += f"P(C{i}) = P({{{components_list}}}) = {components_prod}\n"
-        
-        return expression
-    
-    def find_minimal_cut_sets(self, paths):
-        """Find minimal cut sets from the system paths"""
-        # Get all unique components
-        all_comps = set()
-        for path in paths:
-            all_comps.update(path)
-        all_comps = list(all_comps)
-        
-        # Generate and check potential cut sets of all sizes
-        cut_sets = []
-        
-        # Progress information in results text
+            max_order = self.parse_limit(self.max_order_var, int)
+            max_paths = self.parse_limit(self.max_paths_var, int)
+            max_memory_mb = self.parse_limit(self.max_memory_var, float)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid analysis limit: {str(e)}")
+            return
+        
+        self.start_job('analyze', "Analyzing system...", self.show_analysis, self.G, self.components,
+                       max_order=max_order, max_paths=max_paths, max_memory_mb=max_memory_mb,
+                       keep_sequences=self.PATH_DISPLAY_LIMIT, profile=self.new_profile(),
+                       cut_strategy=self.CUT_STRATEGY_CHOICES[self.cut_strategy_var.get()])
+    
+    def show_analysis(self, results):
+        """Show the results of a finished exact analysis"""
+        self.show_results(results)
+        self.last_results = results
+        
+        if not results['paths']['complete']:
+            messagebox.showinfo("Partial Results", f"Analysis stopped early ({results['paths']['stop_reason']}). "
+                                f"System reliability is between {results['reliability_lower']:.12f} "
+                                f"and {results['reliability_upper']:.12f}")
+        else:
+            messagebox.showinfo("Success", f"Analysis complete. System reliability: {results['reliability']:.12f}")
+    
+    def start_job(self, job, title, on_done, *args, **kwargs):
+        """
+        Run one of the rbd_analysis JOBS in the worker process, so the window stays
+        responsive and the run can be cancelled. Progress messages and the cut sets
+        of each finished order are shown as the worker posts them, and on_done is
+        called with the result. The worker stays up between jobs with its analysis
+        cache, so the cache is never copied between the processes.
+        The diagram may still be edited while the job runs, so the job gets a copy
+        of its arguments as they are now, and its result is dropped if the diagram
+        has changed by the time it finishes.
+        """
+        if self.job is not None:
+            messagebox.showinfo("Busy", "An analysis is already running. Cancel it or wait for it to finish.")
+            return
+        
         self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, "Analyzing system...\n\n")
-        self.results_text.insert(tk.END, f"Found {len(paths)} success paths\n")
-        self.results_text.insert(tk.END, f"Total components: {len(all_comps)}\n\n")
-        self.results_text.insert(tk.END, "Finding minimal cut sets...\n")
-        self.root.update()  # Update the GUI to show progress
-        
-        # Check all possible sizes of cut sets
-        for set_size in range(1, len(all_comps) + 1):
-            self.results_text.insert(tk.END, f"Checking potential cut sets of size {set_size}...\n")
-            self.root.update()
-            
-            size_cut_sets = []
-            for combo in combinations(all_comps, set_size):
-                if self.is_cut_set(list(combo), paths):
-                    size_cut_sets.append(list(combo))
-            
-            # Add to our list of potential cut sets
-            cut_sets.extend(size_cut_sets)
-            
-            self.results_text.insert(tk.END, f"  Found {len(size_cut_sets)} cut sets of size {set_size}\n")
-            self.root.update()
-        
-        # Remove non-minimal cut sets
-        self.results_text.insert(tk.END, "\nRemoving non-minimal cut sets...\n")
-        self.root.update()
-        
-        # First sort by size for efficiency
-        cut_sets.sort(key=len)
-        
-        minimal_cut_sets = []
-        for cs in cut_sets:
-            # A cut set is minimal if no proper subset of it is also a cut set
-            is_minimal = True
-            for other_cs in minimal_cut_sets:  # Only check against already-identified minimal sets
-                if self.is_subset(other_cs, cs):
-                    is_minimal = False
-                    break
-            
-            if is_minimal:
-                minimal_cut_sets.append(cs)
-        
-        # Count by order (size)
-        orders = {}
-        for cs in minimal_cut_sets:
-            order = len(cs)
-            if order not in orders:
-                orders[order] = 0
-            orders[order] += 1
-        
-        self.results_text.insert(tk.END, f"\nIdentified {len(minimal_cut_sets)} minimal cut sets:\n")
-        for order in sorted(orders.keys()):
-            self.results_text.insert(tk.END, f"  Order {order}: {orders[order]} cut sets\n")
-        
-        return minimal_cut_sets
-    
-    def is_cut_set(self, comp_set, paths):
-        """Check if a component set is a cut set"""
-        for path in paths:
-            # If this component set doesn't intersect with a path,
-            # then it's not a cut set
-            if not any(comp in path for comp in comp_set):
-                return False
-        return True
-    
-    def is_subset(self, set1, set2):
-        """Check if set1 is a subset of set2"""
-        return all(item in set2 for item in set1) and len(set1) < len(set2)
-    
-    def calc_system_unreliability_from_cut_sets(self, min_cut_sets):
-        """Calculate system unreliability from minimal cut sets"""
-        if not min_cut_sets:
-            return 0
-        
-        self.results_text.insert(tk.END, "\nCalculating system unreliability from cut sets...\n")
-        self.root.update()
-        
-        # For a system with minimal cut sets, the unreliability can be calculated as:
-        # The probability of the union of events where each cut set fails
-        
-        # Calculate probability of each cut set
-        cut_set_probs = []
-        for i, cut_set in enumerate(min_cut_sets):
-            cut_prob = 1.0
-            for comp in cut_set:
-                comp_fail_prob = self.components.get(comp, 0.1)
-                cut_prob *= comp_fail_prob
+        self.results_text.insert(tk.END, title + "\n\n")
+        
+        # The queue pickles the task later, in its feeder thread, so it gets a snapshot
+        self.start_worker()['tasks'].put((job, *copy.deepcopy((args, kwargs))))
+        self.job = {'on_done': on_done, 'version': self.diagram_version}
+        self.cancel_button.state(['!disabled'])
+        self.root.after(self.JOB_POLL_MS, self.poll_job)
+    
+    def poll_job(self):
+        """Handle the events posted by the running job, then poll again unless it has finished"""
+        job = self.job
+        if job is None:
+            return
+        
+        # Checked before draining, so every event of a dead worker is read before it counts as dead
+        worker = self.worker
+        alive = worker['process'].is_alive()
+        for _ in range(self.JOB_EVENTS_PER_POLL):
+            try:
+                event = worker['events'].get_nowait()
+            except queue.Empty:
+                break
             
-            cut_set_probs.append(cut_prob)
-            self.results_text.insert(tk.END, f"  Cut set {i+1} probability: {cut_prob:.9f}\n")
+            if event[0] == 'progress':
+                self.show_progress(event[1])
+            elif event[0] == 'order':
+                self.show_cut_set_order(*event[1:])
+            elif event[0] == 'error':
+                self.finish_job()
+                messagebox.showerror("Error", f"Analysis failed: {event[1]}")
+                return
+            else:
+                self.finish_job()
+                if job['version'] != self.diagram_version:
+                    self.results_text.insert(tk.END, "\nThe diagram was edited while the analysis ran; "
+                                                     "run it again for results that match the diagram.\n")
+                    self.results_text.see(tk.END)
+                    return
+                job['on_done'](event[1])
+                return
+        else:
+            alive = True  # more events may be waiting
+        
+        if not alive:
+            exitcode = worker['process'].exitcode
+            self.finish_job()
+            self.stop_worker()
+            messagebox.showerror("Error", f"Analysis failed: the worker process exited with code {exitcode}")
+            return
+        self.root.after(self.JOB_POLL_MS, self.poll_job)
+    
+    def cancel_job(self):
+        """Stop the running job, together with the worker process and its analysis cache"""
+        if self.job is None:
+            return
+        self.finish_job()
+        self.stop_worker()
+        self.results_text.insert(tk.END, "\nAnalysis cancelled.\n")
+        self.results_text.see(tk.END)
+    
+    def finish_job(self):
+        """Forget the running job and disable the Cancel button"""
+        self.job = None
+        self.cancel_button.state(['disabled'])
+    
+    def start_worker(self):
+        """The worker process, started on first use and again after a cancel or crash"""
+        if self.worker is None:
+            tasks = mp.Queue()
+            events = mp.Queue()
+            process = mp.Process(target=serve_jobs, args=(tasks, events), daemon=True)
+            process.start()
+            self.worker = {'process': process, 'tasks': tasks, 'events': events}
+        return self.worker
+    
+    def stop_worker(self):
+        """Terminate the worker process; the next job starts a new one with an empty cache"""
+        if self.worker is None:
+            return
+        process = self.worker['process']
+        process.terminate()
+        process.join()
+        self.worker['tasks'].close()
+        self.worker['events'].close()
+        self.worker = None
+    
+    def show_progress(self, message):
+        """Progress callback for the analysis core"""
+        self.results_text.insert(tk.END, message + "\n")
+        self.results_text.see(tk.END)
+    
+    def show_cut_set_order(self, order, cut_sets, probs):
+        """Show the minimal cut sets of one order while the analysis is still running"""
+        lines = [f"\nOrder {order}: {len(cut_sets)} minimal cut set(s)\n"]
+        lines += [f"  {{{', '.join(cut_set)}}} (q = {prob:.6e})\n"
+                  for cut_set, prob in zip(cut_sets[:self.ORDER_PREVIEW_LIMIT], probs)]
+        if len(cut_sets) > self.ORDER_PREVIEW_LIMIT:
+            lines.append(f"  ... and {len(cut_sets) - self.ORDER_PREVIEW_LIMIT} more\n")
+        self.results_text.insert(tk.END, "".join(lines))
+        self.results_text.see(tk.END)
+    
+    def show_results(self, results):
+        """Write the results of analyze() to the results panel.
+        
+        Only the top RESULTS_TOP_N rows of the cut set, importance and expression
+        listings are written, each listing with a single insert, so the panel fills
+        in the same time however large the result is; browse_cut_sets pages through
+        the rest and export_report writes everything to a file.
+        """
+        paths = results['paths']
+        max_order = results['max_order']
+        min_cut_sets = results['cut_sets']
         
-        # Apply the inclusion-exclusion principle more systematically
-        n = len(min_cut_sets)
-        unreliability = 0.0
-        print(n)
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, "===== RELIABILITY ANALYSIS RESULTS =====\n\n")
+        
+        if results.get('voting'):
+            self.results_text.insert(tk.END, "Voting Blocks:\n")
+            for block in results['voting']:
+                self.results_text.insert(tk.END, f"  {block['name']} = {block['k']}-of-{block['n']}"
+                                                 f"({', '.join(block['members'])}) (q = {block['q']:.9f})\n")
+            self.results_text.insert(tk.END, "\n")
+        
+        if results.get('ccf'):
+            self.results_text.insert(tk.END, "Common-Cause Groups:\n")
+            for group in results['ccf']:
+                self.results_text.insert(tk.END, f"  {group['name']}: β = {group['beta']:g} over "
+                                                 f"{', '.join(group['members'])} (common-cause q = {group['q']:.9g})\n")
+            self.results_text.insert(tk.END, "\n")
+        
+        reduction = results['reduction']
+        if reduction['blocks']:
+            self.results_text.insert(tk.END, "Series-Parallel Reduction:\n")
+            self.results_text.insert(tk.END, f"  {reduction['connections']} connections reduced to {reduction['reduced_connections']}\n")
+            for block in reduction['blocks']:
+                block_str = (f"  {block['name']} = {block['kind']}({', '.join(block['members'])}) "
+                             f"→ {{{', '.join(block['components'])}}} (q = {block['q']:.9f})\n")
+                self.results_text.insert(tk.END, block_str)
+            self.results_text.insert(tk.END, "\n")
+        
+        if not paths['complete']:
+            self.results_text.insert(tk.END, f"Path enumeration stopped after {paths['count']} paths ({paths['stop_reason']}).\n")
+            self.results_text.insert(tk.END, "Cut sets below are those of the enumerated paths; results are bounds.\n\n")
+        
+        if results.get('cut_strategy'):
+            self.show_cut_strategy(results['cut_strategy'])
+            self.results_text.insert(tk.END, "\n")
+        
+        self.results_text.insert(tk.END, "Success Paths:\n")
+        self.results_text.insert(tk.END, "".join(f"  Path {i}: " + " → ".join(path) + "\n"
+                                                 for i, path in enumerate(paths['sequences'], 1)))
+        if paths['count'] is None:
+            self.results_text.insert(tk.END, "  Not enumerated: the cut sets were found by the max-flow search\n")
+        elif paths['count'] > len(paths['sequences']):
+            self.results_text.insert(tk.END, f"  ... and {paths['count'] - len(paths['sequences'])} more paths\n")
+        
+        orders = ", ".join(f"order {order}: {count}" for order, count in results['cut_set_orders'].items())
+        if max_order is not None:
+            self.results_text.insert(tk.END, f"\nMinimal Cut Sets (up to order {max_order}): {len(min_cut_sets)}")
+        else:
+            self.results_text.insert(tk.END, f"\nMinimal Cut Sets: {len(min_cut_sets)}")
+        self.results_text.insert(tk.END, f" ({orders})\n" if orders else "\n")
+        top = top_cut_sets(results['cut_set_probs'], self.RESULTS_TOP_N)
+        if len(top) < len(min_cut_sets):
+            self.results_text.insert(tk.END, f"  Most probable {len(top)}:\n")
+        self.results_text.insert(tk.END, "".join(self.cut_set_line(results, i) for i in top))
+        if len(top) < len(min_cut_sets):
+            self.results_text.insert(tk.END, f"  ... and {len(min_cut_sets) - len(top)} more: "
+                                             "use Browse Cut Sets or Export Report to see them all\n")
+        
+        if results['importance']:
+            importance = list(results['importance'].items())
+            self.results_text.insert(tk.END, "\nComponent Importance (by Birnbaum):\n")
+            self.results_text.insert(tk.END, f"  {'Component':<16}{'Birnbaum':>14}{'F-V':>12}{'RAW':>12}{'RRW':>12}\n")
+            rows = []
+            for comp, imp in importance[:self.RESULTS_TOP_N]:
+                values = [f"{imp[key]:.4g}" if imp[key] is not None else "n/a"
+                          for key in ('fussell_vesely', 'raw', 'rrw')]
+                rows.append(f"  {comp:<16}{imp['birnbaum']:>14.6g}{values[0]:>12}{values[1]:>12}{values[2]:>12}\n")
+            if len(importance) > self.RESULTS_TOP_N:
+                rows.append(f"  ... and {len(importance) - self.RESULTS_TOP_N} more components\n")
+            self.results_text.insert(tk.END, "".join(rows))
+        
+        # Generate and display reliability expression
+        reliability_expression = generate_reliability_expression(min_cut_sets, limit=self.RESULTS_TOP_N)
+        self.results_text.insert(tk.END, f"\nReliability Expression:\n{reliability_expression}\n\n")
+        
+        if not paths['complete']:
+            self.results_text.insert(tk.END, f"System Reliability (lower bound): {results['reliability_lower']:.12f}\n")
+            self.results_text.insert(tk.END, f"System Reliability (upper bound): {results['reliability_upper']:.12f}\n\n")
+        else:
+            self.results_text.insert(tk.END, f"System Reliability: {results['reliability']:.12f}\n")
+            self.results_text.insert(tk.END, f"System Unreliability: {results['unreliability']:.12f}\n\n")
+            if max_order is not None:
+                self.results_text.insert(tk.END, "Note: cut sets above the order cap are ignored, so the unreliability is a lower bound.\n\n")
+        
+        if 'cache' in results:
+            stats = results['cache']
+            self.results_text.insert(tk.END, f"Analysis cache: {stats['structure_hits']} segment hits, "
+                                             f"{stats['structure_misses']} misses, {stats['result_hits']} result hits\n")
+        if 'profile' in results:
+            self.show_profile(results['profile'])
+    
+    @staticmethod
+    def cut_set_line(results, i):
+        """Results panel line of cut set i (0-based) of analyze() results"""
+        cut_set = results['cut_sets'][i]
+        return (f"  Cut Set {i + 1}: {{{', '.join(cut_set)}}} "
+                f"(Order {len(cut_set)}, q = {results['cut_set_probs'][i]:.6e})\n")
+    
+    def browse_cut_sets(self):
+        """Page through all minimal cut sets of the last exact analysis, most probable first"""
+        results = self.last_results
+        if not results or not len(results['cut_sets']):
+            messagebox.showinfo("No Cut Sets", "Run Calculate Reliability first to find the minimal cut sets")
+            return
         
-        # Apply inclusion-exclusion principle
-        for r in range(1, n + 1):  
-            sign = (-1)**(r+1)  # Alternating sign: +, -, +, ...
-
-            for combo in combinations(range(n), r):
-                # Calculate probability of intersection of these cut sets failing
-                # For cut set intersections, we need the union of component sets
-                prob = 1.0
-                
-                # Special case for r=1 (individual cut sets)
-                if r == 1:
-                    prob = cut_set_probs[combo[0]]
-                else:
-                    # For the intersection of cut sets, we need the probability that
-                    # all components in at least one of the cut sets fail
-                    intersection_components = set()
-                    for idx in combo:
-                        intersection_components.update(min_cut_sets[idx])
-                    
-                    # Then compute the probability that all these components fail
-                    prob = 1.0
-                    for comp in intersection_components:
-                        comp_fail_prob = self.components.get(comp, 0.1)
-                        prob *= comp_fail_prob
-
-                unreliability += sign * prob
-
+        ranking = top_cut_sets(results['cut_set_probs'], len(results['cut_sets']))
+        pages = -(-len(ranking) // self.CUT_SET_PAGE_SIZE)
+        page_var = tk.IntVar(value=0)
+        
+        window = tk.Toplevel(self.root)
+        window.title("Minimal Cut Sets")
+        nav_frame = ttk.Frame(window)
+        nav_frame.pack(side=tk.TOP, fill=tk.X)
+        page_label = ttk.Label(nav_frame)
+        text = tk.Text(window, height=30, width=90)
+        
+        def show(page):
+            # Only the cut sets of this page are read, so a loaded project decodes no more than a page
+            page = min(max(page, 0), pages - 1)
+            page_var.set(page)
+            start = page * self.CUT_SET_PAGE_SIZE
+            rows = ranking[start:start + self.CUT_SET_PAGE_SIZE]
+            text.delete(1.0, tk.END)
+            text.insert(tk.END, "".join(self.cut_set_line(results, i) for i in rows))
+            page_label.config(text=f"Page {page + 1} of {pages} ({len(ranking)} cut sets, most probable first)")
+        
+        ttk.Button(nav_frame, text="◀ Previous", command=lambda: show(page_var.get() - 1)).pack(side=tk.LEFT)
+        ttk.Button(nav_frame, text="Next ▶", command=lambda: show(page_var.get() + 1)).pack(side=tk.LEFT, padx=5)
+        page_label.pack(side=tk.LEFT, padx=5)
+        text.pack(fill=tk.BOTH, expand=True)
+        show(0)
+    
+    def export_report(self):
+        """Write the full results of the last exact analysis to a text report"""
+        if not self.last_results:
+            messagebox.showinfo("No Results", "Run Calculate Reliability first to have results to export")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".txt",
+                                            filetypes=[("Text report", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
         
-        # Ensure results are reasonable
-        if unreliability < 0:
-            unreliability = 0
-        elif unreliability > 1:
-            unreliability = 1
-            
-        return unreliability
+        try:
+            write_report(path, self.last_results)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not write the report: {str(e)}")
+            return
+        
+        self.results_text.insert(tk.END, f"Report written to {path}\n")
+        self.results_text.see(tk.END)
+    
+    def show_cut_strategy(self, strategies):
+        """Write how the cut sets of each series segment were found, and why"""
+        self.results_text.insert(tk.END, "Cut Set Strategy:\n")
+        for segment in strategies:
+            self.results_text.insert(tk.END, f"  {segment['start']} → {segment['end']}: {segment['strategy']} "
+                                             f"({segment['reason']})\n")
+    
+    def new_profile(self):
+        """AnalysisProfile for the next run if profiling is switched on, else None"""
+        if not (self.profile_var.get() or self.cprofile_var.get()):
+            return None
+        return AnalysisProfile(cprofile=self.cprofile_var.get())
+    
+    def show_profile(self, profile):
+        """Write the stage timings, search counters and cProfile functions of a profiled run"""
+        self.results_text.insert(tk.END, f"\nProfile ({profile['total_seconds']:.4f} s in total):\n")
+        self.results_text.insert(tk.END, f"  {'Stage':<28}{'Seconds':>12}{'Share':>9}{'Calls':>8}\n")
+        for stage in profile['stages']:
+            self.results_text.insert(tk.END, f"  {stage['stage']:<28}{stage['seconds']:>12.6f}"
+                                             f"{stage['share']:>9.1%}{stage['calls']:>8}\n")
+        if profile['counters']:
+            self.results_text.insert(tk.END, "  Counters:\n")
+            for name, value in profile['counters'].items():
+                self.results_text.insert(tk.END, f"    {name.replace('_', ' ')}: {value:,}\n")
+        if 'cprofile' in profile:
+            self.results_text.insert(tk.END, "  Top functions by cumulative time:\n")
+            for row in profile['cprofile']:
+                self.results_text.insert(tk.END, f"    {row['cumulative_seconds']:>10.4f} s {row['calls']:>9} calls  {row['function']}\n")
+    
+    def approximate_reliability(self):
+        """Bound system unreliability with rare-event, min-cut and truncated inclusion-exclusion bounds"""
+        if not self.G.has_node('source') or not self.G.has_node('sink'):
+            messagebox.showerror("Error", "System must have both 'source' and 'sink' nodes")
+            return
+        
+        try:
+            rel_tolerance = self.parse_limit(self.bounds_tol_var, float) or 0.01
+            max_order = self.parse_limit(self.max_order_var, int)
+            max_paths = self.parse_limit(self.max_paths_var, int)
+            max_memory_mb = self.parse_limit(self.max_memory_var, float)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid analysis limit: {str(e)}")
+            return
+        
+        self.start_job('approximate', "Bounding system unreliability...",
+                       lambda bounds: self.show_bounds(bounds, rel_tolerance), self.G, self.components,
+                       rel_tolerance=rel_tolerance, max_order=max_order, max_paths=max_paths,
+                       max_memory_mb=max_memory_mb, profile=self.new_profile(),
+                       cut_strategy=self.CUT_STRATEGY_CHOICES[self.cut_strategy_var.get()])
+    
+    def show_bounds(self, bounds, rel_tolerance):
+        """Show the results of approximate_reliability()"""
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, "===== RELIABILITY BOUNDS =====\n\n")
+        self.results_text.insert(tk.END, f"Minimal cut sets: {bounds['cut_sets']} in {bounds['segments']} series segment(s)\n")
+        self.show_cut_strategy(bounds['cut_strategy'])
+        self.results_text.insert(tk.END, "\n")
+        self.results_text.insert(tk.END, f"Rare-event approximation:     Q ≈ {bounds['rare_event']:.6e}\n")
+        self.results_text.insert(tk.END, f"Min-cut upper bound:          Q ≤ {bounds['min_cut_upper']:.6e}\n")
+        self.results_text.insert(tk.END, f"Esary-Proschan lower bound:   Q ≥ {bounds['esary_proschan_lower']:.6e}\n")
+        self.results_text.insert(tk.END, f"Inclusion-exclusion terms used: {bounds['inclusion_exclusion_terms']} "
+                                         f"(levels per segment: {bounds['inclusion_exclusion_levels']})\n\n")
+        self.results_text.insert(tk.END, f"System Unreliability: [{bounds['unreliability_lower']:.12e}, {bounds['unreliability_upper']:.12e}]\n")
+        self.results_text.insert(tk.END, f"System Reliability:   [{bounds['reliability_lower']:.12f}, {bounds['reliability_upper']:.12f}]\n")
+        if not bounds['converged']:
+            self.results_text.insert(tk.END, f"\nNote: the bounds did not reach the relative tolerance {rel_tolerance:g}.\n")
+        if 'profile' in bounds:
+            self.show_profile(bounds['profile'])
+        
+        messagebox.showinfo("Success", f"Bounds complete. System reliability is between "
+                                       f"{bounds['reliability_lower']:.12f} and {bounds['reliability_upper']:.12f}")
+    
+    def estimate_reliability_monte_carlo(self):
+        """Estimate system reliability by Monte Carlo simulation, for diagrams too large for exact analysis"""
+        if not self.G.has_node('source') or not self.G.has_node('sink'):
+            messagebox.showerror("Error", "System must have both 'source' and 'sink' nodes")
+            return
+        
+        try:
+            target_rel_error = self.parse_limit(self.mc_error_var, float) or 0.01
+            seed_str = self.mc_seed_var.get().strip()
+            seed = int(seed_str) if seed_str else None
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid Monte Carlo setting: {str(e)}")
+            return
+        
+        self.start_job('monte_carlo', "Running Monte Carlo simulation...",
+                       lambda estimate: self.show_monte_carlo(estimate, target_rel_error), self.G, self.components,
+                       seed=seed, target_rel_error=target_rel_error)
+    
+    def show_monte_carlo(self, estimate, target_rel_error):
+        """Show the results of a Monte Carlo estimate"""
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, "===== MONTE CARLO RELIABILITY ESTIMATE =====\n\n")
+        self.results_text.insert(tk.END, f"System Reliability: {estimate['reliability']:.12f}\n")
+        self.results_text.insert(tk.END, f"{estimate['confidence']:.0%} Confidence Interval: "
+                                         f"[{estimate['ci_low']:.12f}, {estimate['ci_high']:.12f}]\n")
+        self.results_text.insert(tk.END, f"Relative Error of Unreliability: {estimate['rel_error']:.4g}"
+                                         f" (target {target_rel_error:g})\n")
+        self.results_text.insert(tk.END, f"Samples: {estimate['samples']} ({estimate['failures']} system failures)\n")
+        self.results_text.insert(tk.END, f"Seed: {estimate['seed']}\n")
+        self.results_text.insert(tk.END, f"Speed: {estimate['samples_per_sec']:,.0f} samples/sec\n")
+        if not estimate['converged']:
+            self.results_text.insert(tk.END, "\nNote: the sample limit was reached before the target error.\n")
+        
+        messagebox.showinfo("Success", f"Monte Carlo estimate complete. System reliability: {estimate['reliability']:.12f}")
+    
+    def plot_reliability_curve(self):
+        """Compute system R(t) and A(t) from the component lifetimes and plot them in a separate window"""
+        if not self.G.has_node('source') or not self.G.has_node('sink'):
+            messagebox.showerror("Error", "System must have both 'source' and 'sink' nodes")
+            return
+        
+        try:
+            horizon = self.parse_limit(self.horizon_var, float)
+            max_order = self.parse_limit(self.max_order_var, int)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid time horizon: {str(e)}")
+            return
+        
+        times = np.linspace(0.0, horizon, 2000) if horizon else None
+        self.start_job('curves', "Computing reliability curves...", self.show_reliability_curve,
+                       self.G, self.components, self.lifetimes, times=times, max_order=max_order,
+                       cut_strategy=self.CUT_STRATEGY_CHOICES[self.cut_strategy_var.get()])
+    
+    def show_reliability_curve(self, curves):
+        """Show the results of reliability_curves() and plot them"""
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, "===== TIME-DEPENDENT RELIABILITY =====\n\n")
+        self.results_text.insert(tk.END, f"Components with a lifetime: {len(self.lifetimes)} of {len(self.components)}\n")
+        self.results_text.insert(tk.END, f"Time grid: 0 to {curves['times'][-1]:g} ({len(curves['times'])} points)\n\n")
+        if curves['mttf'] is not None:
+            self.results_text.insert(tk.END, f"System MTTF (integrated over the grid): {curves['mttf']:.6g}\n")
+        self.results_text.insert(tk.END, f"R(t) at the end of the grid: {curves['reliability_at_end']:.6e}\n")
+        self.results_text.insert(tk.END, f"A(t) at the end of the grid: {curves['availability_at_end']:.12f}\n")
+        if curves['reliability_at_end'] > 1e-3:
+            self.results_text.insert(tk.END, "\nNote: R(t) has not reached zero, so the MTTF is underestimated. "
+                                             "Use a longer time horizon.\n")
+        
+        window = tk.Toplevel(self.root)
+        window.title("System Reliability and Availability")
+        fig = plt.Figure(figsize=(6, 4), dpi=100)
+        ax = fig.add_subplot(111)
+        ax.plot(curves['times'], curves['reliability'], label="R(t)")
+        ax.plot(curves['times'], curves['availability'], "--", label="A(t)")
+        ax.set_xlabel("Time")
+        ax.set_ylabel("Probability")
+        ax.set_ylim(0, 1.05)
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+        canvas = FigureCanvasTkAgg(fig, window)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        canvas.draw()
+    
+    def save_system(self):
+        """Save the diagram, and the last exact results if the diagram is unchanged, to a project file"""
+        path = filedialog.asksaveasfilename(defaultextension=".rbd",
+                                            filetypes=[("RBD project", "*.rbd"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        try:
+            save_project(path, self.G, self.components, self.last_results, self.lifetimes)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not save the project: {str(e)}")
+            return
+        
+        saved = "diagram and analysis results" if self.last_results else "diagram"
+        self.results_text.insert(tk.END, f"Saved {saved} to {path}\n")
+        self.results_text.see(tk.END)
+    
+    def open_system(self):
+        """Open a project file or diagram file, showing any saved results without recomputing them"""
+        path = filedialog.askopenfilename(filetypes=[("RBD project", "*.rbd"), ("Diagram file", "*.json"),
+                                                     ("All files", "*.*")])
+        if not path:
+            return
+        
+        try:
+            G, components, results = read_any(path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Could not open {path}: {str(e)}")
+            return
+        
+        self.load_system(G, components)
+        if results is not None:
+            self.show_results(results)
+            self.last_results = results
+        else:
+            self.results_text.delete(1.0, tk.END)
+            self.results_text.insert(tk.END, f"Opened {path}\n")
+    
+    def import_edges(self):
+        """Replace the system with one read from a CSV or JSON edge list"""
+        path = filedialog.askopenfilename(filetypes=[("Edge list", "*.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        try:
+            G, components = import_edge_list(path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Could not import {path}: {str(e)}")
+            return
+        
+        self.load_system(G, components)
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, f"Imported {G.number_of_edges()} connections and "
+                                         f"{len(components)} components from {path}\n")
+    
+    def load_system(self, G, components):
+        """Replace the current system with a loaded one"""
+        self.G = G
+        self.components = dict(components)
+        self.lifetimes = dict(G.graph.get('lifetimes', {}))
+        self.voting = G.graph.setdefault('voting', {})
+        self.ccf = G.graph.setdefault('ccf', {})
+        self.diagram_changed()
+        
+        self.ccf_listbox.delete(0, tk.END)
+        for name in self.ccf:
+            self.ccf_listbox.insert(tk.END, self.ccf_label(name))
+        self.comp_listbox.delete(0, tk.END)
+        for name in self.voting:
+            self.comp_listbox.insert(tk.END, self.voting_label(name))
+        for name in self.components:
+            self.comp_listbox.insert(tk.END, self.component_label(name))
+        self.layout_cache.reset()
+        self.update_combos()
+        self.schedule_redraw()
+    
+    def parse_limit(self, var, kind):
+        """Read a positive analysis limit from an entry, blank meaning no limit"""
+        text = var.get().strip()
+        if not text:
+            return None
+        value = kind(text)
+        if value <= 0:
+            raise ValueError(f"{text} must be greater than 0")
+        return value
     
     def clear_system(self):
         """Clear the current system and start fresh"""
         if messagebox.askyesno("Confirm Clear", "Are you sure you want to clear the entire system?"):
             # Recreate the graph with only source and sink
-            self.G = nx.DiGraph()
+            self.G = CompactGraph()
             self.G.add_node('source')
             self.G.add_node('sink')
             
             # Clear components
             self.components = {}
+            self.lifetimes = {}
+            self.voting = {}
+            self.G.graph['voting'] = self.voting
+            self.ccf = {}
+            self.G.graph['ccf'] = self.ccf
+            self.diagram_changed()
             self.comp_listbox.delete(0, tk.END)
+            self.ccf_listbox.delete(0, tk.END)
             
             # Update GUI
+            self.layout_cache.reset()
             self.update_combos()
-            self.update_graph()
+            self.schedule_redraw()
             
             # Clear results
             self.results_text.delete(1.0, tk.END)
@@ -576,6 +1229,7 @@ class ReliabilityBlockDiagramApp:
             messagebox.showinfo("System Cleared", "System has been reset")
 
 if __name__ == "__main__":
+    mp.freeze_support()
     root = tk.Tk()
     app = ReliabilityBlockDiagramApp(root)
     root.mainloop()
\ No newline at end of file
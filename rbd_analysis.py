@@ -0,0 +1,3465 @@
+"""
+Reliability Block Diagram analysis core
+Headless engines behind the Reliability Block Diagram GUI Builder. Nothing in
+this module imports tkinter or matplotlib, so it can run on machines without
+a display and starts quickly. networkx is only needed to convert a DiGraph.
+Contents:
+---------
+* CompactGraph, the interned CSR array representation all engines work on
+* Series-parallel reduction of the diagram before enumeration
+* Streaming path enumeration as integer bitmasks, with path and memory limits
+* MOCUS-style minimal cut set engine with an optional order cap
+* A NumPy bit matrix kernel for the subsumption filter on large families
+  of masks
+* Max-flow bounded cut set search on the graph itself, chosen per segment
+  when there are too many paths to enumerate
+* k-out-of-n voting blocks and parallel bundles, evaluated as one component
+  by dynamic programming over their members
+* Beta-factor common-cause failure groups, evaluated by conditioning the
+  unchanged structure on the common-cause events
+* Exact unreliability through a binary decision diagram (BDD), with
+  inclusion-exclusion kept as a cross-check for small systems
+* Rare-event, min-cut, Esary-Proschan and truncated inclusion-exclusion
+  bounds for highly reliable systems
+* Birnbaum, Fussell-Vesely, RAW and RRW importance from one BDD pass
+* Vectorized Monte Carlo estimate with a confidence interval
+* analyze(), which runs the whole exact pipeline segment by segment and
+  returns plain data, with an optional AnalysisCache for repeated runs
+  and an optional AnalysisProfile of stage timings and search counters
+* ReliabilitySweep, which reuses one structural analysis for many
+  probability vectors
+* Component lifetime distributions (exponential, Weibull, repairable) and
+  system R(t), A(t) and MTTF over a time grid
+* run_job(), the entry point for running any of these in a background
+  process that reports progress and cut sets through a queue, and
+  serve_jobs(), a persistent one that keeps its AnalysisCache between jobs
+Command line:
+-------------
+    python rbd_analysis.py diagram.json [-o results.json] [--max-order N] ...
+reads a diagram file and writes the results as JSON. A diagram file looks like
+    {"components": {"A": 0.05, "B": 0.04},
+     "nodes": ["source", "n1", "sink"],
+     "connections": [{"from": "source", "to": "n1", "component": "A"},
+                     {"from": "n1", "to": "sink", "component": "B"}]}
+with an optional "lifetimes" entry such as
+    {"A": {"kind": "weibull", "shape": 1.5, "scale": 8000},
+     "B": {"kind": "repairable", "mttf": 5000, "mttr": 24}}
+and an optional "voting" entry of k-out-of-n blocks, such as
+    {"Pumps": {"k": 2, "members": ["P1", "P2", "P3"]}}
+where the block name is used as the component of a connection and the
+members are listed in "components" but not used on any connection, and an
+optional "ccf" entry of beta-factor common-cause groups, such as
+    {"PumpCCF": {"beta": 0.1, "members": ["P1", "P2", "P3"]}}
+"""
+import argparse
+import cProfile
+import heapq
+import json
+import math
+import pstats
+import sys
+import time
+from array import array
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from functools import reduce
+from itertools import combinations, islice, product
+from statistics import NormalDist
+
+import numpy as np
+
+# Failure probability assumed for a component with no entry in the probabilities
+DEFAULT_FAILURE_PROB = 0.1
+
+# Largest number of cut sets for which the BDD result is cross-checked
+# against full inclusion-exclusion
+INCLUSION_EXCLUSION_CHECK_LIMIT = 12
+
+# Most common-cause groups in one diagram; the exact engines evaluate
+# 2^groups combinations of common-cause events
+CCF_GROUP_LIMIT = 12
+
+# How the minimal cut sets of a segment are found: 'paths' from its
+# enumerated success paths, 'flow' on the graph itself with max-flow
+# bounds, 'auto' by the number of paths (see choose_cut_strategy)
+CUT_STRATEGIES = ('auto', 'paths', 'flow')
+
+# Above this many success paths in a segment, 'auto' switches to the flow search
+FLOW_PATH_THRESHOLD = 20000
+
+# Mask lists at least this long go through the NumPy bit matrix kernels;
+# shorter ones are faster in plain Python
+VECTORIZE_MIN_MASKS = 64
+
+# Elements per temporary array in the bit matrix kernels, which work in chunks of rows
+KERNEL_CHUNK_ELEMENTS = 1 << 22
+
+
+class CompactGraph:
+    """
+    Array-backed diagram used by all the analysis engines.
+    Node and component names are interned to integer ids once, connections
+    are stored as (source, target, component) id triples, and the adjacency
+    is kept as compressed sparse row (CSR) arrays: the successors of node i
+    are targets[indptr[i]:indptr[i + 1]], reached through the components
+    edge_component[indptr[i]:indptr[i + 1]]. Failure probabilities are one
+    float per component. Nothing is stored per connection besides the three
+    ids, so diagrams with tens of thousands of connections stay small.
+    Connections can be added at any time; the CSR arrays are rebuilt on
+    the next read. networkx is only needed by from_networkx and
+    to_networkx, at the import/export boundary.
+    Attributes:
+    ----------
+    nodes : list of str
+            Node name for each node id
+    node_id : dict
+            Node name to id
+    components : list of str
+            Component name for each component id
+    component_id : dict
+            Component name to id
+    graph : dict
+            Diagram-level data, e.g. 'lifetimes'
+    """
+    def __init__(self):
+        self.nodes = []
+        self.node_id = {}
+        self.components = []
+        self.component_id = {}
+        self.graph = {}
+        self._prob = array('d')
+        self._src = array('q')
+        self._dst = array('q')
+        self._comp = array('q')
+        self._edge_index = {}  # (u, v) ids: position in the edge arrays
+        self._csr = None
+        self._adjacency = None
+
+    @classmethod
+    def from_networkx(cls, G, components=None):
+        """Intern a networkx DiGraph whose edges carry a 'component' attribute"""
+        graph = cls()
+        graph.graph.update(getattr(G, 'graph', {}))
+        for node in G.nodes():
+            graph.add_node(node)
+        for name, prob in (components or {}).items():
+            graph.add_component(name, prob)
+        for u, v, data in G.edges(data=True):
+            comp = data['component']
+            if comp not in graph.component_id:
+                graph.add_component(comp, data.get('failure_prob', DEFAULT_FAILURE_PROB))
+            graph.add_edge(u, v, comp)
+        return graph
+
+    @classmethod
+    def from_edges(cls, edges, components=None, nodes=()):
+        """Build a graph from (u, v, component) name triples"""
+        graph = cls()
+        for node in nodes:
+            graph.add_node(node)
+        for name, prob in (components or {}).items():
+            graph.add_component(name, prob)
+        for u, v, comp in edges:
+            graph.add_edge(u, v, comp)
+        return graph
+
+    def to_networkx(self):
+        """Export as a networkx DiGraph with the attributes the GUI draws"""
+        import networkx as nx
+
+        G = nx.DiGraph(**self.graph)
+        G.add_nodes_from(self.nodes)
+        for u, v, c in zip(self._src, self._dst, self._comp):
+            comp = self.components[c]
+            G.add_edge(self.nodes[u], self.nodes[v], component=comp, name=comp, failure_prob=self._prob[c])
+        return G
+
+    def with_probabilities(self, components):
+        """Copy sharing the structure, with failure probabilities taken from a dict"""
+        graph = CompactGraph()
+        graph.__dict__.update(self.__dict__)
+        graph.graph = dict(self.graph)
+        graph._prob = array('d', self._prob)
+        for name, prob in components.items():
+            if name in graph.component_id:
+                graph._prob[graph.component_id[name]] = prob
+        return graph
+
+    def add_node(self, name):
+        """Intern a node name and return its id"""
+        node = self.node_id.get(name)
+        if node is None:
+            node = self.node_id[name] = len(self.nodes)
+            self.nodes.append(name)
+            self._csr = self._adjacency = None
+        return node
+
+    def add_component(self, name, prob=DEFAULT_FAILURE_PROB):
+        """Intern a component name, set its failure probability, and return its id"""
+        comp = self.component_id.get(name)
+        if comp is None:
+            comp = self.component_id[name] = len(self.components)
+            self.components.append(name)
+            self._prob.append(prob)
+        else:
+            self._prob[comp] = prob
+        return comp
+
+    def add_edge(self, u, v, component):
+        """Add a connection between named nodes through a named component"""
+        comp = self.component_id.get(component)
+        if comp is None:
+            comp = self.add_component(component)
+        u, v = self.add_node(u), self.add_node(v)
+        if (u, v) in self._edge_index:
+            self._comp[self._edge_index[u, v]] = comp
+        else:
+            self._edge_index[u, v] = len(self._src)
+            self._src.append(u)
+            self._dst.append(v)
+            self._comp.append(comp)
+        self._csr = self._adjacency = None
+
+    def __contains__(self, name):
+        return name in self.node_id
+
+    def has_node(self, name):
+        return name in self.node_id
+
+    def has_edge(self, u, v):
+        return (self.node_id.get(u), self.node_id.get(v)) in self._edge_index
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return len(self._src)
+
+    def edge_ids(self):
+        """Iterate over (u, v, component) id triples in insertion order"""
+        return zip(self._src, self._dst, self._comp)
+
+    def edges(self):
+        """Yield (u, v, component) name triples in insertion order"""
+        for u, v, c in zip(self._src, self._dst, self._comp):
+            yield self.nodes[u], self.nodes[v], self.components[c]
+
+    @property
+    def prob(self):
+        """Failure probability of every component, indexed by component id"""
+        return np.array(self._prob, dtype=np.float64)
+
+    def component_uses(self):
+        """Number of connections using each component, indexed by component id"""
+        return np.bincount(np.array(self._comp, dtype=np.int64), minlength=len(self.components))
+
+    def csr(self):
+        """(indptr, targets, edge_component) arrays, successors in insertion order"""
+        if self._csr is None:
+            n = len(self.nodes)
+            src = np.array(self._src, dtype=np.int64)
+            order = np.argsort(src, kind='stable')
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+            targets = np.array(self._dst, dtype=np.int64)[order]
+            comps = np.array(self._comp, dtype=np.int64)[order]
+            self._csr = (indptr, targets, comps)
+        return self._csr
+
+    def adjacency(self):
+        """Successors of every node as lists of (target, component) ids.
+
+        A list view of the CSR arrays for the pure-Python search loops,
+        built once per graph version.
+        """
+        if self._adjacency is None:
+            indptr, targets, comps = self.csr()
+            pairs = list(zip(targets.tolist(), comps.tolist()))
+            bounds = indptr.tolist()
+            self._adjacency = [pairs[bounds[i]:bounds[i + 1]] for i in range(len(self.nodes))]
+        return self._adjacency
+
+    def reachable(self, start, reverse=False):
+        """Set of node ids reachable from node id start (or reaching it if reverse)"""
+        if not reverse:
+            return reachable_nodes(self.adjacency(), start)
+        adjacency = [[] for _ in self.nodes]
+        for u, v, c in self.edge_ids():
+            adjacency[v].append((u, c))
+        return reachable_nodes(adjacency, start)
+
+    def has_path(self, source, sink):
+        if source not in self.node_id or sink not in self.node_id:
+            return False
+        return self.node_id[sink] in self.reachable(self.node_id[source])
+
+    def topological_order(self):
+        """Node ids in topological order, or None if the diagram has a cycle"""
+        indptr, targets, _ = self.csr()
+        indegree = np.bincount(targets, minlength=len(self.nodes)).tolist()
+        adjacency = self.adjacency()
+        ready = [u for u, d in enumerate(indegree) if d == 0]
+        order = []
+        while ready:
+            u = ready.pop()
+            order.append(u)
+            for v, _ in adjacency[u]:
+                indegree[v] -= 1
+                if indegree[v] == 0:
+                    ready.append(v)
+        return order if len(order) == len(self.nodes) else None
+
+
+def as_compact(G, components=None):
+    """Return G as a CompactGraph, converting a networkx DiGraph at the boundary.
+
+    components, if given, overrides the failure probabilities.
+    """
+    if not isinstance(G, CompactGraph):
+        return CompactGraph.from_networkx(G, components)
+    return G.with_probabilities(components) if components else G
+
+
+def reachable_nodes(adjacency, start):
+    """Set of nodes reachable from start in an adjacency list of (target, component) pairs"""
+    seen = {start}
+    stack = [start]
+    while stack:
+        for v, _ in adjacency[stack.pop()]:
+            if v not in seen:
+                seen.add(v)
+                stack.append(v)
+    return seen
+
+
+def immediate_dominators(adjacency, start):
+    """Immediate dominator of every node reachable from start.
+
+    Iterative algorithm of Cooper, Harvey and Kennedy over an adjacency
+    list of (target, component) pairs; start dominates itself.
+    """
+    order = []
+    seen = {start}
+    stack = [(start, iter(adjacency[start]))]
+    while stack:
+        u, children = stack[-1]
+        for v, _ in children:
+            if v not in seen:
+                seen.add(v)
+                stack.append((v, iter(adjacency[v])))
+                break
+        else:
+            stack.pop()
+            order.append(u)
+    order.reverse()
+    rank = {u: k for k, u in enumerate(order)}
+    preds = {u: [] for u in order}
+    for u in order:
+        for v, _ in adjacency[u]:
+            preds[v].append(u)
+
+    idom = {start: start}
+    changed = True
+    while changed:
+        changed = False
+        for u in order[1:]:
+            new = None
+            for p in preds[u]:
+                if p not in idom:
+                    continue
+                if new is None:
+                    new = p
+                    continue
+                a, b = p, new
+                while a != b:
+                    while rank[a] > rank[b]:
+                        a = idom[a]
+                    while rank[b] > rank[a]:
+                        b = idom[b]
+                new = a
+            if idom.get(u) != new:
+                idom[u] = new
+                changed = True
+    return idom
+
+
+def paths_to_bitmasks(paths):
+    """Intern component names and encode each path as an integer bitmask.
+
+    Returns (names, masks) where bit i of a mask stands for names[i].
+    Components are numbered in order of first appearance in the paths.
+    """
+    index = {}
+    names = []
+    masks = []
+    for path in paths:
+        mask = 0
+        for comp in path:
+            if comp not in index:
+                index[comp] = len(names)
+                names.append(comp)
+            mask |= 1 << index[comp]
+        masks.append(mask)
+    return names, masks
+
+
+def mask_to_names(mask, names):
+    """Decode a component bitmask back into a list of component names"""
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(names[low.bit_length() - 1])
+        mask ^= low
+    return result
+
+
+def masks_by_order(masks):
+    """(order, masks) groups of a list of masks by their number of bits, lowest order first"""
+    by_order = {}
+    for mask in masks:
+        by_order.setdefault(mask.bit_count(), []).append(mask)
+    return sorted(by_order.items())
+
+
+def pack_masks(masks, width=None):
+    """Pack integer bitmasks into an (n × words) little-endian uint64 bit matrix.
+
+    Bit i of a mask goes to bit i % 64 of word i // 64. width is the number
+    of bits to make room for, by default the longest mask.
+    """
+    if width is None:
+        width = max((mask.bit_length() for mask in masks), default=0)
+    words = max(1, -(-width // 64))
+    if words == 1:
+        return np.array(masks, dtype='<u8').reshape(len(masks), 1)
+    data = b''.join(mask.to_bytes(8 * words, 'little') for mask in masks)
+    return np.frombuffer(data, dtype='<u8').reshape(len(masks), words)
+
+
+def _unpack_bits(packed, width):
+    """Boolean (rows × width) matrix of a packed bit matrix"""
+    return np.unpackbits(packed.view(np.uint8), axis=1, count=width, bitorder='little').view(bool)
+
+
+def remove_superset_masks(masks, stats=None):
+    """Drop duplicate masks and masks that contain another mask.
+
+    A path whose component set is a superset of another path never changes
+    which component sets are cut sets, so it can be removed up front.
+    Distinct masks with the same number of bits cannot contain each other,
+    so long lists are filtered one bit count at a time: all masks of a
+    count are tested at once against the minimal masks of the lower counts
+    with a vectorized AND/compare over their packed bit matrices.
+    stats, if given, is a dict whose 'subsumption_checks' entry is
+    increased by the number of mask pairs compared.
+    """
+    unique = sorted(set(masks), key=lambda m: (m.bit_count(), m))
+    if len(unique) >= VECTORIZE_MIN_MASKS:
+        minimal, checks = _remove_superset_packed(unique)
+    else:
+        minimal = []
+        checks = 0
+        for mask in unique:
+            for i, other in enumerate(minimal):
+                if mask & other == other:
+                    checks += i + 1
+                    break
+            else:
+                checks += len(minimal)
+                minimal.append(mask)
+    if stats is not None:
+        stats['subsumption_checks'] = stats.get('subsumption_checks', 0) + checks
+    return minimal
+
+
+def _remove_superset_packed(unique):
+    """remove_superset_masks on distinct masks sorted by bit count, with the bit matrix kernel.
+
+    A kept mask can only be inside a mask that has its rarest bit, so the
+    kept masks are filed under their rarest bit and every mask is compared
+    with the files of its own bits only, a small fraction of all pairs.
+    """
+    if unique[0] == 0:
+        return [0], len(unique) - 1  # the empty mask is inside every other one
+    width = max(mask.bit_length() for mask in unique)
+    packed = pack_masks(unique, width)
+    words = packed.shape[1]
+    counts = np.fromiter((mask.bit_count() for mask in unique), dtype=np.int64, count=len(unique))
+    starts = np.flatnonzero(np.diff(counts, prepend=-1)).tolist() + [len(unique)]
+    frequency = np.zeros(width, dtype=np.int64)
+    step = max(1, KERNEL_CHUNK_ELEMENTS // width)
+    for start in range(0, len(unique), step):
+        frequency += _unpack_bits(packed[start:start + step], width).sum(axis=0)
+
+    keep = np.ones(len(unique), dtype=bool)
+    files = {}  # bit: packed kept masks whose rarest bit it is
+    checks = 0
+    for start, end in zip(starts, starts[1:]):
+        level = packed[start:end]
+        bits = _unpack_bits(level, width)
+        covered = np.zeros(len(level), dtype=bool)
+        for bit, kept in files.items():
+            rows = np.flatnonzero(bits[:, bit] & ~covered)
+            if not len(rows):
+                continue
+            checks += len(rows) * len(kept)
+            step = max(1, KERNEL_CHUNK_ELEMENTS // (len(kept) * words))
+            for i in range(0, len(rows), step):
+                block = level[rows[i:i + step], None, :]
+                covered[rows[i:i + step]] |= ((block & kept) == kept).all(axis=2).any(axis=1)
+        keep[start:end] = ~covered
+
+        # Masks of equal bit count cannot contain each other, so the survivors are filed only now
+        survivors = np.flatnonzero(~covered)
+        rarest = np.where(bits[survivors], frequency, np.iinfo(np.int64).max).argmin(axis=1)
+        for bit in np.unique(rarest).tolist():
+            added = level[survivors[rarest == bit]]
+            files[bit] = np.concatenate([files[bit], added]) if bit in files else added
+    return [mask for mask, k in zip(unique, keep.tolist()) if k], checks
+
+
+def minimal_cut_set_masks(path_masks, max_order=None, stats=None):
+    """Find the minimal cut sets of a path family as bitmasks.
+
+    The minimal cut sets are the minimal hitting sets of the minimal paths.
+    They are enumerated by MOCUS-style expansion: pick the uncovered path
+    with the fewest candidate components and branch on each of them, with
+    the components of earlier branches excluded so that every cut set is
+    produced at most once. A leaf is kept only if each of its components
+    is the sole member of the cut on at least one path, which is exactly
+    the minimality condition, so no pairwise subsumption pass is needed.
+
+    Parameters:
+    ----------
+    path_masks : list of int
+            Success paths encoded as component bitmasks
+    max_order : int or None
+            Only return cut sets with at most this many components
+    stats : dict or None
+            Search counters to add to: 'subsumption_checks' in the path
+            filter, 'cut_set_branches' expanded and 'candidate_cut_sets'
+            tested for minimality, of which 'non_minimal_cut_sets' failed
+
+    Returns a list of masks sorted by order and then by component index.
+    """
+    return _expand_cut_sets(remove_superset_masks(path_masks, stats), max_order, stats=stats)[0]
+
+
+def iter_minimal_cut_set_orders(path_masks, max_order=None, stats=None):
+    """Yield (order, masks) with the minimal cut sets of each order in turn.
+
+    Iterative deepening over the same MOCUS expansion as
+    minimal_cut_set_masks: pass k searches up to order k and keeps the cut
+    sets of exactly that order. Since the number of branches grows with
+    the order, the repeated lower levels cost little compared with the
+    last pass, and the small cut sets, which dominate the unreliability,
+    are available long before a deep search finishes. Stops after the
+    first order at which no branch was cut short by the order limit, so
+    the last pass only confirms that nothing is left.
+    """
+    paths = remove_superset_masks(path_masks, stats)
+    if not paths:
+        return
+    order = 1
+    while max_order is None or order <= max_order:
+        masks, truncated = _expand_cut_sets(paths, order, min_order=order, stats=stats)
+        yield order, masks
+        if not truncated:
+            return
+        order += 1
+
+
+def _expand_cut_sets(paths, max_order=None, min_order=0, stats=None):
+    """MOCUS expansion behind minimal_cut_set_masks.
+
+    Returns (masks, truncated) with the minimal cut sets of order
+    min_order to max_order, and whether max_order stopped any branch.
+    """
+    if not paths:
+        return [], False
+
+    results = []
+    truncated = False
+    branches = 0
+    candidates = 0
+
+    def is_minimal(cut):
+        private = 0
+        for path in paths:
+            hit = path & cut
+            if hit & (hit - 1) == 0:
+                private |= hit
+        return private == cut
+
+    def expand(cut, forbidden, order):
+        nonlocal truncated, branches, candidates
+        branches += 1
+        last = max_order is not None and order == max_order - 1
+        best = None
+        best_count = 0
+        common = -1
+        for path in paths:
+            if path & cut:
+                continue
+            allowed = path & ~forbidden
+            if not allowed:
+                return  # this path can no longer be cut in this branch
+            if last:
+                # Only one more component may be added, so it has to
+                # hit every remaining path; deeper cut sets are cut short
+                truncated = True
+                common &= allowed
+                if not common:
+                    return
+                continue
+            count = allowed.bit_count()
+            if best is None or count < best_count:
+                best, best_count = allowed, count
+                if count == 1:
+                    break
+
+        if last and common != -1:
+            best = common
+        elif best is None:
+            if order >= min_order:
+                candidates += 1
+                if is_minimal(cut):
+                    results.append(cut)
+            return
+
+        if max_order is not None and order >= max_order:
+            truncated = True
+            return
+
+        while best:
+            bit = best & -best
+            expand(cut | bit, forbidden, order + 1)
+            forbidden |= bit
+            best ^= bit
+
+    expand(0, 0, 0)
+    if stats is not None:
+        for key, value in (('cut_set_branches', branches), ('candidate_cut_sets', candidates),
+                           ('non_minimal_cut_sets', candidates - len(results))):
+            stats[key] = stats.get(key, 0) + value
+
+    results.sort(key=_mask_sort_key)
+    return results, truncated
+
+
+def _mask_sort_key(mask):
+    """Sort cut set masks by order and then by component index"""
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length())
+        mask ^= low
+    return (len(bits), bits)
+
+
+def iter_path_masks(G, index, names, source='source', sink='sink'):
+    """Yield (mask, component_path) for every simple path from source to sink.
+
+    Paths are found one at a time by a depth-first search over the CSR
+    adjacency of the CompactGraph. Components are interned into
+    index (keyed on component id) and names as they are first met on a
+    path, so masks stay comparable across the whole stream.
+    """
+    G = as_compact(G)
+    if source not in G or sink not in G:
+        return
+    adjacency = G.adjacency()
+    comp_names = G.components
+    start, target = G.node_id[source], G.node_id[sink]
+    on_path = [False] * len(adjacency)
+    on_path[start] = True
+    nodes = [start]
+    comps = []
+    stack = [iter(adjacency[start])]
+    while stack:
+        step = next(stack[-1], None)
+        if step is None:
+            stack.pop()
+            on_path[nodes.pop()] = False
+            if comps:
+                comps.pop()
+            continue
+        v, c = step
+        if on_path[v]:
+            continue
+        if v == target:
+            mask = 0
+            for comp in comps + [c]:
+                bit = index.get(comp)
+                if bit is None:
+                    bit = index[comp] = len(names)
+                    names.append(comp_names[comp])
+                mask |= 1 << bit
+            yield mask, [comp_names[comp] for comp in comps] + [comp_names[c]]
+            continue
+        on_path[v] = True
+        nodes.append(v)
+        comps.append(c)
+        stack.append(iter(adjacency[v]))
+
+
+class PathEnumeration:
+    """
+    Streaming enumeration of the success paths of a diagram as bitmasks.
+    Only the integer bitmask of each path is stored (duplicates collapse),
+    so no list of node paths is ever built. Enumeration stops early once
+    max_paths paths have been seen or the stored masks take more than
+    max_memory_mb megabytes (approximately).
+    Parameters:
+    ----------
+    G : CompactGraph or networkx.DiGraph
+            Diagram whose edges carry a 'component' attribute
+    max_paths : int or None
+            Stop after this many paths
+    max_memory_mb : float or None
+            Stop once the stored masks exceed this size
+    keep_sequences : int
+            Number of paths kept as ordered component lists for display
+    Attributes:
+    ----------
+    names : list of str
+            Component name for each bit
+    masks : list of int
+            Distinct path bitmasks in the order they were found
+    sequences : list of list
+            The first keep_sequences paths as component names
+    count : int
+            Number of paths enumerated
+    complete : bool
+            False if a limit stopped the enumeration before the last path
+    stop_reason : str or None
+            Which limit was reached
+    """
+    # Rough per-path cost of the list slot and set entry around each mask
+    ENTRY_OVERHEAD_BYTES = 32
+
+    def __init__(self, G, source='source', sink='sink', max_paths=None, max_memory_mb=None, keep_sequences=0):
+        self.names = []
+        self.masks = []
+        self.sequences = []
+        self.count = 0
+        self.complete = True
+        self.stop_reason = None
+
+        max_bytes = None if max_memory_mb is None else max_memory_mb * 1024 * 1024
+        memory = 0
+        seen = set()
+        for mask, comp_path in iter_path_masks(G, {}, self.names, source, sink):
+            if max_paths is not None and self.count >= max_paths:
+                self.complete = False
+                self.stop_reason = f"path limit of {max_paths} reached"
+                break
+            if max_bytes is not None and memory > max_bytes:
+                self.complete = False
+                self.stop_reason = f"memory limit of {max_memory_mb} MB reached"
+                break
+
+            self.count += 1
+            if len(self.sequences) < keep_sequences:
+                self.sequences.append(comp_path)
+            if mask not in seen:
+                seen.add(mask)
+                self.masks.append(mask)
+                memory += sys.getsizeof(mask) + self.ENTRY_OVERHEAD_BYTES
+
+
+def is_graph_cut(G, cut_set, source='source', sink='sink'):
+    """Check on the graph itself that failing cut_set disconnects sink from source"""
+    G = as_compact(G)
+    failed = {G.component_id[comp] for comp in cut_set if comp in G.component_id}
+    adjacency = G.adjacency()
+    start, target = G.node_id[source], G.node_id[sink]
+    seen = {start}
+    stack = [start]
+    while stack:
+        for v, c in adjacency[stack.pop()]:
+            if v not in seen and c not in failed:
+                if v == target:
+                    return False
+                seen.add(v)
+                stack.append(v)
+    return True
+
+
+def count_paths(G, source='source', sink='sink'):
+    """Number of source→sink paths of an acyclic diagram, or None if it has a cycle.
+
+    Dynamic programming over a topological order, so the count costs
+    O(connections) however many paths there are.
+    """
+    G = as_compact(G)
+    if source not in G or sink not in G:
+        return 0
+    order = G.topological_order()
+    if order is None:
+        return None
+    adjacency = G.adjacency()
+    ways = [0] * G.number_of_nodes()
+    ways[G.node_id[source]] = 1
+    for u in order:
+        if ways[u]:
+            for v, _ in adjacency[u]:
+                ways[v] += ways[u]
+    return ways[G.node_id[sink]]
+
+
+def choose_cut_strategy(G, source='source', sink='sink', strategy='auto', max_order=None, max_paths=None):
+    """
+    Decide how the minimal cut sets of a diagram are found.
+    'auto' counts the paths first (count_paths): up to FLOW_PATH_THRESHOLD
+    of them, or up to max_paths, are enumerated and give the cut sets,
+    while with more the cut sets are searched on the graph by FlowCutSearch,
+    which never touches the paths. The simple paths of a cyclic diagram
+    cannot be counted that way, so it takes the flow search only when the
+    cut sets are capped by max_order.
+    Returns:
+    -------
+    (strategy, reason) with strategy 'paths' or 'flow' and the reason as a sentence
+    """
+    if strategy not in CUT_STRATEGIES:
+        raise ValueError(f"Unknown cut set strategy '{strategy}', expected one of {', '.join(CUT_STRATEGIES)}")
+    if strategy != 'auto':
+        return strategy, "requested"
+    count = count_paths(G, source, sink)
+    if count is None:
+        if max_order is not None:
+            return 'flow', f"cyclic diagram with cut sets up to order {max_order}: searched without paths"
+        return 'paths', "cyclic diagram, so the paths cannot be counted up front"
+    limit = FLOW_PATH_THRESHOLD if max_paths is None else min(max_paths, FLOW_PATH_THRESHOLD)
+    if count <= limit:
+        return 'paths', f"{count} path{'s' if count != 1 else ''}, few enough to enumerate"
+    shown = f"{count}" if count < 10 ** 9 else f"more than 10^{len(str(count)) - 1}"
+    return 'flow', f"{shown} paths, too many to enumerate: cut sets searched with max-flow bounds"
+
+
+class FlowCutSearch:
+    """
+    Minimal cut sets found on the graph itself, without enumerating paths.
+    Every branch of the search fails some components and forbids others
+    (those its earlier sibling branches failed, so no cut set is found
+    twice). While the sink can still be reached, any cut has to break the
+    surviving path with the fewest components the branch may still fail,
+    found by 0-1 breadth-first search, so the search branches on those.
+    Under an order cap, a max-flow over the surviving connections, with
+    the forbidden ones uncuttable, bounds how many more components a
+    branch needs, and branches that cannot finish in time are dropped.
+    So the few low-order cut sets of a wide diagram are found with work
+    that grows with the number of cuts, not with the number of paths.
+    Parameters:
+    ----------
+    G : CompactGraph or networkx.DiGraph
+            Diagram whose edges carry a 'component' attribute
+    Attributes:
+    ----------
+    names : list of str
+            Component name for each bit of the cut set masks
+    """
+    def __init__(self, G, source='source', sink='sink'):
+        G = as_compact(G)
+        self.names = []
+        index = {}
+        self._edges = []  # (u, v, component bit)
+        for u, v, c in G.edge_ids():
+            if c not in index:
+                index[c] = len(self.names)
+                self.names.append(G.components[c])
+            self._edges.append((u, v, 1 << index[c]))
+        self._out = [[] for _ in range(G.number_of_nodes())]
+        for i, (u, _, _) in enumerate(self._edges):
+            self._out[u].append(i)
+        self._source = G.node_id[source]
+        self._sink = G.node_id[sink]
+        # Failing one component removes this many connections at most
+        self._multiplicity = max(Counter(bit for _, _, bit in self._edges).values(), default=1)
+
+    def reaches(self, failed=0):
+        """Whether the sink can be reached with the components in the failed mask down"""
+        seen = [False] * len(self._out)
+        seen[self._source] = True
+        stack = [self._source]
+        while stack:
+            for i in self._out[stack.pop()]:
+                _, v, bit = self._edges[i]
+                if not seen[v] and not bit & failed:
+                    if v == self._sink:
+                        return True
+                    seen[v] = True
+                    stack.append(v)
+        return False
+
+    def _cheapest_path(self, failed, forbidden):
+        """(cost, bits) of the surviving path with the fewest connections that are not forbidden.
+
+        bits are the distinct components on it that may still fail, in path
+        order. Returns None if the failed components cut the sink off.
+        """
+        n = len(self._out)
+        cost = [n + 1] * n
+        via = [None] * n
+        cost[self._source] = 0
+        queue = deque([self._source])
+        while queue:
+            u = queue.popleft()
+            for i in self._out[u]:
+                _, v, bit = self._edges[i]
+                if bit & failed:
+                    continue
+                step = 0 if bit & forbidden else 1
+                if cost[u] + step < cost[v]:
+                    cost[v] = cost[u] + step
+                    via[v] = i
+                    if step:
+                        queue.append(v)
+                    else:
+                        queue.appendleft(v)
+        if via[self._sink] is None:
+            return None
+        bits = []
+        v = self._sink
+        while v != self._source:
+            u, _, bit = self._edges[via[v]]
+            if not bit & forbidden and bit not in bits:
+                bits.append(bit)
+            v = u
+        bits.reverse()
+        return cost[self._sink], bits
+
+    def _max_flow(self, failed, forbidden, limit):
+        """Source→sink max-flow, stopped at limit: one unit per connection, forbidden ones uncuttable"""
+        heads = []
+        capacity = []
+        arcs = [[] for _ in self._out]
+        for u, v, bit in self._edges:
+            if bit & failed:
+                continue
+            arcs[u].append(len(heads))
+            heads.append(v)
+            capacity.append(limit if bit & forbidden else 1)
+            arcs[v].append(len(heads))
+            heads.append(u)
+            capacity.append(0)
+
+        flow = 0
+        while flow < limit:
+            via = {self._source: None}
+            queue = deque([self._source])
+            while queue and self._sink not in via:
+                u = queue.popleft()
+                for a in arcs[u]:
+                    v = heads[a]
+                    if capacity[a] and v not in via:
+                        via[v] = a
+                        queue.append(v)
+            if self._sink not in via:
+                break
+            path = []
+            v = self._sink
+            while via[v] is not None:
+                path.append(via[v])
+                v = heads[via[v] ^ 1]
+            push = min(min(capacity[a] for a in path), limit - flow)
+            for a in path:
+                capacity[a] -= push
+                capacity[a ^ 1] += push
+            flow += push
+        return flow
+
+    def _is_minimal(self, cut):
+        """A cut is minimal if the sink is reachable again when any one of its components works"""
+        rest = cut
+        while rest:
+            bit = rest & -rest
+            if not self.reaches(cut ^ bit):
+                return False
+            rest ^= bit
+        return True
+
+    def _search(self, max_order=None, min_order=0, stats=None):
+        """Minimal cut sets of order min_order to max_order, and whether max_order stopped any branch"""
+        results = []
+        truncated = False
+        counts = Counter()
+
+        def expand(failed, forbidden, order):
+            nonlocal truncated
+            counts['cut_set_branches'] += 1
+            found = self._cheapest_path(failed, forbidden)
+            if found is None:
+                if order >= min_order:
+                    counts['candidate_cut_sets'] += 1
+                    if self._is_minimal(failed):
+                        results.append(failed)
+                    else:
+                        counts['non_minimal_cut_sets'] += 1
+                return
+            cost, bits = found
+            if cost == 0:
+                return  # a path of forbidden components survives every cut of this branch
+            if max_order is not None:
+                budget = max_order - order
+                if budget == 0:
+                    truncated = True
+                    return
+                # Each more component cuts at most _multiplicity units of flow
+                counts['max_flow_bounds'] += 1
+                flow = self._max_flow(failed, forbidden, budget * self._multiplicity + 1)
+                if -(-flow // self._multiplicity) > budget:
+                    truncated = True
+                    return
+            for bit in bits:
+                expand(failed | bit, forbidden, order + 1)
+                forbidden |= bit
+
+        if self.reaches():
+            expand(0, 0, 0)
+        if stats is not None:
+            for key, value in counts.items():
+                stats[key] = stats.get(key, 0) + value
+        results.sort(key=_mask_sort_key)
+        return results, truncated
+
+    def cut_set_masks(self, max_order=None, stats=None):
+        """Minimal cut sets up to max_order as bitmasks, sorted by order and component index.
+
+        stats works as for minimal_cut_set_masks, with 'max_flow_bounds' added.
+        """
+        return self._search(max_order, stats=stats)[0]
+
+    def iter_cut_set_orders(self, max_order=None, stats=None):
+        """Yield (order, masks) order by order, by iterative deepening as in iter_minimal_cut_set_orders"""
+        order = 1
+        while max_order is None or order <= max_order:
+            masks, truncated = self._search(order, order, stats)
+            yield order, masks
+            if not truncated:
+                return
+            order += 1
+
+    def most_reliable_path(self, q_vector):
+        """Mask of the path with the highest probability of working (Dijkstra on -log(1 - q)).
+
+        q_vector is indexed by bit; arrays (one value per scenario) are
+        averaged to choose the path.
+        """
+        weight = [-math.log(max(1 - float(np.mean(q)), 1e-300)) for q in q_vector]
+        best = [math.inf] * len(self._out)
+        via = [None] * len(self._out)
+        best[self._source] = 0.0
+        heap = [(0.0, self._source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > best[u]:
+                continue
+            if u == self._sink:
+                break
+            for i in self._out[u]:
+                _, v, bit = self._edges[i]
+                nd = d + weight[bit.bit_length() - 1]
+                if nd < best[v]:
+                    best[v] = nd
+                    via[v] = i
+                    heapq.heappush(heap, (nd, v))
+        mask = 0
+        v = self._sink
+        while via[v] is not None:
+            u, _, bit = self._edges[via[v]]
+            mask |= bit
+            v = u
+        return mask
+
+
+def reduce_series_parallel(G, components, source='source', sink='sink', default_prob=DEFAULT_FAILURE_PROB):
+    """Collapse series chains and parallel branches of an RBD into super-components.
+
+    Works on dict copies of G's adjacency. Nodes that are not on any source→sink route are
+    dropped first. Then every inner node with exactly one incoming and one
+    outgoing connection is replaced by a single series connection, and a
+    connection that duplicates an existing one is merged with it in
+    parallel. Only components used on a single connection are merged,
+    since a shared component fails on all of its connections at once.
+
+    Parameters:
+    ----------
+    G : CompactGraph or networkx.DiGraph
+            Diagram whose edges carry a 'component' attribute
+    components : dict
+            Component name to failure probability
+    Returns:
+    -------
+    (reduced, probs, blocks) where reduced is the reduced CompactGraph, probs maps
+    every component and block name to its failure probability, and blocks
+    maps each block name to (kind, members) with kind 'series' or 'parallel'.
+    """
+    G = as_compact(G)
+    s, t = G.node_id.get(source), G.node_id.get(sink)
+    forward = [[] for _ in G.nodes]
+    backward = [[] for _ in G.nodes]
+    for u, v, c in G.edge_ids():
+        # Connections into the source or out of the sink are never used
+        if v != s and u != t:
+            forward[u].append((v, c))
+            backward[v].append((u, c))
+
+    # Drop nodes that cannot be on a route from source to sink
+    if s is not None and t is not None:
+        live = reachable_nodes(forward, s) & reachable_nodes(backward, t)
+    else:
+        live = set()
+    keep = [n for n in range(len(G.nodes)) if n in live or n in (s, t)]
+    succ = {u: {v: G.components[c] for v, c in forward[u] if v in live} for u in keep}
+    pred = {v: {u: G.components[c] for u, c in backward[v] if u in live} for v in keep}
+
+    probs = dict(components)
+    blocks = {}
+    next_index = 1
+    uses = {}
+    for targets in succ.values():
+        for comp in targets.values():
+            uses[comp] = uses.get(comp, 0) + 1
+
+    def prob(name):
+        return probs.get(name, default_prob)
+
+    def combine(kind, first, second):
+        # Flatten nested blocks of the same kind into one block
+        members = []
+        for name in (first, second):
+            if name in blocks and blocks[name][0] == kind:
+                members.extend(blocks.pop(name)[1])
+            else:
+                members.append(name)
+        q = block_probability(kind, [prob(name) for name in members])
+        nonlocal next_index
+        prefix = 'S' if kind == 'series' else 'P'
+        name = f"#{prefix}{next_index}"
+        while name in probs:
+            next_index += 1
+            name = f"#{prefix}{next_index}"
+        next_index += 1
+        probs[name] = q
+        blocks[name] = (kind, members)
+        uses[name] = 1
+        return name
+
+    def remove_node(v):
+        for w in succ.pop(v):
+            del pred[w][v]
+        for u in pred.pop(v):
+            del succ[u][v]
+
+    pending = [n for n in succ if n not in (s, t)]
+    while pending:
+        v = pending.pop()
+        if v not in succ or len(pred[v]) != 1 or len(succ[v]) != 1:
+            continue
+        u = next(iter(pred[v]))
+        w = next(iter(succ[v]))
+        if u == w:
+            # v only forms a loop with u and lies on no simple path
+            remove_node(v)
+            pending.append(u)
+            continue
+
+        first = succ[u][v]
+        second = succ[v][w]
+        if uses[first] != 1 or uses[second] != 1:
+            continue
+        existing = succ[u].get(w)
+        if existing is not None and uses[existing] != 1:
+            continue
+
+        remove_node(v)
+        merged = combine('series', first, second)
+        if existing is not None:
+            merged = combine('parallel', existing, merged)
+        succ[u][w] = pred[w][u] = merged
+        pending.extend(n for n in (u, w) if n not in (s, t))
+
+    H = CompactGraph()
+    for n in succ:
+        H.add_node(G.nodes[n])
+    for u, targets in succ.items():
+        for w, comp in targets.items():
+            if comp not in H.component_id:
+                H.add_component(comp, prob(comp))
+            H.add_edge(G.nodes[u], G.nodes[w], comp)
+    return H, probs, blocks
+
+
+def block_probability(kind, member_probs):
+    """Failure probability of a series or parallel block of independent members.
+
+    Works on floats and equally on NumPy arrays of probabilities.
+    """
+    if kind == 'series':
+        works = 1.0
+        for q in member_probs:
+            works = works * (1 - q)
+        return 1 - works
+    failed = 1.0
+    for q in member_probs:
+        failed = failed * q
+    return failed
+
+
+def block_components(name, blocks):
+    """List the original component names behind a (possibly nested) block"""
+    if name not in blocks:
+        return [name]
+    result = []
+    for member in blocks[name][1]:
+        result.extend(block_components(member, blocks))
+    return result
+
+
+def expand_block_masks(masks, names, blocks, components):
+    """Minimal cut sets over the original components behind cut sets over blocks.
+
+    masks are cut sets over names, which may include blocks of
+    reduce_series_parallel. A series block fails with any one of its
+    members and a parallel block only with all of them, so a cut set stands
+    for every combination of one minimal cut set per block it contains.
+    Returns the minimal ones as masks over the bits of components, which
+    must list every original component behind names.
+    """
+    bits = {name: 1 << i for i, name in enumerate(components)}
+    expansions = {}
+
+    def expand(name):
+        # Minimal cut sets of one component or (nested) block
+        if name not in expansions:
+            if name not in blocks:
+                expansions[name] = [bits[name]]
+            elif blocks[name][0] == 'series':
+                expansions[name] = [mask for member in blocks[name][1] for mask in expand(member)]
+            else:
+                combos = [0]
+                for member in blocks[name][1]:
+                    combos = [combo | mask for combo in combos for mask in expand(member)]
+                expansions[name] = combos
+        return expansions[name]
+
+    expanded = []
+    for mask in masks:
+        combos = [0]
+        for name in mask_to_names(mask, names):
+            combos = [combo | part for combo in combos for part in expand(name)]
+        expanded.extend(combos)
+    return remove_superset_masks(expanded)
+
+
+def voting_probability(k, member_probs):
+    """Failure probability of a k-out-of-n block: fewer than k of its independent members work.
+
+    Dynamic programming over the members, O(n·k), instead of enumerating
+    the combinations of working members. A 1-out-of-n block is a parallel
+    bundle and an n-out-of-n block a series chain. Works on floats and
+    equally on NumPy arrays of probabilities.
+    """
+    if k <= 0:
+        return 0.0
+    # working[j]: probability that exactly j of the members so far work, for j < k
+    working = [1.0] + [0.0] * (k - 1)
+    for q in member_probs:
+        for j in range(k - 1, 0, -1):
+            working[j] = working[j] * q + working[j - 1] * (1 - q)
+        working[0] = working[0] * q
+    return sum(working)
+
+
+def voting_gradient(k, member_probs):
+    """Derivative of voting_probability with respect to each member's failure probability.
+
+    A k-out-of-n block is linear in each qᵢ, and the derivative is the
+    probability that exactly k - 1 of the other members work. That comes
+    from the working-count distributions of the members before and after i,
+    so all n derivatives together cost O(n·k).
+    """
+    n = len(member_probs)
+    if k <= 0:
+        return [0.0] * n
+
+    def step(previous, q):
+        # Working-count distribution, for counts below k, after one more member
+        return [previous[0] * q] + [previous[j] * q + previous[j - 1] * (1 - q) for j in range(1, k)]
+
+    # after[i]: distribution over the last i members; the one over the members before i is rolled forward
+    after = [[1.0] + [0.0] * (k - 1)]
+    for q in reversed(member_probs[1:]):
+        after.append(step(after[-1], q))
+    before = after[0]
+    grads = []
+    for i, q in enumerate(member_probs):
+        rest = after[n - 1 - i]
+        grads.append(sum(before[j] * rest[k - 1 - j] for j in range(k)))
+        before = step(before, q)
+    return grads
+
+
+def validate_voting(name, spec, components):
+    """Check a k-out-of-n block spec and return it as {'k': int, 'members': list}.
+
+    A spec is a dict with 'k' and the list of 'members', each a component
+    in components. Members are ordinary components with their own failure
+    probabilities and lifetimes, but they are only used through the block.
+    """
+    members = [str(member) for member in spec.get('members', [])]
+    if not members:
+        raise ValueError(f"Voting block '{name}' has no members")
+    if len(set(members)) != len(members):
+        raise ValueError(f"Voting block '{name}' lists a member twice")
+    for member in members:
+        if member not in components:
+            raise ValueError(f"Voting block '{name}' uses unknown component '{member}'")
+    if name in components:
+        raise ValueError(f"Voting block '{name}' has the name of a component")
+    try:
+        k = int(spec['k'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Voting block '{name}' needs a whole number 'k'")
+    if not 1 <= k <= len(members):
+        raise ValueError(f"Voting block '{name}' needs 1 <= k <= {len(members)}, got {k}")
+    return {'k': k, 'members': members}
+
+
+def voting_blocks(G):
+    """The k-out-of-n blocks of a diagram, from G.graph['voting']"""
+    return getattr(G, 'graph', {}).get('voting', {})
+
+
+def with_voting(G, components, default_prob=DEFAULT_FAILURE_PROB):
+    """components plus the failure probability of every k-out-of-n block of G.
+
+    The engines treat a block as one component on its connections, which
+    is exact because its members are independent and used nowhere else;
+    raises ValueError when a member is also used on a connection or in a
+    second block.
+    """
+    voting = voting_blocks(G)
+    if not voting:
+        return components
+    G = as_compact(G)
+    uses = G.component_uses()
+    owner = {}
+    probs = dict(components)
+    for name, spec in voting.items():
+        for member in spec['members']:
+            if member in owner:
+                raise ValueError(f"Component '{member}' is in both voting blocks '{owner[member]}' and '{name}'")
+            owner[member] = name
+            comp = G.component_id.get(member)
+            if comp is not None and uses[comp]:
+                raise ValueError(f"Component '{member}' is a member of voting block '{name}' "
+                                 f"and cannot also be used on a connection")
+        probs[name] = voting_probability(spec['k'], [components.get(m, default_prob) for m in spec['members']])
+    return probs
+
+
+def voting_importance_gradients(grads, voting, components):
+    """Add the derivative for every member of the voting blocks in grads, by the chain rule"""
+    for name, spec in voting.items():
+        if name in grads:
+            member_probs = [components.get(m, DEFAULT_FAILURE_PROB) for m in spec['members']]
+            for member, g in zip(spec['members'], voting_gradient(spec['k'], member_probs)):
+                grads[member] = grads.get(member, 0.0) + grads[name] * g
+    return grads
+
+
+def validate_ccf(name, spec, components):
+    """Check a common-cause group spec and return it as {'beta': float, 'members': list}.
+
+    A spec is a dict with the beta factor 'beta' and the list of at least
+    two 'members', each a component in components.
+    """
+    members = [str(member) for member in spec.get('members', [])]
+    if len(members) < 2:
+        raise ValueError(f"Common-cause group '{name}' needs at least two members")
+    if len(set(members)) != len(members):
+        raise ValueError(f"Common-cause group '{name}' lists a member twice")
+    for member in members:
+        if member not in components:
+            raise ValueError(f"Common-cause group '{name}' uses unknown component '{member}'")
+    if name in components:
+        raise ValueError(f"Common-cause group '{name}' has the name of a component")
+    try:
+        beta = float(spec['beta'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Common-cause group '{name}' needs a 'beta' factor")
+    if not 0 <= beta <= 1:
+        raise ValueError(f"Invalid beta factor for common-cause group '{name}': {beta}")
+    return {'beta': beta, 'members': members}
+
+
+def ccf_groups(G):
+    """The common-cause failure groups of a diagram, from G.graph['ccf']"""
+    return getattr(G, 'graph', {}).get('ccf', {})
+
+
+def ccf_scenarios(ccf, components, default_prob=DEFAULT_FAILURE_PROB):
+    """
+    Split common-cause groups into independent events (beta-factor model).
+    A group with factor β whose members have total failure probabilities qᵢ
+    gets a common-cause event of probability p = β·min qᵢ that fails every
+    member at once, and each member keeps an independent failure of
+    probability (qᵢ - p) / (1 - p), so that its total failure probability is
+    still qᵢ. Once it is known which events occurred, all components are
+    independent again, so the exact engines evaluate their unchanged
+    structure (cut sets, BDD) for each of the 2^m combinations of the m
+    events and weight the results. Works on floats and equally on NumPy
+    arrays of probabilities.
+    Returns:
+    -------
+    (events, independent, scenarios): the probability of each group's
+    common-cause event, the independent failure probability of each member,
+    and a list of (weight, occurred, probs) with the probability of one
+    combination, the set of groups whose event occurred in it and the
+    failure probability of every member in it
+    """
+    if len(ccf) > CCF_GROUP_LIMIT:
+        raise ValueError(f"At most {CCF_GROUP_LIMIT} common-cause groups are supported, got {len(ccf)}")
+    events = {}
+    independent = {}
+    owner = {}
+    for name, spec in ccf.items():
+        member_probs = [components.get(m, default_prob) for m in spec['members']]
+        p = spec['beta'] * reduce(np.minimum, member_probs)
+        events[name] = p
+        for member, q in zip(spec['members'], member_probs):
+            if member in owner:
+                raise ValueError(f"Component '{member}' is in both common-cause groups '{owner[member]}' and '{name}'")
+            owner[member] = name
+            # Where p = 1 every member has q = 1, and the independent part no longer matters
+            independent[member] = (q - p) / np.maximum(1 - p, 1e-300)
+
+    scenarios = []
+    for combo in product((False, True), repeat=len(ccf)):
+        weight = 1.0
+        occurred = set()
+        probs = {}
+        for (name, spec), happened in zip(ccf.items(), combo):
+            weight = weight * (events[name] if happened else 1 - events[name])
+            if happened:
+                occurred.add(name)
+            for member in spec['members']:
+                probs[member] = 1.0 if happened else independent[member]
+        scenarios.append((weight, occurred, probs))
+    return events, independent, scenarios
+
+
+def ccf_scenario_arrays(ccf, components, default_prob=DEFAULT_FAILURE_PROB):
+    """ccf_scenarios of scalar probabilities, stacked into arrays over the scenarios.
+
+    Returns (events, independent, weights, occurred, probs) where weights is
+    an array with one entry per scenario, occurred maps each group to a
+    boolean array of the scenarios with its event, and probs is components
+    with every member's failure probability an array over the scenarios.
+    """
+    events, independent, scenarios = ccf_scenarios(ccf, components, default_prob)
+    weights = np.array([float(weight) for weight, _, _ in scenarios])
+    occurred = {name: np.array([name in happened for _, happened, _ in scenarios]) for name in ccf}
+    probs = dict(components)
+    for member in independent:
+        probs[member] = np.array([float(row[member]) for _, _, row in scenarios])
+    return events, independent, weights, occurred, probs
+
+
+def expected_value(value, weights):
+    """Weighted mean of a per-scenario value, or the value itself when there are no scenarios"""
+    if weights is None:
+        return value
+    return float(np.dot(weights, np.broadcast_to(value, weights.shape)))
+
+
+def expected_values(values, weights):
+    """expected_value of every row of an array (one row per item), as a list of numbers"""
+    if weights is None or not len(values):
+        return values.tolist()
+    rows = np.broadcast_to(values.reshape(len(values), -1), (len(values), len(weights)))
+    return (rows @ weights).tolist()
+
+
+def bdd_variable_order(cut_masks):
+    """Choose a BDD variable order for a family of cut sets.
+
+    Components are taken in order of first appearance in the cut sets,
+    lowest order first, so the members of each small cut set sit next to
+    each other. This keeps series/parallel structure local in the diagram.
+    """
+    order = []
+    seen = 0
+    for mask in sorted(cut_masks, key=lambda m: (m.bit_count(), m)):
+        new_bits = mask & ~seen
+        while new_bits:
+            low = new_bits & -new_bits
+            order.append(low.bit_length() - 1)
+            new_bits ^= low
+        seen |= mask
+    return order
+
+
+class FailureBDD:
+    """
+    Reduced ordered binary decision diagram of the system failure function.
+    The failure function is the OR over the cut sets of the AND of their
+    component failures. The diagram is built by Shannon expansion of the
+    cut set family, with a unique table so that equal sub-functions share
+    one node and a computed cache keyed on the remaining family. Families
+    are kept to their minimal sets, so that the key of a sub-function does
+    not depend on which redundant supersets the expansion happened to leave.
+    Parameters:
+    ----------
+    cut_masks : list of int
+            Cut sets encoded as component bitmasks
+    order : list of int or None
+            Bit indices in the order they are tested, defaults to bdd_variable_order
+    Attributes:
+    ----------
+    nodes : list of tuple
+            (bit, low, high) triples; ids 0 and 1 are the False/True terminals.
+            Children always have smaller ids than their parents.
+    root : int
+            Id of the node representing the whole failure function
+    """
+    def __init__(self, cut_masks, order=None):
+        self.order = bdd_variable_order(cut_masks) if order is None else list(order)
+        self.nodes = [None, None]
+        self._unique = {}
+        self._computed = {}
+        self._level_bits = [1 << bit for bit in self.order]
+        self.root = self._build(frozenset(remove_superset_masks(cut_masks)), 0)
+        self._computed.clear()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _make_node(self, bit, low, high):
+        if low == high:
+            return low
+        key = (bit, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self._unique[key] = node
+        return node
+
+    def _build(self, family, level):
+        if not family:
+            return 0
+        if 0 in family:
+            return 1  # a cut set with every component already failed
+
+        node = self._computed.get(family)
+        if node is not None:
+            return node
+
+        # Skip variables that no remaining cut set depends on
+        union = 0
+        for mask in family:
+            union |= mask
+        while not union & self._level_bits[level]:
+            level += 1
+        var = self._level_bits[level]
+
+        # Component works: only cut sets without it can still occur
+        low = self._build(frozenset(m for m in family if not m & var), level + 1)
+        # Component failed: it no longer needs to be part of any cut set, and
+        # dropping it can make some cut sets contain others
+        high = self._build(frozenset(remove_superset_masks([m & ~var for m in family])), level + 1)
+
+        node = self._make_node(self.order[level], low, high)
+        self._computed[family] = node
+        return node
+
+    def probability(self, probs):
+        """Probability that the failure function is true.
+
+        probs[i] is the failure probability of the component on bit i.
+        Runs in time linear in the number of nodes.
+        """
+        values = [0.0, 1.0]
+        for bit, low, high in self.nodes[2:]:
+            q = probs[bit]
+            values.append(q * values[high] + (1 - q) * values[low])
+        return values[self.root]
+
+    def gradient(self, probs):
+        """Probability of failure and its partial derivative for every bit.
+
+        A forward pass computes the value of each node and a backward pass
+        the probability of reaching each node from the root, so all
+        derivatives (Birnbaum importances) cost two passes over the nodes.
+        Returns (probability, {bit: derivative}).
+        """
+        values = [0.0, 1.0]
+        for bit, low, high in self.nodes[2:]:
+            q = probs[bit]
+            values.append(q * values[high] + (1 - q) * values[low])
+
+        reach = [0.0] * len(self.nodes)
+        reach[self.root] = 1.0
+        grads = {}
+        # Parents always have larger ids than their children
+        for node in range(len(self.nodes) - 1, 1, -1):
+            r = reach[node]
+            if not isinstance(r, np.ndarray) and not r:
+                continue  # not reached from the root
+            bit, low, high = self.nodes[node]
+            q = probs[bit]
+            reach[high] += r * q
+            reach[low] += r * (1 - q)
+            grads[bit] = grads.get(bit, 0.0) + r * (values[high] - values[low])
+        return values[self.root], grads
+
+    # Upper bound on node values held at once by probability_array, to
+    # keep the working set of large sweeps in memory
+    ARRAY_WORKING_SET = 4000000
+
+    def probability_array(self, probs):
+        """Probability of failure for many probability vectors at once.
+
+        probs is a (rows × bits) array; column i holds the failure
+        probabilities of the component on bit i. Rows are evaluated in
+        chunks, each with one vectorized pass over the nodes.
+        """
+        probs = np.asarray(probs, dtype=float)
+        rows = probs.shape[0]
+        result = np.empty(rows)
+        chunk = max(1, self.ARRAY_WORKING_SET // len(self.nodes))
+        for start in range(0, rows, chunk):
+            block = probs[start:start + chunk]
+            values = [np.zeros(len(block)), np.ones(len(block))]
+            for bit, low, high in self.nodes[2:]:
+                q = block[:, bit]
+                values.append(values[low] + q * (values[high] - values[low]))
+            result[start:start + chunk] = values[self.root]
+        return result
+
+
+def cut_set_unreliability(cut_sets, probs, default_prob=DEFAULT_FAILURE_PROB):
+    """Exact probability that at least one of cut_sets fails, through a FailureBDD"""
+    if not cut_sets:
+        return 0.0
+    names, cut_masks = paths_to_bitmasks(cut_sets)
+    bdd = FailureBDD(cut_masks)
+    return bdd.probability([probs.get(comp, default_prob) for comp in names])
+
+
+def monte_carlo_reliability(G, probs, source='source', sink='sink', seed=None, batch_size=100000,
+                            target_rel_error=0.01, max_samples=10000000, confidence=0.95, default_prob=DEFAULT_FAILURE_PROB,
+                            scenario_weights=None):
+    """Estimate system reliability by vectorized Monte Carlo simulation.
+
+    Component states are drawn in batches as a (components × samples)
+    boolean array. Reachability from the source is then propagated along
+    the connections for the whole batch at once: in topological order for
+    acyclic diagrams, and by repeated relaxation until nothing changes
+    otherwise. Sampling stops when the confidence interval half-width of
+    the unreliability is within target_rel_error of the estimate, or after
+    max_samples samples.
+
+    probs maps component names to failure probabilities; None uses the
+    probabilities stored in the CompactGraph. With scenario_weights, the
+    probabilities may be arrays with one entry per scenario (see
+    ccf_scenario_arrays), and each sample first draws its scenario.
+
+    Returns a dict with the reliability estimate and its confidence
+    interval, the number of samples and failures, the seed (generated if
+    not given, so the run can be repeated), samples per second, and
+    whether the target error was reached.
+    """
+    if max_samples < 1:
+        raise ValueError(f"max_samples must be at least 1, got {max_samples}")
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % (2 ** 63))
+    rng = np.random.default_rng(seed)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    G = as_compact(G)
+    if probs is None:
+        probs = dict(zip(G.components, G.prob.tolist()))
+    adjacency = G.adjacency()
+    comp_index = {}
+    edges = []
+    node_order = G.topological_order()
+    acyclic = node_order is not None
+    if not acyclic:
+        # Nodes the source cannot reach never matter; breadth-first order
+        node_order = [G.node_id[source]]
+        seen = set(node_order)
+        for u in node_order:
+            for v, _ in adjacency[u]:
+                if v not in seen:
+                    seen.add(v)
+                    node_order.append(v)
+    for u in node_order:
+        for v, c in adjacency[u]:
+            if c not in comp_index:
+                comp_index[c] = len(comp_index)
+            edges.append((u, v, comp_index[c]))
+    if scenario_weights is None:
+        q = np.array([probs.get(G.components[c], default_prob) for c in comp_index], dtype=float)
+    else:
+        scenario_weights = np.asarray(scenario_weights, dtype=float) / np.sum(scenario_weights)
+        q = np.array([np.broadcast_to(probs.get(G.components[c], default_prob), scenario_weights.shape)
+                      for c in comp_index], dtype=float).reshape(len(comp_index), len(scenario_weights))
+
+    samples = 0
+    failures = 0
+    start = time.perf_counter()
+    while samples < max_samples:
+        n = min(batch_size, max_samples - samples)
+        if scenario_weights is None:
+            works = rng.random((len(q), n)) >= q[:, None]
+        else:
+            scenario = rng.choice(len(scenario_weights), size=n, p=scenario_weights)
+            works = rng.random((len(q), n)) >= q[:, scenario]
+        reach = np.zeros((G.number_of_nodes(), n), dtype=bool)
+        reach[G.node_id[source]] = True
+        changed = True
+        while changed:
+            changed = False
+            for u, v, c in edges:
+                update = reach[u] & works[c] & ~reach[v]
+                if update.any():
+                    reach[v] |= update
+                    changed = True
+            if acyclic:
+                break  # one pass in topological order is final
+        failures += n - int(np.count_nonzero(reach[G.node_id[sink]]))
+        samples += n
+
+        # Wilson score interval for the unreliability
+        q_hat = failures / samples
+        denom = 1 + z * z / samples
+        centre = (q_hat + z * z / (2 * samples)) / denom
+        half = z * math.sqrt(q_hat * (1 - q_hat) / samples + z * z / (4 * samples * samples)) / denom
+        if failures and half <= target_rel_error * q_hat:
+            break
+    elapsed = time.perf_counter() - start
+
+    return {
+        'reliability': 1 - q_hat,
+        'ci_low': 1 - min(1.0, centre + half),
+        'ci_high': 1 - max(0.0, centre - half),
+        'confidence': confidence,
+        'rel_error': half / q_hat if failures else float('inf'),
+        'samples': samples,
+        'failures': failures,
+        'seed': seed,
+        'samples_per_sec': samples / elapsed if elapsed > 0 else float('inf'),
+        'converged': bool(failures) and half <= target_rel_error * q_hat,
+    }
+
+
+def find_minimal_cut_sets(paths, max_order=None, names=None):
+    """Find minimal cut sets from the system paths, optionally up to max_order components.
+
+    paths are lists of component names, or bitmasks over names when names is given.
+    """
+    if names is None:
+        names, paths = paths_to_bitmasks(paths)
+    return [mask_to_names(mask, names) for mask in minimal_cut_set_masks(paths, max_order)]
+
+
+def cut_set_probability(cut_set, probs, default_prob=DEFAULT_FAILURE_PROB):
+    """Probability that every component of a cut set fails"""
+    prob = 1.0
+    for comp in cut_set:
+        prob *= probs.get(comp, default_prob)
+    return prob
+
+
+def calc_system_unreliability_from_cut_sets(min_cut_sets, probs, default_prob=DEFAULT_FAILURE_PROB):
+    """Calculate system unreliability from minimal cut sets using a BDD"""
+    return min(max(cut_set_unreliability(min_cut_sets, probs, default_prob), 0.0), 1.0)
+
+
+def calc_system_unreliability_inclusion_exclusion(min_cut_sets, probs, default_prob=DEFAULT_FAILURE_PROB):
+    """Calculate system unreliability from minimal cut sets by full inclusion-exclusion (2^n terms)"""
+    if not min_cut_sets:
+        return 0
+
+    # For a system with minimal cut sets, the unreliability can be calculated as:
+    # The probability of the union of events where each cut set fails
+    n = len(min_cut_sets)
+    unreliability = 0.0
+
+    # Apply inclusion-exclusion principle
+    for r in range(1, n + 1):
+        sign = (-1)**(r+1)  # Alternating sign: +, -, +, ...
+
+        for combo in combinations(range(n), r):
+            # For the intersection of cut sets, we need the probability that
+            # all components in at least one of the cut sets fail
+            intersection_components = set()
+            for idx in combo:
+                intersection_components.update(min_cut_sets[idx])
+
+            unreliability += sign * cut_set_probability(intersection_components, probs, default_prob)
+
+    # Ensure results are reasonable
+    return min(max(unreliability, 0.0), 1.0)
+
+
+def iter_reliability_expression(min_cut_sets, limit=None):
+    """Lines of the reliability expression of generate_reliability_expression, one at a time.
+
+    limit, if given, caps the cut sets written out in full; the rest are
+    counted, so the text stays the same size however many cut sets there are.
+    """
+    # System reliability R = 1 - Unreliability
+    # Unreliability = P(C₁ ∪ C₂ ∪ ... ∪ Cₙ)
+    # Where Cᵢ is the event that cut set i fails
+    n = len(min_cut_sets)
+    shown = n if limit is None else min(n, limit)
+
+    yield "R = 1 - P(system failure)\n"
+    yield "  = 1 - P(at least one minimal cut set fails)\n"
+
+    # First line shows the general form using cut sets
+    if shown < n:
+        cut_sets_union = " ∪ ".join([f"C{i}" for i in range(1, min(shown, 3) + 1)] + ["...", f"C{n}"])
+    else:
+        cut_sets_union = " ∪ ".join([f"C{i}" for i in range(1, n + 1)])
+    yield f"  = 1 - P({cut_sets_union})\n\n"
+
+    # Define each cut set
+    for i, cut_set in enumerate(islice(min_cut_sets, shown), 1):
+        components_prod = " × ".join([f"q{comp}" for comp in cut_set])
+        yield f"Where C{i} = {components_prod}\n"
+    if shown < n:
+        yield f"  ... and {n - shown} more cut sets\n"
+
+    yield "\nWhere for each component i:\n"
+    yield "  qᵢ = component failure probability\n"
+    yield "  rᵢ = 1 - qᵢ = component reliability\n\n"
+
+    # Using inclusion-exclusion principle
+    yield "Using the inclusion-exclusion principle:\n"
+    yield "R = 1 - [∑P(Cᵢ) - ∑P(Cᵢ∩Cⱼ) + ∑P(Cᵢ∩Cⱼ∩Cₖ) - ...]\n\n"
+
+    # First-order terms
+    yield "First-order terms:\n"
+    for i, cut_set in enumerate(islice(min_cut_sets, shown), 1):
+        components_list = ", ".join(cut_set)
+        components_prod = " × ".join([f"q{comp}" for comp in cut_set])
+        yield f"P(C{i}) = P({{{components_list}}}) = {components_prod}\n"
+    if shown < n:
+        yield f"  ... and {n - shown} more terms\n"
+
+
+def generate_reliability_expression(min_cut_sets, limit=None):
+    """Generate a mathematical expression of system reliability based on minimal cut sets"""
+    return "".join(iter_reliability_expression(min_cut_sets, limit))
+
+
+def top_cut_sets(cut_set_probs, n):
+    """Indices of the n most probable cut sets, most probable first.
+
+    cut_set_probs may be a list or an array (such as the memory-mapped
+    probabilities of a loaded project); only the n selected ones are sorted.
+    """
+    probs = np.asarray(cut_set_probs, dtype=float)
+    if n >= len(probs):
+        return np.argsort(-probs, kind='stable').tolist()
+    if n <= 0:
+        return []
+    top = np.argpartition(-probs, n - 1)[:n]
+    return top[np.lexsort((top, -probs[top]))].tolist()
+
+
+def series_segments(G, source='source', sink='sink'):
+    """Split a diagram into series segments at the nodes every route passes through.
+
+    Those nodes are the dominators of the sink. Consecutive dominators
+    bound one segment, and the segments are independent subsystems in
+    series as long as no component is used in two of them, so segments
+    that share a component are merged. Connections that can never be on a
+    simple source→sink path are left out.
+
+    Returns a list of (start, end, edges) with edges as (u, v, component)
+    triples, or an empty list when the sink cannot be reached.
+    """
+    G = as_compact(G)
+    if source not in G or sink not in G:
+        return []
+    s, t = G.node_id[source], G.node_id[sink]
+    forward = [[] for _ in G.nodes]
+    backward = [[] for _ in G.nodes]
+    for u, v, c in G.edge_ids():
+        if v != s and u != t:
+            forward[u].append((v, c))
+            backward[v].append((u, c))
+    reached = reachable_nodes(forward, s)
+    if t not in reached:
+        return []
+    live = reached & reachable_nodes(backward, t)
+    forward = [[(v, c) for v, c in targets if v in live] if u in live else []
+               for u, targets in enumerate(forward)]
+
+    idom = immediate_dominators(forward, s)
+    chain = [t]
+    while chain[-1] != s:
+        chain.append(idom[chain[-1]])
+    chain.reverse()
+    position = {node: k for k, node in enumerate(chain)}
+
+    segment_of = dict(position)
+
+    def segment(node):
+        # The deepest dominator on the chain decides the segment
+        climb = []
+        while node not in segment_of:
+            climb.append(node)
+            node = idom[node]
+        for n in climb:
+            segment_of[n] = segment_of[node]
+        return segment_of[node]
+
+    edges = [[] for _ in range(len(chain) - 1)]
+    for u in sorted(live):
+        k = segment(u)
+        for v, c in forward[u]:
+            k_end = position[v] - 1 if v in position else segment(v)
+            if k_end == k:  # anything else leads back to an earlier segment
+                edges[k].append((G.nodes[u], G.nodes[v], G.components[c]))
+
+    # Merge the range of segments spanned by each shared component
+    span = {}
+    for k, segment_edges in enumerate(edges):
+        for _, _, comp in segment_edges:
+            first, last = span.get(comp, (k, k))
+            span[comp] = (min(first, k), max(last, k))
+    merge_end = list(range(len(edges)))
+    for first, last in span.values():
+        for k in range(first, last + 1):
+            merge_end[k] = max(merge_end[k], last)
+
+    segments = []
+    k = 0
+    while k < len(edges):
+        end = j = k
+        while j <= end:
+            end = max(end, merge_end[j])
+            j += 1
+        segments.append((G.nodes[chain[k]], G.nodes[chain[end + 1]], [e for j in range(k, end + 1) for e in edges[j]]))
+        k = end + 1
+    return segments
+
+
+class SegmentStructure:
+    """
+    Probability-independent analysis of one series segment.
+    Holds everything that depends only on the topology: the series-parallel
+    reduction, the path enumeration, the minimal cut sets and the BDDs, so
+    it can be cached and re-evaluated for new failure probabilities. The
+    paths are enumerated up front; the cut sets and BDDs on first use.
+    When choose_cut_strategy picks the flow search, no paths are
+    enumerated at all (path_count is None) and the cut sets come from
+    FlowCutSearch; they are all real cuts, so the segment counts as complete.
+    The engines run on the blocks of the reduction, while component_masks
+    reports the cut sets over the original components. An order cap counts
+    original components, which a parallel block would hide, so with
+    max_order the segment is not reduced.
+    Parameters:
+    ----------
+    start, end : str
+            Nodes bounding the segment
+    edges : list of tuple
+            (u, v, component) connections of the segment
+    max_order, max_paths, max_memory_mb, keep_sequences, cut_strategy :
+            As for analyze()
+    profile : AnalysisProfile or None
+            Records the reduction and path stages; the later stages take
+            their own profile argument, since a cached structure outlives
+            the run that built it
+    """
+    def __init__(self, start, end, edges, max_order=None, max_paths=None, max_memory_mb=None, keep_sequences=0,
+                 cut_strategy='auto', profile=None):
+        profile = profile or _NO_PROFILE
+        self.start = start
+        self.end = end
+        with profile.stage('reduction'):
+            sub = CompactGraph.from_edges(edges)
+            if max_order is None:
+                reduced, _, self.blocks = reduce_series_parallel(sub, {}, start, end)
+            else:
+                reduced, self.blocks = sub, {}
+        self.reduced_connections = reduced.number_of_edges()
+
+        self.strategy, self.strategy_reason = choose_cut_strategy(reduced, start, end, cut_strategy, max_order,
+                                                                  max_paths)
+        self._flow = None
+        if self.strategy == 'flow':
+            self._flow = FlowCutSearch(reduced, start, end)
+            self.names = self._flow.names
+            self.path_count = self.path_distinct = None
+            self.complete = True
+            self.stop_reason = None
+            self.sequences = []
+            self.path_masks = []
+        else:
+            with profile.stage('paths'):
+                paths = PathEnumeration(reduced, start, end, max_paths=max_paths,
+                                        max_memory_mb=max_memory_mb, keep_sequences=keep_sequences)
+            profile.count('paths_enumerated', paths.count)
+            self.names = paths.names
+            self.path_count = paths.count
+            self.path_distinct = len(paths.masks)
+            self.complete = paths.complete
+            self.stop_reason = paths.stop_reason
+            self.sequences = paths.sequences
+            self.path_masks = paths.masks
+        self.components = [comp for name in self.names for comp in block_components(name, self.blocks)]
+        self.max_order = max_order
+        self._reduced = reduced
+        self._cut_masks = None
+        self._component_masks = None
+        self._verified_masks = None
+        self._bdd = None
+        self._verified_bdd = None
+
+    @property
+    def cut_masks(self):
+        """Minimal cut sets of the segment as bitmasks, found on first use"""
+        return self.find_cut_sets()
+
+    def find_cut_sets(self, profile=None):
+        """Find the minimal cut sets unless they are known, recording the search in profile"""
+        if self._cut_masks is None:
+            profile = profile or _NO_PROFILE
+            with profile.stage('cut_sets'):
+                if self._flow is not None:
+                    self._cut_masks = self._flow.cut_set_masks(self.max_order, profile.counters)
+                else:
+                    self._cut_masks = minimal_cut_set_masks(self.path_masks, self.max_order, profile.counters)
+        return self._cut_masks
+
+    def iter_cut_set_orders(self, profile=None):
+        """Yield (order, masks) as each order of cut sets is found, keeping them for cut_masks"""
+        if self._cut_masks is not None:
+            yield from masks_by_order(self._cut_masks)
+            return
+        profile = profile or _NO_PROFILE
+        masks = []
+        if self._flow is not None:
+            orders = self._flow.iter_cut_set_orders(self.max_order, profile.counters)
+        else:
+            orders = iter_minimal_cut_set_orders(self.path_masks, self.max_order, profile.counters)
+        while True:
+            with profile.stage('cut_sets'):
+                step = next(orders, None)
+            if step is None:
+                break
+            masks.extend(step[1])
+            yield step
+        self._cut_masks = masks
+
+    @property
+    def component_masks(self):
+        """Minimal cut sets of the segment over the bits of self.components, found on first use"""
+        if self._component_masks is None:
+            self._component_masks = expand_block_masks(self.cut_masks, self.names, self.blocks, self.components)
+        return self._component_masks
+
+    def iter_component_cut_set_orders(self, profile=None):
+        """iter_cut_set_orders over the original components.
+
+        A block cut set of order k only expands to sets of order k or more,
+        so once the block cut sets of order k are known, so are the
+        component cut sets up to order k.
+        """
+        pending = []
+        for order, masks in self.iter_cut_set_orders(profile):
+            pending.extend(expand_block_masks(masks, self.names, self.blocks, self.components))
+            ready = [mask for mask in pending if mask.bit_count() <= order]
+            pending = [mask for mask in pending if mask.bit_count() > order]
+            yield from masks_by_order(ready)
+        yield from masks_by_order(pending)
+
+    @property
+    def verified_masks(self):
+        """Cut sets that really disconnect the segment, or None if all paths were enumerated.
+
+        With only part of the paths, these bound the reliability from above.
+        """
+        return self.verify_cut_sets()
+
+    def verify_cut_sets(self, profile=None):
+        """Check the cut sets of a partial enumeration on the graph unless done, recording it in profile"""
+        if self._verified_masks is None and not self.complete:
+            profile = profile or _NO_PROFILE
+            cut_masks = self.find_cut_sets(profile)
+            with profile.stage('cut_set_verification'):
+                self._verified_masks = [mask for mask in cut_masks
+                                        if is_graph_cut(self._reduced, mask_to_names(mask, self.names),
+                                                        self.start, self.end)]
+            profile.count('graph_cut_checks', len(cut_masks))
+        return self._verified_masks
+
+    @property
+    def bdd(self):
+        """FailureBDD of the cut sets, built on first use"""
+        return self.build_bdd()
+
+    def build_bdd(self, profile=None):
+        """Build the FailureBDD of the cut sets unless it is built, recording it in profile"""
+        if self._bdd is None:
+            profile = profile or _NO_PROFILE
+            cut_masks = self.find_cut_sets(profile)
+            with profile.stage('bdd'):
+                self._bdd = FailureBDD(cut_masks)
+            profile.count('bdd_nodes', len(self._bdd))
+        return self._bdd
+
+    @property
+    def verified_bdd(self):
+        """FailureBDD of the cut sets verified on the graph, for partial enumerations"""
+        if self._verified_bdd is None and self.verified_masks is not None:
+            self._verified_bdd = FailureBDD(self.verified_masks)
+        return self._verified_bdd
+
+    def best_path_reliability(self, q_vector):
+        """Probability that the most reliable single path works, a lower bound on reliability"""
+        masks = self.path_masks if self._flow is None else [self._flow.most_reliable_path(q_vector)]
+        works = mask_probabilities(masks, [1 - q for q in q_vector])
+        return np.max(works, axis=0, initial=0.0)
+
+    def probabilities(self, components):
+        """Failure probability of every component and block of the segment"""
+        probs = {}
+        for name in self.names:
+            if name not in self.blocks:
+                probs[name] = components.get(name, DEFAULT_FAILURE_PROB)
+        for name, (kind, members) in self.blocks.items():
+            for member in members:
+                if member not in probs:
+                    probs[member] = components.get(member, DEFAULT_FAILURE_PROB)
+            probs[name] = block_probability(kind, [probs[m] for m in members])
+        return probs
+
+    def gradient(self, components):
+        """Segment unreliability and its derivative for every component.
+
+        Derivatives with respect to blocks are pushed down to their members
+        by the chain rule, so the result is keyed on original components.
+        """
+        probs = self.probabilities(components)
+        value, bit_grads = self.bdd.gradient([probs[name] for name in self.names])
+        grads = {self.names[bit]: g for bit, g in bit_grads.items()}
+        for name, (kind, members) in reversed(list(self.blocks.items())):
+            g = grads.pop(name, 0.0)
+            for i, member in enumerate(members):
+                others = 1.0
+                for j, other in enumerate(members):
+                    if j != i:
+                        others *= 1 - probs[other] if kind == 'series' else probs[other]
+                grads[member] = grads.get(member, 0.0) + g * others
+        return value, grads
+
+
+class AnalysisCache:
+    """
+    Bounded LRU cache for analyze(), keyed on fingerprints of the diagram.
+    Segment structures are keyed on the segment's own connections and the
+    analysis limits, so after an edit only the segment that changed is
+    re-enumerated; the others, and any probability-only change, reuse the
+    cached paths, cut sets and BDDs. Complete results are also kept, keyed
+    on the structure fingerprint plus the failure probabilities, so an
+    unchanged diagram is not evaluated twice.
+    Parameters:
+    ----------
+    maxsize : int
+            Entries kept in each of the structure and result caches
+    Attributes:
+    ----------
+    stats : dict
+            Hit, miss and eviction counters for structures and results
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._structures = OrderedDict()
+        self._results = OrderedDict()
+        self.stats = {'structure_hits': 0, 'structure_misses': 0,
+                      'result_hits': 0, 'result_misses': 0, 'evictions': 0}
+
+    def _lookup(self, table, key, kind):
+        value = table.get(key)
+        if value is None:
+            self.stats[f'{kind}_misses'] += 1
+            return None
+        table.move_to_end(key)
+        self.stats[f'{kind}_hits'] += 1
+        return value
+
+    def _store(self, table, key, value):
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.maxsize:
+            table.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def structure(self, key, build):
+        """Return the cached structure for key, building and storing it on a miss"""
+        value = self._lookup(self._structures, key, 'structure')
+        if value is None:
+            value = build()
+            self._store(self._structures, key, value)
+        return value
+
+    def result(self, key):
+        return self._lookup(self._results, key, 'result')
+
+    def store_result(self, key, value):
+        self._store(self._results, key, value)
+
+    def clear(self):
+        self._structures.clear()
+        self._results.clear()
+
+
+class AnalysisProfile:
+    """
+    Stage timings and search counters of one analysis run.
+    Passed as profile= to analyze() or approximate_reliability(), it records
+    the wall time of each stage (segments, reduction, paths, cut_sets, bdd,
+    evaluation, ...) and counters such as the paths enumerated, the mask
+    pairs compared by the subsumption filter, the candidate cut sets tested
+    for minimality and the inclusion-exclusion terms evaluated. The report
+    is added to the results as results['profile']. Without a profile the
+    stages run under a no-op stand-in and no counters are kept.
+    Parameters:
+    ----------
+    cprofile : bool
+            Also run the whole analysis under cProfile and report the
+            functions with the highest cumulative time
+    top : int
+            Number of cProfile functions in the report
+    Attributes:
+    ----------
+    stages : dict
+            Stage name: [seconds, calls], in the order the stages first ran
+    counters : dict
+            Counter name: value
+    profiler : cProfile.Profile or None
+            The profiler of the last run in cProfile mode, e.g. for dump_stats()
+    """
+    def __init__(self, cprofile=False, top=25):
+        self.cprofile = cprofile
+        self.top = top
+        self.stages = {}
+        self.counters = {}
+        self.total_seconds = 0.0
+        self.profiler = None
+        self._functions = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as (part of) the named stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += time.perf_counter() - start
+            entry[1] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def run(self):
+        """Time the whole analysis, under cProfile in cProfile mode"""
+        if self.cprofile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.total_seconds += time.perf_counter() - start
+            if self.profiler is not None:
+                self.profiler.disable()
+                self._functions = self._top_functions(pstats.Stats(self.profiler))
+
+    def _top_functions(self, stats):
+        rows = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({'function': f"{function} ({filename}:{line})", 'calls': calls,
+                         'total_seconds': total, 'cumulative_seconds': cumulative})
+        rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+        return rows[:self.top]
+
+    def report(self):
+        """The profile as plain data"""
+        total = self.total_seconds or sum(seconds for seconds, _ in self.stages.values())
+        report = {
+            'total_seconds': total,
+            'stages': [{'stage': name, 'seconds': seconds, 'calls': calls,
+                        'share': seconds / total if total > 0 else 0.0}
+                       for name, (seconds, calls) in self.stages.items()],
+            'counters': dict(self.counters),
+        }
+        if self._functions is not None:
+            report['cprofile'] = self._functions
+        return report
+
+
+class _NoProfile:
+    """Stand-in used when no AnalysisProfile is given: every stage is a null context"""
+    counters = None
+
+    def stage(self, name):
+        return nullcontext()
+
+    def count(self, name, n=1):
+        pass
+
+
+_NO_PROFILE = _NoProfile()
+
+
+def _run_profiled(function, profile, *args, **kwargs):
+    """Call function with profile (or the no-op stand-in) and add the report to its results"""
+    if profile is None:
+        return function(*args, profile=_NO_PROFILE, **kwargs)
+    with profile.run():
+        results = function(*args, profile=profile, **kwargs)
+    return dict(results, profile=profile.report())
+
+
+def segment_keys(G, options, source='source', sink='sink', report=None, profile=None):
+    """Split G into series segments and fingerprint each one with the analysis options.
+
+    options is (max_order, max_paths, max_memory_mb, keep_sequences, cut_strategy).
+    Returns (segments, keys); raises ValueError if the sink cannot be reached.
+    """
+    if report is not None:
+        report("Splitting the diagram into series segments...")
+    with (profile or _NO_PROFILE).stage('segments'):
+        segments = series_segments(G, source, sink)
+    if not segments:
+        raise ValueError("No path found from source to sink")
+    keys = [(start, end, frozenset(edges)) + tuple(options) for start, end, edges in segments]
+    return segments, keys
+
+
+def probability_fingerprint(segments, components, voting=None):
+    """Fingerprint of the failure probabilities of the components used in segments.
+
+    A k-out-of-n block in voting is fingerprinted by k and the probability of
+    each member rather than by its own probability: members with swapped
+    probabilities give the block the same q but not the same importances.
+    """
+    voting = voting or {}
+    fingerprint = set()
+    for comp in {comp for _, _, edges in segments for _, _, comp in edges}:
+        if comp in voting:
+            spec = voting[comp]
+            members = tuple((m, components.get(m, DEFAULT_FAILURE_PROB)) for m in spec['members'])
+            fingerprint.add((comp, spec['k'], members))
+        else:
+            fingerprint.add((comp, components.get(comp, DEFAULT_FAILURE_PROB)))
+    return frozenset(fingerprint)
+
+
+def segment_structures(segments, keys, cache=None, report=None, profile=None):
+    """Build (or fetch from cache) the SegmentStructure of every segment.
+
+    Collapses series chains and parallel branches, then streams the success
+    paths as bitmasks or sets up the flow search, one segment at a time,
+    reporting which cut set strategy each segment got and why.
+    """
+    structures = []
+    for k, ((start, end, edges), key) in enumerate(zip(segments, keys), 1):
+        if report is not None:
+            report(f"Analyzing segment {k} of {len(segments)} ({start} → {end}, {len(edges)} connections)...")
+
+        def build(start=start, end=end, edges=edges, options=key[3:]):
+            return SegmentStructure(start, end, edges, *options, profile=profile)
+        structure = build() if cache is None else cache.structure(key, build)
+        if report is not None:
+            report(f"Cut sets of segment {k} from {structure.strategy} ({structure.strategy_reason})")
+        structures.append(structure)
+    return structures
+
+
+def strategy_summary(structures):
+    """How the cut sets of each segment were found, as plain data for the results"""
+    return [{'start': structure.start, 'end': structure.end, 'strategy': structure.strategy,
+             'reason': structure.strategy_reason} for structure in structures]
+
+
+def system_birnbaum(segment_grads):
+    """System unreliability and Birnbaum importance from per-segment derivatives.
+
+    segment_grads holds (unreliability, {component: derivative}) for each
+    series segment. The system unreliability is 1 - ∏(1 - Qₖ), so the
+    Birnbaum importance of a component of segment k is its derivative
+    times the probability that all the other segments work. Works on
+    floats and equally on arrays of per-scenario values.
+    Returns (unreliability, {component: birnbaum}).
+    """
+    works = [1 - value for value, _ in segment_grads]
+    unreliability = 1.0
+    for w in works:
+        unreliability = unreliability * w
+    unreliability = 1 - unreliability
+
+    # The other segments have to work for one segment to matter:
+    # products of the works before and after each segment
+    before = [1.0]
+    for w in works[:-1]:
+        before.append(before[-1] * w)
+    after = [1.0]
+    for w in reversed(works[1:]):
+        after.append(after[-1] * w)
+    after.reverse()
+
+    birnbaum = {}
+    for k, (_, grads) in enumerate(segment_grads):
+        others = before[k] * after[k]
+        for comp, g in grads.items():
+            birnbaum[comp] = g * others
+    return unreliability, birnbaum
+
+
+def importance_measures(unreliability, birnbaum, probs):
+    """Birnbaum, Fussell-Vesely, RAW and RRW importance of every event in birnbaum.
+
+    Since the system unreliability Q is linear in each event probability qᵢ,
+    the conditional unreliabilities follow from the Birnbaum importance
+    Bᵢ = ∂Q/∂qᵢ without re-running the analysis:
+        Q(qᵢ=1) = Q + (1 - qᵢ)·Bᵢ        Q(qᵢ=0) = Q - qᵢ·Bᵢ
+        FV = (Q - Q(qᵢ=0)) / Q          RAW = Q(qᵢ=1) / Q          RRW = Q / Q(qᵢ=0)
+    Ratios that divide by zero are reported as None.
+    """
+    importance = {}
+    for comp, b in birnbaum.items():
+        q = probs[comp]
+        q_failed = min(unreliability + (1 - q) * b, 1.0)
+        q_perfect = max(unreliability - q * b, 0.0)
+        importance[comp] = {
+            'q': q,
+            'birnbaum': b,
+            'fussell_vesely': (unreliability - q_perfect) / unreliability if unreliability > 0 else None,
+            'raw': q_failed / unreliability if unreliability > 0 else None,
+            'rrw': unreliability / q_perfect if q_perfect > 0 else None,
+            'unreliability_if_failed': q_failed,
+            'unreliability_if_perfect': q_perfect,
+        }
+    return dict(sorted(importance.items(), key=lambda item: -item[1]['birnbaum']))
+
+
+def component_importance(segment_grads, components):
+    """Birnbaum, Fussell-Vesely, RAW and RRW importance of every component.
+
+    segment_grads holds (unreliability, {component: derivative}) for each
+    series segment; see system_birnbaum and importance_measures.
+    """
+    unreliability, birnbaum = system_birnbaum(segment_grads)
+    probs = {comp: components.get(comp, DEFAULT_FAILURE_PROB) for comp in birnbaum}
+    return importance_measures(unreliability, birnbaum, probs)
+
+
+def common_cause_importance(segment_grads, components, ccf, events, independent, weights, occurred):
+    """Importance of the components and common-cause events of a diagram with common-cause groups.
+
+    segment_grads holds per-scenario arrays, as evaluated on the
+    probabilities of ccf_scenario_arrays. The importance of a group member
+    is that of its independent failure, whose derivative vanishes in the
+    scenarios where the group's event failed it anyway. The Birnbaum
+    importance of a common-cause event is Q with the event minus Q
+    without it, with the other events at their probabilities.
+    """
+    unreliability_rows, birnbaum_rows = system_birnbaum(segment_grads)
+    unreliability = expected_value(unreliability_rows, weights)
+    group_of = {member: name for name, spec in ccf.items() for member in spec['members']}
+
+    birnbaum = {}
+    probs = {}
+    for comp, b in birnbaum_rows.items():
+        if comp in group_of:
+            b = np.where(occurred[group_of[comp]], 0.0, b)
+            probs[comp] = float(independent[comp])
+        else:
+            probs[comp] = expected_value(components.get(comp, DEFAULT_FAILURE_PROB), weights)
+        birnbaum[comp] = expected_value(b, weights)
+    for name, p in events.items():
+        # Weight of each scenario without the factor of this event
+        others = np.ones(len(weights))
+        for other, q in events.items():
+            if other != name:
+                others *= np.where(occurred[other], q, 1 - q)
+        sign = np.where(occurred[name], 1.0, -1.0)
+        birnbaum[name] = float(np.dot(others * sign, np.broadcast_to(unreliability_rows, weights.shape)))
+        probs[name] = float(p)
+    return importance_measures(unreliability, birnbaum, probs)
+
+
+def report_cut_set_orders(structures, components, on_order, profile=None, weights=None):
+    """Find the cut sets of all segments order by order, calling on_order for each order.
+
+    The cut sets are reported over the original components, as in the results.
+
+    weights are the scenario weights when components holds per-scenario
+    arrays (common-cause groups), so that the cut set probabilities are
+    reported as plain numbers.
+    """
+    probs = [structure.probabilities(components) for structure in structures]
+    pending = {}
+    for k, structure in enumerate(structures):
+        orders = structure.iter_component_cut_set_orders(profile)
+        pending[k] = (orders, next(orders, None))
+    while any(head is not None for _, head in pending.values()):
+        order = min(head[0] for _, head in pending.values() if head is not None)
+        cut_sets = []
+        cut_probs = []
+        for k, (orders, head) in pending.items():
+            if head is None or head[0] != order:
+                continue
+            structure = structures[k]
+            cut_sets.extend(mask_to_names(mask, structure.components) for mask in head[1])
+            q_vector = [probs[k][name] for name in structure.components]
+            cut_probs.extend(expected_values(mask_probabilities(head[1], q_vector), weights))
+            pending[k] = (orders, next(orders, None))
+        on_order(order, cut_sets, cut_probs)
+
+
+def analyze(G, components, max_order=None, max_paths=None, max_memory_mb=None,
+            keep_sequences=1000, progress=None, source='source', sink='sink', cache=None, on_order=None,
+            profile=None, cut_strategy='auto'):
+    """Run the exact analysis pipeline on a diagram and return the results as plain data.
+
+    The diagram is split into independent series segments. Each segment is
+    reduced to its series-parallel core, its paths are streamed into the
+    cut set engine, and the cut sets are evaluated with a BDD; the segment
+    results multiply. The reported cut sets are expanded from the blocks
+    back to the original components. Path limits apply per segment. progress, if given, is
+    called with a short message at each stage, and cache, an AnalysisCache,
+    lets repeated runs reuse the structure of unchanged segments.
+    on_order, if given, is called as on_order(order, cut_sets, probs) as
+    soon as the minimal cut sets of each order are known, lowest order
+    first, so a caller can show the dominant cut sets long before a deep
+    search finishes. profile, an AnalysisProfile, records the time of each
+    stage and the search counters, and adds them as results['profile'].
+    Common-cause groups in G.graph['ccf'] are evaluated by conditioning on
+    their events (see ccf_scenarios): the structure is analyzed once and
+    its BDDs are evaluated for every combination of events at once.
+    cut_strategy is one of CUT_STRATEGIES: with 'auto', segments with too
+    many paths to enumerate get their cut sets from FlowCutSearch instead
+    (see choose_cut_strategy); results['cut_strategy'] lists the choice
+    and the reason for every segment.
+
+    Returns a dict that can be written out as JSON. If a path limit stopped
+    the enumeration, 'exact' is False and 'reliability_lower' and
+    'reliability_upper' bracket the true reliability.
+    """
+    return _run_profiled(_analyze, profile, G, components, max_order, max_paths, max_memory_mb,
+                         keep_sequences, progress, source, sink, cache, on_order, cut_strategy)
+
+
+def _analyze(G, components, max_order, max_paths, max_memory_mb, keep_sequences, progress, source, sink,
+             cache, on_order, cut_strategy, profile):
+    """analyze() with profile always given (the no-op stand-in when not profiling)"""
+    def report(message):
+        if progress is not None:
+            progress(message)
+
+    G = as_compact(G)
+    if source not in G or sink not in G:
+        raise ValueError(f"System must have both '{source}' and '{sink}' nodes")
+    voting = voting_blocks(G)
+    ccf = ccf_groups(G)
+    weights = None
+    if ccf:
+        events, independent, weights, occurred, scenario_probs = ccf_scenario_arrays(ccf, components)
+        ccf_key = tuple((name, spec['beta'], tuple(spec['members'])) for name, spec in ccf.items())
+        ccf_key += tuple((m, components.get(m, DEFAULT_FAILURE_PROB)) for m in independent)
+    components = with_voting(G, components)
+
+    segments, keys = segment_keys(G, (max_order, max_paths, max_memory_mb, keep_sequences, cut_strategy), source,
+                                  sink, report, profile)
+
+    result_key = None
+    if cache is not None:
+        result_key = ('exact', tuple(keys), probability_fingerprint(segments, components, voting))
+        if ccf:
+            result_key += ccf_key
+        results = cache.result(result_key)
+        if results is not None:
+            report("Analysis complete (cached)")
+            return dict(results, cache=dict(cache.stats))
+
+    structures = segment_structures(segments, keys, cache, report, profile)
+    if ccf:
+        # From here on every member and block probability is an array over the common-cause scenarios
+        components = with_voting(G, scenario_probs)
+
+    # Give the blocks of all segments one consecutive numbering
+    taken = set(components) | {comp for _, _, edges in segments for _, _, comp in edges}
+    renames = []
+    blocks = []
+    counter = 1
+    for structure in structures:
+        rename = {}
+        for name, (kind, members) in structure.blocks.items():
+            prefix = 'S' if kind == 'series' else 'P'
+            while f"#{prefix}{counter}" in taken:
+                counter += 1
+            rename[name] = f"#{prefix}{counter}"
+            counter += 1
+            blocks.append((rename[name], kind, [rename.get(m, m) for m in members]))
+        renames.append(rename)
+
+    if on_order is not None:
+        report_cut_set_orders(structures, components, on_order, profile, weights)
+    for structure in structures:
+        structure.build_bdd(profile)
+        structure.verify_cut_sets(profile)
+
+    report("Calculating system unreliability from cut sets...")
+    with profile.stage('evaluation'):
+        probs = dict(components)
+        min_cut_sets = []
+        cut_set_probs = []
+        reliability = 1.0
+        reliability_lower = 1.0
+        reliability_upper = 1.0
+        segment_grads = []
+        for structure, rename in zip(structures, renames):
+            value, grads = structure.gradient(components)
+            segment_grads.append((value, voting_importance_gradients(grads, voting, components)))
+            segment_probs = structure.probabilities(components)
+            for name, q in segment_probs.items():
+                probs[rename.get(name, name)] = q
+            q_vector = [segment_probs[name] for name in structure.names]
+            # Cut sets are reported over the original components, not the blocks of the reduction
+            min_cut_sets.extend(mask_to_names(mask, structure.components) for mask in structure.component_masks)
+            component_q = [segment_probs[name] for name in structure.components]
+            cut_set_probs.extend(expected_values(mask_probabilities(structure.component_masks, component_q), weights))
+
+            # The failure function is exact through the BDD, no matter how
+            # much the cut sets overlap
+            segment_reliability = 1 - structure.bdd.probability(q_vector)
+            reliability = reliability * segment_reliability
+
+            # With only part of the paths, the cut sets of the enumerated paths
+            # give a lower bound on reliability, and the ones that are real
+            # cuts an upper bound
+            upper = lower = segment_reliability
+            if not structure.complete:
+                upper = 1 - structure.verified_bdd.probability(q_vector)
+            if max_order is not None:
+                # With an order cap the cut sets no longer bound the reliability
+                # from below, the best single path does instead
+                lower = structure.best_path_reliability(q_vector)
+            reliability_upper = reliability_upper * upper
+            reliability_lower = reliability_lower * lower
+        reliability = expected_value(reliability, weights)
+        reliability_upper = expected_value(reliability_upper, weights)
+        reliability_lower = expected_value(reliability_lower, weights)
+        unreliability = min(max(1 - reliability, 0.0), 1.0)
+        reliability = 1 - unreliability
+        by_order = sorted(range(len(min_cut_sets)), key=lambda i: len(min_cut_sets[i]))
+        min_cut_sets = [min_cut_sets[i] for i in by_order]
+        cut_set_probs = [cut_set_probs[i] for i in by_order]
+
+    orders = {}
+    for cs in min_cut_sets:
+        orders[len(cs)] = orders.get(len(cs), 0) + 1
+    report(f"Identified {len(min_cut_sets)} minimal cut sets")
+
+    # Small systems are cross-checked against inclusion-exclusion (which
+    # assumes independent components, so not with common-cause groups)
+    check = None
+    if len(min_cut_sets) <= INCLUSION_EXCLUSION_CHECK_LIMIT and not ccf:
+        with profile.stage('inclusion_exclusion_check'):
+            check = calc_system_unreliability_inclusion_exclusion(min_cut_sets, probs)
+        profile.count('inclusion_exclusion_terms', 2 ** len(min_cut_sets) - 1)
+        if abs(check - unreliability) > 1e-9:
+            report(f"Warning: inclusion-exclusion gives {check:.12f}")
+
+    report("Computing component importance...")
+    with profile.stage('importance'):
+        if ccf:
+            importance = common_cause_importance(segment_grads, components, ccf, events, independent, weights,
+                                                 occurred)
+        else:
+            importance = component_importance(segment_grads, components)
+
+    # Success paths of the whole system combine one path per segment, and
+    # are not counted if a segment found its cut sets without them
+    path_count = 1
+    path_distinct = 1
+    for structure in structures:
+        if structure.path_count is None:
+            path_count = path_distinct = None
+            break
+        path_count *= structure.path_count
+        path_distinct *= structure.path_distinct
+    sequences = []
+    for combo in islice(product(*[[[rename.get(c, c) for c in seq] for seq in structure.sequences]
+                                  for structure, rename in zip(structures, renames)]), keep_sequences):
+        sequences.append([comp for seq in combo for comp in seq])
+    incomplete = [structure.stop_reason for structure in structures if not structure.complete]
+    block_table = {name: (kind, members) for name, kind, members in blocks}
+
+    results = {
+        'reduction': {
+            'connections': G.number_of_edges(),
+            'reduced_connections': sum(structure.reduced_connections for structure in structures),
+            'segments': len(structures),
+            'blocks': [{'name': name, 'kind': kind, 'members': members,
+                        'components': block_components(name, block_table),
+                        'q': expected_value(probs[name], weights)}
+                       for name, kind, members in blocks],
+        },
+        'paths': {
+            'count': path_count,
+            'distinct': path_distinct,
+            'complete': not incomplete,
+            'stop_reason': incomplete[0] if incomplete else None,
+            'sequences': sequences,
+        },
+        'cut_strategy': strategy_summary(structures),
+        'voting': [{'name': name, 'k': spec['k'], 'n': len(spec['members']), 'members': spec['members'],
+                    'q': expected_value(components[name], weights)}
+                   for name, spec in voting.items()],
+        'ccf': [{'name': name, 'beta': spec['beta'], 'members': spec['members'], 'q': float(events[name])}
+                for name, spec in ccf.items()],
+        'max_order': max_order,
+        'cut_sets': min_cut_sets,
+        'cut_set_probs': cut_set_probs,
+        'cut_set_orders': {str(order): orders[order] for order in sorted(orders)},
+        'bdd_nodes': sum(len(structure.bdd) for structure in structures),
+        'inclusion_exclusion_check': check,
+        'importance': importance,
+        'reliability': reliability,
+        'unreliability': unreliability,
+        'exact': not incomplete and max_order is None,
+        'reliability_lower': reliability_lower,
+        'reliability_upper': reliability_upper,
+    }
+    if cache is not None:
+        results['cache'] = dict(cache.stats)
+        cache.store_result(result_key, results)
+
+    report("Analysis complete")
+    return results
+
+
+def mask_probability(mask, probs):
+    """Probability that every component on the bits of mask fails"""
+    prob = 1.0
+    while mask:
+        low = mask & -mask
+        prob *= probs[low.bit_length() - 1]
+        mask ^= low
+    return prob
+
+
+def mask_probabilities(masks, probs):
+    """mask_probability of every mask, as an array with one row per mask.
+
+    probs is indexed by bit and may hold per-scenario arrays, which add a
+    column per scenario.
+    """
+    shape = np.broadcast_shapes(*(np.shape(p) for p in probs))
+    if not shape:
+        return np.fromiter((mask_probability(mask, probs) for mask in masks), dtype=float, count=len(masks))
+    return np.array([np.broadcast_to(mask_probability(mask, probs), shape) for mask in masks],
+                    dtype=float).reshape((len(masks),) + shape)
+
+
+def union_bounds(cut_masks, probs, rel_tolerance=0.0, max_terms=1000000):
+    """Bounds on the probability that at least one of cut_masks fails.
+
+    The linear-time bounds come first:
+        max P(Cᵢ) ≤ P(∪Cᵢ) ≤ min(∑P(Cᵢ), 1 - ∏(1 - P(Cᵢ)))
+    the rare-event approximation and the min-cut upper bound. Inclusion-
+    exclusion is then added level by level; by the Bonferroni inequalities
+    odd partial sums are upper bounds and even ones lower bounds. It stops
+    as soon as the bracket is within rel_tolerance of the upper bound, or
+    when the next level would take the term count past max_terms.
+    """
+    cut_probs = mask_probabilities(cut_masks, probs)
+    rare_event = float(cut_probs.sum())
+    works = float(np.prod(1 - cut_probs))
+    bounds = {
+        'rare_event': rare_event,
+        'min_cut_upper': 1 - works,
+        'lower': float(cut_probs.max(initial=0.0)),
+        'upper': min(rare_event, 1 - works, 1.0),
+        'levels': 0,
+        'terms': len(cut_probs),
+    }
+
+    n = len(cut_masks)
+    partial = 0.0
+    for r in range(1, n + 1):
+        if bounds['upper'] - bounds['lower'] <= rel_tolerance * bounds['upper']:
+            break
+        if r > 1:
+            count = math.comb(n, r)
+            if bounds['terms'] + count > max_terms:
+                break
+            bounds['terms'] += count
+            level = 0.0
+            for combo in combinations(range(n), r):
+                union = 0
+                for i in combo:
+                    union |= cut_masks[i]
+                level += mask_probability(union, probs)
+        else:
+            level = rare_event
+        partial += level if r % 2 else -level
+        bounds['levels'] = r
+        if r % 2:
+            bounds['upper'] = min(bounds['upper'], partial)
+        else:
+            bounds['lower'] = max(bounds['lower'], partial)
+    return bounds
+
+
+def approximate_reliability(G, components, rel_tolerance=0.01, max_terms=1000000, max_order=None,
+                            max_paths=None, max_memory_mb=None, progress=None,
+                            source='source', sink='sink', cache=None, profile=None, cut_strategy='auto'):
+    """Bound the system unreliability without building a BDD.
+
+    Intended for highly reliable systems, where the rare-event and min-cut
+    bounds are already tight. Each series segment gets the union_bounds of
+    its cut sets plus the Esary-Proschan lower bound ∏(1 - P(path works))
+    over its minimal paths, adjusted for what its enumeration covers:
+    cut sets under an order cap only bound from below, so the upper bound
+    then comes from the best single path, and cut sets of a partial path
+    enumeration only bound from above, so the lower bound then comes from
+    the cut sets verified on the graph. A segment whose cut sets come from
+    the flow search (cut_strategy, as for analyze()) has no paths, so it
+    goes without the Esary-Proschan bound. Segment bounds combine through
+    Q = 1 - ∏(1 - Qₖ). With common-cause groups the bounds of every
+    combination of common-cause events are weighted; inclusion-exclusion
+    is only spent on the combinations that contribute most to the width.
+
+    Returns a dict with the achieved bound pair on unreliability and
+    reliability, the linear-time bounds, the inclusion-exclusion terms
+    used, and whether the bracket met rel_tolerance. profile works as for
+    analyze().
+    """
+    return _run_profiled(_approximate_reliability, profile, G, components, rel_tolerance, max_terms, max_order,
+                         max_paths, max_memory_mb, progress, source, sink, cache, cut_strategy)
+
+
+def _approximate_reliability(G, components, rel_tolerance, max_terms, max_order, max_paths, max_memory_mb,
+                             progress, source, sink, cache, cut_strategy, profile):
+    """approximate_reliability() with profile always given"""
+    def report(message):
+        if progress is not None:
+            progress(message)
+
+    # One scenario, or one per combination of common-cause events; the bounds of each are weighted
+    ccf = ccf_groups(G)
+    if ccf:
+        scenarios = [(weight, with_voting(G, dict(components, **probs)))
+                     for weight, _, probs in ccf_scenarios(ccf, components)[2]]
+    else:
+        scenarios = [(1.0, with_voting(G, components))]
+    segments, keys = segment_keys(as_compact(G), (max_order, max_paths, max_memory_mb, 0, cut_strategy), source,
+                                  sink, report, profile)
+    structures = segment_structures(segments, keys, cache, report, profile)
+
+    report("Bounding system unreliability from cut sets...")
+    cut_sets = [structure.find_cut_sets(profile) for structure in structures]
+
+    def scenario_bounds(scenario, tolerance):
+        # Segment bounds of one scenario, combined into system bounds on unreliability
+        works = dict.fromkeys(('lower', 'upper', 'rare_event', 'min_cut_upper', 'esary_proschan_lower'), 1.0)
+        terms = 0
+        levels = []
+        for structure, cut_masks in zip(structures, cut_sets):
+            q_vector = [structure.probabilities(scenario)[name] for name in structure.names]
+            with profile.stage('bounds'):
+                bounds = union_bounds(cut_masks, q_vector, tolerance, max_terms)
+            profile.count('inclusion_exclusion_terms', bounds['terms'])
+            terms += bounds['terms']
+            levels.append(bounds['levels'])
+            lower, upper = bounds['lower'], bounds['upper']
+
+            esary_proschan = None
+            if structure.complete and structure.strategy == 'paths':
+                with profile.stage('path_bounds'):
+                    paths = remove_superset_masks(structure.path_masks)
+                    esary_proschan = float(np.prod(1 - mask_probabilities(paths, [1 - q for q in q_vector])))
+                if max_order is None:
+                    lower = max(lower, esary_proschan)
+            elif not structure.complete:
+                verified = structure.verify_cut_sets(profile)
+                lower = float(mask_probabilities(verified, q_vector).max(initial=0.0))
+            if max_order is not None:
+                upper = 1 - structure.best_path_reliability(q_vector)
+
+            works['lower'] *= 1 - lower
+            works['upper'] *= 1 - upper
+            works['rare_event'] *= 1 - min(bounds['rare_event'], 1.0)
+            works['min_cut_upper'] *= 1 - bounds['min_cut_upper']
+            works['esary_proschan_lower'] *= 1 - (esary_proschan if esary_proschan is not None else 0.0)
+        return {key: 1 - value for key, value in works.items()}, terms, levels
+
+    weights = [weight for weight, _ in scenarios]
+    if not ccf:
+        rows = [scenario_bounds(scenarios[0][1], rel_tolerance)]
+    else:
+        # Linear-time bounds for every scenario first, then inclusion-exclusion only for
+        # the scenarios that contribute most to the width, until the weighted bracket is narrow enough
+        rows = [scenario_bounds(scenario, 1.0) for _, scenario in scenarios]
+        widest = sorted(range(len(rows)), key=lambda i: -weights[i] * (rows[i][0]['upper'] - rows[i][0]['lower']))
+        for i in widest:
+            upper = sum(w * row[0]['upper'] for w, row in zip(weights, rows))
+            width = sum(w * (row[0]['upper'] - row[0]['lower']) for w, row in zip(weights, rows))
+            if width <= rel_tolerance * upper:
+                break
+            refined = scenario_bounds(scenarios[i][1], rel_tolerance)
+            rows[i] = (refined[0], rows[i][1] + refined[1], refined[2])
+
+    # The scenario weights are NumPy floats; the results are kept to plain numbers for JSON
+    total = {key: float(sum(w * row[0][key] for w, row in zip(weights, rows))) for key in rows[0][0]}
+    unreliability_lower, unreliability_upper = total['lower'], total['upper']
+    report("Bounds complete")
+    return {
+        'unreliability_lower': unreliability_lower,
+        'unreliability_upper': unreliability_upper,
+        'reliability_lower': 1 - unreliability_upper,
+        'reliability_upper': 1 - unreliability_lower,
+        'rare_event': total['rare_event'],
+        'min_cut_upper': total['min_cut_upper'],
+        'esary_proschan_lower': total['esary_proschan_lower'],
+        'inclusion_exclusion_levels': [max(levels) for levels in zip(*(row[2] for row in rows))],
+        'inclusion_exclusion_terms': sum(row[1] for row in rows),
+        'cut_sets': sum(len(cut_masks) for cut_masks in cut_sets),
+        'segments': len(structures),
+        'cut_strategy': strategy_summary(structures),
+        'rel_tolerance': rel_tolerance,
+        'converged': bool(unreliability_upper - unreliability_lower <= rel_tolerance * unreliability_upper),
+    }
+
+
+class ReliabilitySweep:
+    """
+    Diagram structure computed once, then evaluated for many probability vectors.
+    The minimal cut sets depend only on the topology, so the reduction, path
+    enumeration, cut sets and BDD are built a single time here. Each
+    evaluation then only recomputes block probabilities and runs one
+    vectorized pass over the BDD, so 10^5 probability vectors take seconds.
+    Parameters:
+    ----------
+    G : CompactGraph or networkx.DiGraph
+            Diagram whose edges carry a 'component' attribute
+    max_order : int or None
+            Only use cut sets up to this order (the unreliability is then a lower bound)
+    cut_strategy : str
+            How the cut sets are found, as for analyze()
+    Attributes:
+    ----------
+    strategy, strategy_reason : str
+            The cut set strategy used and why, see choose_cut_strategy
+    components : list of str
+            Components used in the diagram, in the column order expected by unreliability();
+            a k-out-of-n block is represented by its members. Members of common-cause
+            groups are always included, since every member sets its group's event probability
+    cut_sets : list of list
+            Minimal cut sets over components and series-parallel blocks
+    bdd : FailureBDD
+            Failure function over the reduced diagram
+    """
+    def __init__(self, G, max_order=None, source='source', sink='sink', cut_strategy='auto'):
+        self.voting = voting_blocks(G)
+        self.ccf = ccf_groups(G)
+        G = as_compact(G)
+        with_voting(G, {})  # checks the voting members
+        used = {G.components[c] for c in np.flatnonzero(G.component_uses())}
+        for name, spec in self.voting.items():
+            if name in used:
+                used.remove(name)
+                used.update(spec['members'])
+        for spec in self.ccf.values():
+            used.update(spec['members'])
+        self.components = sorted(used)
+        if max_order is None:
+            reduced, _, self.blocks = reduce_series_parallel(G, {}, source, sink)
+        else:
+            # As in SegmentStructure, the order cap counts original components
+            reduced, self.blocks = G, {}
+        if not reduced.has_path(source, sink):
+            raise ValueError("No path found from source to sink")
+        self.strategy, self.strategy_reason = choose_cut_strategy(reduced, source, sink, cut_strategy, max_order)
+        if self.strategy == 'flow':
+            search = FlowCutSearch(reduced, source, sink)
+            cut_masks = search.cut_set_masks(max_order)
+            self.names = search.names
+        else:
+            paths = PathEnumeration(reduced, source, sink)
+            cut_masks = minimal_cut_set_masks(paths.masks, max_order)
+            self.names = paths.names
+        self.cut_sets = [mask_to_names(mask, self.names) for mask in cut_masks]
+        self.bdd = FailureBDD(cut_masks)
+        self._column = {name: i for i, name in enumerate(self.components)}
+
+    def probability_matrix(self, values, rows=None):
+        """Build the (rows × components) input from a dict of per-component arrays or scalars.
+
+        Components missing from values get DEFAULT_FAILURE_PROB.
+        """
+        if rows is None:
+            rows = max([np.size(v) for v in values.values()] + [1])
+        matrix = np.full((rows, len(self.components)), DEFAULT_FAILURE_PROB)
+        for name, value in values.items():
+            if name in self._column:
+                matrix[:, self._column[name]] = value
+        return matrix
+
+    def unreliability(self, q):
+        """System unreliability for each row of component failure probabilities.
+
+        q is a (rows × components) array with columns in self.components
+        order, a single vector of that length, or a dict accepted by
+        probability_matrix. Returns an array with one value per row.
+        """
+        if isinstance(q, dict):
+            q = self.probability_matrix(q)
+        q = np.asarray(q, dtype=float)
+        if q.ndim == 1:
+            q = q[None, :]
+
+        columns = {name: q[:, i] for name, i in self._column.items()}
+        if not self.ccf:
+            return np.clip(self._failure(columns, len(q)), 0.0, 1.0)
+        # Common-cause groups: weight the result of every combination of common-cause events
+        result = np.zeros(len(q))
+        for weight, _, probs in ccf_scenarios(self.ccf, columns)[2]:
+            result += weight * self._failure(dict(columns, **probs), len(q))
+        return np.clip(result, 0.0, 1.0)
+
+    def _failure(self, columns, rows):
+        """BDD failure probability of each row, given the component columns"""
+        columns = dict(columns)
+        for name, spec in self.voting.items():
+            # Blocks not used in the diagram may have only some members here (through a common-cause group)
+            if all(m in columns for m in spec['members']):
+                columns[name] = voting_probability(spec['k'], [columns[m] for m in spec['members']])
+        # Blocks are stored in creation order, so members come first
+        for name, (kind, members) in self.blocks.items():
+            columns[name] = block_probability(kind, [columns[m] for m in members])
+        probs = np.column_stack([np.broadcast_to(columns[name], (rows,)) for name in self.names])
+        return self.bdd.probability_array(probs)
+
+    def reliability(self, q):
+        """System reliability for each row of component failure probabilities"""
+        return 1 - self.unreliability(q)
+
+
+LIFETIME_KINDS = {
+    'fixed': ('prob',),
+    'exponential': ('rate',),
+    'weibull': ('shape', 'scale'),
+    'repairable': ('mttf', 'mttr'),
+}
+
+
+def validate_lifetime(spec):
+    """Check a lifetime spec and return it with float parameters.
+
+    A spec is a dict with a 'kind' of 'fixed' (prob), 'exponential' (rate),
+    'weibull' (shape, scale) or 'repairable' (mttf, mttr).
+    """
+    kind = spec.get('kind')
+    if kind not in LIFETIME_KINDS:
+        raise ValueError(f"Unknown lifetime kind '{kind}', expected one of {', '.join(LIFETIME_KINDS)}")
+    checked = {'kind': kind}
+    for param in LIFETIME_KINDS[kind]:
+        if param not in spec:
+            raise ValueError(f"Lifetime '{kind}' needs a '{param}' parameter")
+        value = float(spec[param])
+        if kind == 'fixed' and not 0 <= value <= 1:
+            raise ValueError(f"Invalid probability: {value}")
+        if kind != 'fixed' and (value < 0 or (value == 0 and param != 'mttr')):
+            raise ValueError(f"Lifetime parameter '{param}' must be positive, got {value}")
+        checked[param] = value
+    return checked
+
+
+def lifetime_unreliability(spec, times):
+    """Probability that a component has failed by each time, without repair"""
+    times = np.asarray(times, dtype=float)
+    kind = spec['kind']
+    if kind == 'fixed':
+        return np.full(times.shape, spec['prob'])
+    if kind == 'weibull':
+        return -np.expm1(-(times / spec['scale']) ** spec['shape'])
+    rate = spec['rate'] if kind == 'exponential' else 1 / spec['mttf']
+    return -np.expm1(-rate * times)
+
+
+def lifetime_unavailability(spec, times):
+    """Probability that a component is down at each time.
+
+    Repairable components follow the two-state Markov model with failure
+    rate 1/MTTF and repair rate 1/MTTR; everything else is never repaired,
+    so its unavailability equals its unreliability.
+    """
+    if spec['kind'] != 'repairable':
+        return lifetime_unreliability(spec, times)
+    times = np.asarray(times, dtype=float)
+    if spec['mttr'] == 0:
+        return np.zeros(times.shape)
+    rate, repair = 1 / spec['mttf'], 1 / spec['mttr']
+    return rate / (rate + repair) * -np.expm1(-(rate + repair) * times)
+
+
+def lifetime_mean(spec):
+    """Mean time to failure of one component, or None for a fixed probability"""
+    kind = spec['kind']
+    if kind == 'exponential':
+        return 1 / spec['rate']
+    if kind == 'weibull':
+        return spec['scale'] * math.gamma(1 + 1 / spec['shape'])
+    if kind == 'repairable':
+        return spec['mttf']
+    return None
+
+
+def default_time_grid(lifetimes, points=2000):
+    """Time grid from 0 to five times the longest component mean life"""
+    means = [lifetime_mean(spec) for spec in lifetimes.values()]
+    means = [m for m in means if m is not None]
+    if not means:
+        raise ValueError("No component has a lifetime distribution, so there is no time scale")
+    return np.linspace(0.0, 5 * max(means), points)
+
+
+def reliability_curves(G, components, lifetimes, times=None, points=2000, max_order=None,
+                       source='source', sink='sink', cut_strategy='auto'):
+    """
+    System reliability R(t) and availability A(t) over a time grid.
+    The structure (reduction, cut sets, BDD) is built once with
+    ReliabilitySweep, then every component's failure probability over the
+    whole grid is evaluated as one array and the BDD is run once per curve,
+    so a grid of thousands of points costs about as much as a single
+    analysis. Components without a lifetime keep their fixed probability,
+    and k-out-of-n blocks follow the lifetimes of their members.
+    R(t) treats every component as non-repairable (time to first failure);
+    A(t) lets repairable components be restored at rate 1/MTTR.
+    Parameters:
+    ----------
+    G : CompactGraph or networkx.DiGraph
+            Diagram whose edges carry a 'component' attribute
+    components : dict
+            Fixed failure probability per component
+    lifetimes : dict
+            Lifetime spec per component, see validate_lifetime
+    times : array-like or None
+            Time grid, starting at 0 for the MTTF integral; default_time_grid when None
+    points : int
+            Number of grid points when times is None
+    max_order : int or None
+            Only use cut sets up to this order (R(t) is then an upper bound)
+    cut_strategy : str
+            How the cut sets are found, as for analyze()
+    Returns:
+    -------
+    dict with times, reliability and availability lists, the MTTF integrated
+    from R(t) by the trapezoidal rule, and the reliability left at the end of
+    the grid (a large value means the grid is too short for the MTTF)
+    """
+    lifetimes = {name: validate_lifetime(spec) for name, spec in lifetimes.items()}
+    times = default_time_grid(lifetimes, points) if times is None else np.asarray(times, dtype=float)
+    if times.ndim != 1 or len(times) < 2 or np.any(np.diff(times) <= 0):
+        raise ValueError("The time grid must be increasing with at least two points")
+
+    sweep = ReliabilitySweep(G, max_order=max_order, source=source, sink=sink, cut_strategy=cut_strategy)
+    failed = {name: components.get(name, DEFAULT_FAILURE_PROB) for name in sweep.components}
+    down = dict(failed)
+    for name, spec in lifetimes.items():
+        if name in failed:
+            failed[name] = lifetime_unreliability(spec, times)
+            down[name] = lifetime_unavailability(spec, times)
+
+    reliability = sweep.reliability(sweep.probability_matrix(failed, len(times)))
+    availability = sweep.reliability(sweep.probability_matrix(down, len(times)))
+    trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+    return {
+        'times': times.tolist(),
+        'reliability': reliability.tolist(),
+        'availability': availability.tolist(),
+        'mttf': float(trapezoid(reliability, times)) if times[0] == 0 else None,
+        'reliability_at_end': float(reliability[-1]),
+        'availability_at_end': float(availability[-1]),
+        'cut_strategy': {'strategy': sweep.strategy, 'reason': sweep.strategy_reason},
+    }
+
+
+def monte_carlo_diagram(G, components, **options):
+    """Reduce a diagram and estimate its reliability with monte_carlo_reliability.
+
+    With common-cause groups each sample first draws which common-cause
+    events occurred, then the components given those events.
+    """
+    ccf = ccf_groups(G)
+    if not ccf:
+        reduced, probs, _ = reduce_series_parallel(G, with_voting(G, components))
+        weights = None
+    else:
+        _, _, weights, _, scenario_probs = ccf_scenario_arrays(ccf, components)
+        probs = with_voting(G, scenario_probs)
+        reduced, _, blocks = reduce_series_parallel(G, {})
+        for name, (kind, members) in blocks.items():
+            probs[name] = block_probability(kind, [probs.get(m, DEFAULT_FAILURE_PROB) for m in members])
+    if not reduced.has_path('source', 'sink'):
+        raise ValueError("No path found from source to sink")
+    return monte_carlo_reliability(reduced, probs, scenario_weights=weights, **options)
+
+
+# Functions a background job can run, and which of them report progress
+JOBS = {
+    'analyze': analyze,
+    'approximate': approximate_reliability,
+    'monte_carlo': monte_carlo_diagram,
+    'curves': reliability_curves,
+}
+PROGRESS_JOBS = ('analyze', 'approximate')
+
+# Jobs that take an AnalysisCache, which serve_jobs keeps for the life of its process
+CACHE_JOBS = ('analyze', 'approximate')
+
+# Shortest time between two progress events of a background job, in seconds
+JOB_PROGRESS_INTERVAL = 0.1
+
+
+def _run_job(events, job, args, kwargs):
+    """JOBS[job](*args, **kwargs), posting its progress and cut set events to the queue events"""
+    last_progress = 0.0
+
+    def progress(message):
+        nonlocal last_progress
+        now = time.monotonic()
+        if now - last_progress >= JOB_PROGRESS_INTERVAL:
+            last_progress = now
+            events.put(('progress', message))
+
+    def on_order(order, cut_sets, probs):
+        events.put(('order', order, cut_sets, probs))
+
+    if job in PROGRESS_JOBS:
+        kwargs = dict(kwargs, progress=progress)
+    if job == 'analyze':
+        kwargs['on_order'] = on_order
+    return JOBS[job](*args, **kwargs)
+
+
+def run_job(events, job, args, kwargs):
+    """Entry point of a background analysis process.
+
+    Runs JOBS[job](*args, **kwargs) and posts events to the queue events:
+    ('progress', message), at most every JOB_PROGRESS_INTERVAL seconds;
+    ('order', order, cut_sets, probs) as each cut set order of an
+    'analyze' job is found; and finally ('done', result, cache), with the
+    AnalysisCache passed in kwargs so the caller can keep what was
+    learned, or ('error', message).
+    """
+    try:
+        result = _run_job(events, job, args, kwargs)
+    except Exception as e:
+        events.put(('error', str(e) or type(e).__name__))
+        return
+    events.put(('done', result, kwargs.get('cache')))
+
+
+def serve_jobs(tasks, events, maxsize=128):
+    """Entry point of a persistent background analysis process.
+
+    Reads (job, args, kwargs) tasks from the queue tasks and runs them one
+    after another as run_job does, until it reads None. The process keeps
+    one AnalysisCache for all of its jobs and passes it to those that take
+    one (CACHE_JOBS), so the cache stays where it is used instead of being
+    copied to and from the process on every run; the 'done' events carry
+    None in place of the cache.
+    """
+    cache = AnalysisCache(maxsize)
+    while (task := tasks.get()) is not None:
+        job, args, kwargs = task
+        if job in CACHE_JOBS:
+            kwargs = dict(kwargs, cache=cache)
+        try:
+            result = _run_job(events, job, args, kwargs)
+        except Exception as e:
+            events.put(('error', str(e) or type(e).__name__))
+            continue
+        events.put(('done', result, None))
+
+
+def diagram_from_dict(data):
+    """Build (G, components) from the dict form of a diagram file, with G a CompactGraph.
+
+    Component lifetimes, when the file has them, are kept in G.graph['lifetimes'],
+    k-out-of-n voting blocks in G.graph['voting'] and common-cause groups in
+    G.graph['ccf'].
+    """
+    components = {}
+    for name, prob in data.get('components', {}).items():
+        prob = float(prob)
+        if not 0 <= prob <= 1:
+            raise ValueError(f"Invalid probability for component '{name}': {prob}")
+        components[name] = prob
+
+    voting = {name: validate_voting(name, spec, components) for name, spec in data.get('voting', {}).items()}
+    ccf = {}
+    for name, spec in data.get('ccf', {}).items():
+        if name in voting:
+            raise ValueError(f"Common-cause group '{name}' has the name of a voting block")
+        ccf[name] = validate_ccf(name, spec, components)
+    ccf_scenarios(ccf, components)  # checks the group count and that the groups are disjoint
+
+    G = CompactGraph()
+    G.add_node('source')
+    G.add_node('sink')
+    for node in data.get('nodes', []):
+        G.add_node(node)
+    for name, prob in components.items():
+        G.add_component(name, prob)
+    for conn in data.get('connections', []):
+        from_node, to_node, component = conn['from'], conn['to'], conn['component']
+        if component not in components and component not in voting:
+            raise ValueError(f"Connection from '{from_node}' to '{to_node}' uses unknown component '{component}'")
+        if from_node == to_node:
+            raise ValueError(f"Cannot connect node '{from_node}' to itself")
+        if G.has_edge(from_node, to_node):
+            raise ValueError(f"Connection from '{from_node}' to '{to_node}' already exists")
+        G.add_edge(from_node, to_node, component)
+
+    lifetimes = {}
+    for name, spec in data.get('lifetimes', {}).items():
+        if name not in components:
+            raise ValueError(f"Lifetime given for unknown component '{name}'")
+        lifetimes[name] = validate_lifetime(spec)
+    G.graph['lifetimes'] = lifetimes
+    G.graph['voting'] = voting
+    G.graph['ccf'] = ccf
+    for name, q in with_voting(G, components).items():
+        if name in voting:
+            G.add_component(name, q)
+    return G, components
+
+
+def diagram_to_dict(G, components=None, lifetimes=None):
+    """Dict form of a diagram file for G, the inverse of diagram_from_dict.
+
+    components and lifetimes default to what G itself stores.
+    """
+    G = as_compact(G)
+    voting = voting_blocks(G)
+    if components is None:
+        components = {name: prob for name, prob in zip(G.components, G.prob.tolist()) if name not in voting}
+    if lifetimes is None:
+        lifetimes = G.graph.get('lifetimes', {})
+    data = {
+        'components': dict(components),
+        'nodes': list(G.nodes),
+        'connections': [{'from': u, 'to': v, 'component': comp} for u, v, comp in G.edges()],
+    }
+    if lifetimes:
+        data['lifetimes'] = dict(lifetimes)
+    if voting:
+        data['voting'] = {name: dict(spec) for name, spec in voting.items()}
+    ccf = ccf_groups(G)
+    if ccf:
+        data['ccf'] = {name: dict(spec) for name, spec in ccf.items()}
+    return data
+
+
+def load_diagram(path):
+    """Read a diagram file and return (G, components)"""
+    with open(path, encoding='utf-8') as f:
+        return diagram_from_dict(json.load(f))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a reliability block diagram and write the results as JSON.")
+    parser.add_argument('diagram', help="diagram file (JSON)")
+    parser.add_argument('-o', '--output', help="results file, default stdout")
+    parser.add_argument('--max-order', type=int, help="only find cut sets up to this order")
+    parser.add_argument('--max-paths', type=int, help="stop path enumeration after this many paths")
+    parser.add_argument('--max-memory-mb', type=float, help="stop path enumeration above this memory use")
+    parser.add_argument('--cut-strategy', choices=CUT_STRATEGIES, default='auto',
+                        help="find cut sets from the enumerated paths, by a max-flow search on the graph, "
+                             "or pick per segment from the number of paths (default auto)")
+    parser.add_argument('--monte-carlo', action='store_true', help="estimate reliability by simulation instead")
+    parser.add_argument('--target-rel-error', type=float, default=0.01, help="Monte Carlo stopping error (default 0.01)")
+    parser.add_argument('--seed', type=int, help="Monte Carlo seed")
+    parser.add_argument('--approximate', action='store_true', help="bound the unreliability instead of computing it exactly")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="relative width of the bound pair to stop at (default 0.01)")
+    parser.add_argument('--sweep', help="CSV of component failure probabilities, one column per component "
+                                        "(header row) and one row per case; writes the reliability of each row")
+    parser.add_argument('--curve', action='store_true', help="write R(t), A(t) and the MTTF from the component lifetimes")
+    parser.add_argument('--horizon', type=float, help="end of the time grid for --curve (default: five mean lives)")
+    parser.add_argument('--points', type=int, default=2000, help="time grid points for --curve (default 2000)")
+    parser.add_argument('--profile', action='store_true', help="add stage timings and search counters to the results")
+    parser.add_argument('--cprofile', metavar='STATS_FILE',
+                        help="also run under cProfile: the top functions go into the results, the full "
+                             "statistics into STATS_FILE (readable with pstats or snakeviz)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="do not report progress on stderr")
+    args = parser.parse_args(argv)
+
+    def progress(message):
+        print(message, file=sys.stderr, flush=True)
+
+    profile = AnalysisProfile(cprofile=True) if args.cprofile else AnalysisProfile() if args.profile else None
+    try:
+        G, components = load_diagram(args.diagram)
+        if args.sweep:
+            sweep = ReliabilitySweep(G, max_order=args.max_order, cut_strategy=args.cut_strategy)
+            with open(args.sweep, encoding='utf-8') as f:
+                header = f.readline().strip().split(',')
+            table = np.loadtxt(args.sweep, delimiter=',', skiprows=1, ndmin=2)
+            reliability = sweep.reliability({name: table[:, i] for i, name in enumerate(header)})
+            results = {'components': sweep.components, 'reliability': reliability.tolist(),
+                       'cut_strategy': {'strategy': sweep.strategy, 'reason': sweep.strategy_reason}}
+        elif args.curve:
+            times = np.linspace(0.0, args.horizon, args.points) if args.horizon else None
+            results = reliability_curves(G, components, G.graph['lifetimes'], times=times,
+                                         points=args.points, max_order=args.max_order,
+                                         cut_strategy=args.cut_strategy)
+        elif args.approximate:
+            results = approximate_reliability(G, components, rel_tolerance=args.tolerance, max_order=args.max_order,
+                                              max_paths=args.max_paths, max_memory_mb=args.max_memory_mb,
+                                              progress=None if args.quiet else progress, profile=profile,
+                                              cut_strategy=args.cut_strategy)
+        elif args.monte_carlo:
+            results = monte_carlo_diagram(G, components, seed=args.seed, target_rel_error=args.target_rel_error)
+        else:
+            results = analyze(G, components, max_order=args.max_order, max_paths=args.max_paths,
+                              max_memory_mb=args.max_memory_mb, progress=None if args.quiet else progress,
+                              profile=profile, cut_strategy=args.cut_strategy)
+        if profile is not None and profile.profiler is not None:
+            profile.profiler.dump_stats(args.cprofile)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Reliability Block Diagram batch runner
+Runs the headless analysis core (rbd_analysis) over thousands of diagrams on
+all cores. Diagrams are read lazily from a directory of diagram files or from
+a JSONL file with one diagram per line, handed to a set of worker processes,
+and each result is streamed out as soon as it finishes.
+A pathological diagram cannot stall the batch: every diagram gets a wall time
+limit, after which its worker is killed and replaced, and every worker runs
+under an address space limit where the platform supports it (Unix).
+Command line:
+-------------
+    python rbd_batch.py diagrams/ -o results.jsonl --timeout 60 --memory-limit-mb 2048
+    python rbd_batch.py variants.jsonl -j 16 --max-order 4
+Each output line is a JSON record with the diagram id, a status of 'ok',
+'error', 'timeout', 'memory_limit' or 'crashed', the run time in seconds,
+and the analysis results or the error message.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits
+    resource = None
+
+from rbd_analysis import CUT_STRATEGIES, AnalysisProfile, analyze, diagram_from_dict, monte_carlo_diagram
+
+
+def iter_diagrams(path):
+    """Yield (diagram_id, diagram) from a directory of .json files or a .jsonl file.
+
+    A diagram is a dict, or the raw JSON text when it is left to the worker
+    to parse (whole files, and lines that are not valid JSON), so that a
+    malformed diagram fails on its own instead of stopping the batch.
+    """
+    if os.path.isdir(path):
+        for entry in sorted(os.listdir(path)):
+            if entry.endswith('.json'):
+                with open(os.path.join(path, entry), encoding='utf-8') as f:
+                    yield os.path.splitext(entry)[0], f.read()
+        return
+
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                yield str(line_no), line
+                continue
+            yield str(data.get('id', line_no)), data
+
+
+def analyze_diagram(data, options):
+    """Analyze one diagram (dict or JSON text) with the batch options"""
+    if isinstance(data, str):
+        data = json.loads(data)
+    G, components = diagram_from_dict(data)
+    if options.get('monte_carlo'):
+        return monte_carlo_diagram(G, components, seed=options.get('seed'),
+                                   target_rel_error=options.get('target_rel_error', 0.01))
+    return analyze(G, components, max_order=options.get('max_order'), max_paths=options.get('max_paths'),
+                   max_memory_mb=options.get('max_path_memory_mb'),
+                   keep_sequences=options.get('keep_sequences', 0),
+                   profile=AnalysisProfile() if options.get('profile') else None,
+                   cut_strategy=options.get('cut_strategy', 'auto'))
+
+
+def _worker(conn, options, memory_limit_mb):
+    """Worker process loop: receive (id, diagram) tasks and send back result records"""
+    if memory_limit_mb is not None and resource is not None:
+        limit = int(memory_limit_mb * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        diagram_id, data = task
+        start = time.perf_counter()
+        record = {'id': diagram_id}
+        try:
+            record['results'] = analyze_diagram(data, options)
+            record['status'] = 'ok'
+        except MemoryError:
+            record['status'] = 'memory_limit'
+            record['error'] = f"memory limit of {memory_limit_mb} MB exceeded"
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+        record['seconds'] = time.perf_counter() - start
+        conn.send(record)
+
+
+def run_batch(tasks, workers=None, timeout=None, memory_limit_mb=None, **options):
+    """Analyze (diagram_id, diagram_dict) tasks across worker processes.
+
+    Yields one result record per task, in the order they finish. tasks is
+    consumed lazily, so it can be a generator over a very large input.
+
+    Parameters:
+    ----------
+    tasks : iterable of (str, dict)
+            Diagram ids and diagram dicts, e.g. from iter_diagrams
+    workers : int or None
+            Number of worker processes, defaults to the number of cores
+    timeout : float or None
+            Wall time limit per diagram in seconds
+    memory_limit_mb : float or None
+            Address space limit per worker process (Unix only)
+    options :
+            Analysis options: max_order, max_paths, max_path_memory_mb,
+            keep_sequences, cut_strategy, monte_carlo, target_rel_error, seed, profile
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = iter(tasks)
+    processes = {}  # parent end of the pipe: worker process
+    busy = {}  # parent end of the pipe: (diagram_id, start time)
+    idle = []
+
+    def spawn():
+        parent_conn, child_conn = mp.Pipe()
+        process = mp.Process(target=_worker, args=(child_conn, options, memory_limit_mb), daemon=True)
+        process.start()
+        child_conn.close()
+        processes[parent_conn] = process
+        return parent_conn
+
+    def replace(conn):
+        process = processes.pop(conn)
+        if process.is_alive():
+            process.kill()
+        process.join()
+        conn.close()
+        idle.append(spawn())
+
+    try:
+        for _ in range(workers):
+            idle.append(spawn())
+
+        remaining = True
+        while True:
+            while idle and remaining:
+                try:
+                    task = next(tasks)
+                except StopIteration:
+                    remaining = False
+                    break
+                conn = idle.pop()
+                conn.send(task)
+                busy[conn] = (task[0], time.monotonic())
+            if not busy:
+                break
+
+            wait_timeout = None
+            if timeout is not None:
+                first_deadline = min(start for _, start in busy.values()) + timeout
+                wait_timeout = max(0.0, first_deadline - time.monotonic())
+            wait(list(busy) + [processes[conn].sentinel for conn in busy], wait_timeout)
+
+            now = time.monotonic()
+            for conn in list(busy):
+                diagram_id, start = busy[conn]
+                if conn.poll():
+                    try:
+                        record = conn.recv()
+                    except EOFError:
+                        record = None
+                    if record is not None:
+                        del busy[conn]
+                        idle.append(conn)
+                        yield record
+                        continue
+
+                if not processes[conn].is_alive():
+                    # Killed from outside, e.g. by the OOM killer, or crashed in native code
+                    del busy[conn]
+                    exitcode = processes[conn].exitcode
+                    replace(conn)
+                    yield {'id': diagram_id, 'status': 'crashed', 'seconds': now - start,
+                           'error': f"worker exited with code {exitcode}"}
+                elif timeout is not None and now - start > timeout:
+                    del busy[conn]
+                    replace(conn)
+                    yield {'id': diagram_id, 'status': 'timeout', 'seconds': now - start,
+                           'error': f"time limit of {timeout} s exceeded"}
+    finally:
+        for conn, process in processes.items():
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for conn, process in processes.items():
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze many reliability block diagrams in parallel.")
+    parser.add_argument('input', help="directory of diagram files (.json) or a JSONL file")
+    parser.add_argument('-o', '--output', help="results file (JSONL), default stdout")
+    parser.add_argument('-j', '--workers', type=int, help="worker processes, default one per core")
+    parser.add_argument('--timeout', type=float, help="wall time limit per diagram in seconds")
+    parser.add_argument('--memory-limit-mb', type=float, help="address space limit per worker (Unix only)")
+    parser.add_argument('--max-order', type=int, help="only find cut sets up to this order")
+    parser.add_argument('--max-paths', type=int, help="stop path enumeration after this many paths")
+    parser.add_argument('--max-path-memory-mb', type=float, help="stop path enumeration above this memory use")
+    parser.add_argument('--cut-strategy', choices=CUT_STRATEGIES, default='auto',
+                        help="how cut sets are found: paths, flow or auto (default)")
+    parser.add_argument('--keep-paths', type=int, default=0, help="success paths to include in each result")
+    parser.add_argument('--monte-carlo', action='store_true', help="estimate reliability by simulation instead")
+    parser.add_argument('--target-rel-error', type=float, default=0.01, help="Monte Carlo stopping error (default 0.01)")
+    parser.add_argument('--seed', type=int, help="Monte Carlo seed")
+    parser.add_argument('--profile', action='store_true', help="add stage timings and search counters to each result")
+    args = parser.parse_args(argv)
+
+    if args.memory_limit_mb is not None and resource is None:
+        print("Warning: memory limits are not supported on this platform", file=sys.stderr)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    counts = {}
+    start = time.perf_counter()
+    try:
+        for record in run_batch(iter_diagrams(args.input), workers=args.workers, timeout=args.timeout,
+                                memory_limit_mb=args.memory_limit_mb, max_order=args.max_order,
+                                max_paths=args.max_paths, max_path_memory_mb=args.max_path_memory_mb,
+                                keep_sequences=args.keep_paths, cut_strategy=args.cut_strategy,
+                                monte_carlo=args.monte_carlo, target_rel_error=args.target_rel_error,
+                                seed=args.seed, profile=args.profile):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"Analyzed {sum(counts.values())} diagrams in {time.perf_counter() - start:.1f} s ({summary or 'none'})",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Reliability Block Diagram benchmarks
+Times the analysis pipeline stage by stage on families of synthetic diagrams
+of growing size, so that a change to the analysis code can be checked for
+speed and memory regressions before it is merged.
+Families:
+---------
+* series, parallel: n components in series or in parallel
+* k_out_of_n: majority voting, k = n // 2 + 1 out of n, built as the
+  parallel combination of every series group of k shared components
+* voting: the same majority vote as one native k-out-of-n block
+* bridge: an n x n lattice of bridges between source and sink
+* ladder: n rungs of a two-rail ladder network
+* random_dag: a random directed acyclic diagram with n inner nodes
+Stages:
+-------
+reduction (reduce_series_parallel), paths (PathEnumeration), cut_sets
+(find_minimal_cut_sets), unreliability (calc_system_unreliability_from_cut_sets),
+analyze (the whole segment-by-segment pipeline) and render (layered layout
+and drawing with draw_diagram, when matplotlib is installed).
+Every stage is run once under tracemalloc for its peak memory, then timed
+as the best of --repeat runs, so that tracing does not distort the times.
+Command line:
+-------------
+    python rbd_benchmark.py -o baseline.json
+    python rbd_benchmark.py --baseline baseline.json
+    python rbd_benchmark.py --family ladder bridge --sizes 4 8 12 --repeat 5
+With --baseline every stage is compared with the same case in the saved run,
+and the exit status is 1 if any stage got slower or used more memory than
+the tolerance allows, or if the path and cut set counts changed.
+"""
+import argparse
+import gc
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from itertools import combinations
+
+from rbd_analysis import (CompactGraph, PathEnumeration, analyze, calc_system_unreliability_from_cut_sets,
+                          find_minimal_cut_sets, reduce_series_parallel, with_voting)
+from rbd_layout import draw_diagram, layered_layout
+
+# Failure probability of every component in the synthetic diagrams
+BENCHMARK_FAILURE_PROB = 0.01
+
+# A stage is flagged if it is this much slower (or larger) than the baseline (timings of the
+# same run vary by up to about 30% on a busy machine, rendering most)
+DEFAULT_TOLERANCE = 0.5
+# and also slower by more than this, so that timer noise on tiny stages is ignored
+MIN_REGRESSION_SECONDS = 0.005
+MIN_REGRESSION_KB = 64
+
+
+def _diagram(edges):
+    """CompactGraph and components for (u, v, component) edges with the benchmark probability"""
+    components = {comp: BENCHMARK_FAILURE_PROB for _, _, comp in edges}
+    return CompactGraph.from_edges(edges, components, nodes=('source', 'sink')), components
+
+
+def series_diagram(n):
+    """n components in series"""
+    nodes = ['source'] + [f"n{i}" for i in range(1, n)] + ['sink']
+    return _diagram([(nodes[i], nodes[i + 1], f"C{i}") for i in range(n)])
+
+
+def parallel_diagram(n):
+    """n components in parallel (each on a branch of two connections through its own node)"""
+    edges = []
+    for i in range(n):
+        edges.append(('source', f"n{i}", f"C{i}"))
+        edges.append((f"n{i}", 'sink', f"C{i}"))
+    return _diagram(edges)
+
+
+def k_out_of_n_diagram(n, k=None):
+    """k-out-of-n system (default k = n // 2 + 1) as parallel series groups of shared components"""
+    k = n // 2 + 1 if k is None else k
+    edges = []
+    for g, group in enumerate(combinations(range(n), k)):
+        nodes = ['source'] + [f"g{g}_{j}" for j in range(1, k)] + ['sink']
+        edges.extend((nodes[j], nodes[j + 1], f"C{i}") for j, i in enumerate(group))
+    return _diagram(edges)
+
+
+def voting_diagram(n, k=None):
+    """k-out-of-n system (default k = n // 2 + 1) as a single voting block"""
+    k = n // 2 + 1 if k is None else k
+    G, _ = _diagram([('source', 'sink', "V")])
+    components = {f"C{i}": BENCHMARK_FAILURE_PROB for i in range(n)}
+    for name, prob in components.items():
+        G.add_component(name, prob)
+    G.graph['voting'] = {"V": {'k': k, 'members': list(components)}}
+    return G, components
+
+
+def bridge_diagram(n):
+    """n x n lattice: every row runs left to right and neighbouring rows are bridged downwards"""
+    edges = []
+    count = 0
+
+    def add(u, v):
+        nonlocal count
+        edges.append((u, v, f"C{count}"))
+        count += 1
+
+    for r in range(n):
+        add('source', f"r{r}c0")
+        for c in range(n):
+            add(f"r{r}c{c}", f"r{r}c{c + 1}")
+            if r + 1 < n:
+                add(f"r{r}c{c + 1}", f"r{r + 1}c{c + 1}")
+        add(f"r{r}c{n}", 'sink')
+    return _diagram(edges)
+
+
+def ladder_diagram(n):
+    """Two rails with a rung between them after every step"""
+    edges = []
+    top = bottom = 'source'
+    for i in range(n):
+        edges.append((top, f"t{i}", f"T{i}"))
+        edges.append((bottom, f"b{i}", f"B{i}"))
+        edges.append((f"t{i}", f"b{i}", f"R{i}"))
+        top, bottom = f"t{i}", f"b{i}"
+    edges.append((top, 'sink', "T_end"))
+    edges.append((bottom, 'sink', "B_end"))
+    return _diagram(edges)
+
+
+def random_dag_diagram(n, seed=0):
+    """n inner nodes, each fed by two earlier nodes, with the last few nodes feeding the sink"""
+    rnd = random.Random(seed)
+    nodes = ['source'] + [f"n{i}" for i in range(n)]
+    edges = set()
+    for i in range(1, len(nodes)):
+        for u in rnd.sample(nodes[:i], min(2, i)):
+            edges.add((u, nodes[i]))
+    for v in nodes[-max(2, n // 8):]:
+        edges.add((v, 'sink'))
+    return _diagram([(u, v, f"C{i}") for i, (u, v) in enumerate(sorted(edges))])
+
+
+FAMILIES = {
+    'series': (series_diagram, [10, 100, 1000]),
+    'parallel': (parallel_diagram, [4, 16, 64]),
+    'k_out_of_n': (k_out_of_n_diagram, [5, 7, 9]),
+    'voting': (voting_diagram, [9, 99, 999]),
+    'bridge': (bridge_diagram, [2, 3]),
+    'ladder': (ladder_diagram, [4, 8, 10]),
+    'random_dag': (random_dag_diagram, [10, 15, 20]),
+}
+
+
+def _render(G):
+    """Lay out and draw a diagram on an off-screen figure, as the GUI does"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(6, 4), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    draw_diagram(fig.add_subplot(111), G, layered_layout(G))
+    fig.tight_layout()
+    canvas.draw()
+
+
+def _stage_functions(G, components, render):
+    """The stages of one case, each a function of the previous stage's output"""
+    component_probs = with_voting(G, components)
+
+    def reduction(_):
+        return reduce_series_parallel(G, component_probs)
+
+    def paths(reduced):
+        return reduced, PathEnumeration(reduced[0])
+
+    def cut_sets(state):
+        (_, probs, _), enum = state
+        return probs, find_minimal_cut_sets(enum.masks, names=enum.names)
+
+    def unreliability(state):
+        probs, cuts = state
+        return calc_system_unreliability_from_cut_sets(cuts, probs)
+
+    stages = [('reduction', reduction), ('paths', paths), ('cut_sets', cut_sets), ('unreliability', unreliability),
+              ('analyze', lambda _: analyze(G, components, keep_sequences=0))]
+    if render:
+        stages.append(('render', lambda _: _render(G)))
+    return stages
+
+
+def run_case(G, components, repeat=3, render=True):
+    """
+    Time every stage of the pipeline on one diagram.
+    Returns a dict with the seconds (best of repeat) and tracemalloc peak
+    in KB of each stage, and the sizes of the diagram and its results.
+    """
+    stages = _stage_functions(G, components, render)
+    results = {}
+    outputs = {}
+    value = None
+    for name, stage in stages:
+        # The analyze and render stages start from the diagram, the others from the previous stage
+        start_value = None if name in ('analyze', 'render') else value
+        # The traced run comes first and doubles as a warm-up for the timed runs
+        gc.collect()
+        tracemalloc.start()
+        stage(start_value)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        best = math.inf
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            output = stage(start_value)
+            best = min(best, time.perf_counter() - start)
+        results[name] = {'seconds': best, 'peak_kb': peak / 1024}
+        outputs[name] = output
+        if name not in ('analyze', 'render'):
+            value = output
+
+    (reduced, _, _), enum = outputs['paths']
+    cut_sets = outputs['cut_sets'][1]
+    counts = {
+        'nodes': G.number_of_nodes(),
+        'connections': G.number_of_edges(),
+        'components': len(components),
+        'reduced_connections': reduced.number_of_edges(),
+        'paths': enum.count,
+        'cut_sets': len(cut_sets),
+        'max_cut_set_order': max((len(c) for c in cut_sets), default=0),
+    }
+    return {'stages': results, 'counts': counts, 'unreliability': outputs['unreliability']}
+
+
+def run_suite(families=None, sizes=None, repeat=3, render=True, progress=None):
+    """Run the benchmark cases and return the results as plain data, keyed by 'family-size'"""
+    if render:
+        # Font loading and other one-off matplotlib setup would otherwise be charged to the first case
+        _render(series_diagram(2)[0])
+    cases = {}
+    for family in families or FAMILIES:
+        build, default_sizes = FAMILIES[family]
+        for size in sizes or default_sizes:
+            case = f"{family}-{size}"
+            if progress:
+                progress(f"Running {case}...")
+            G, components = build(size)
+            cases[case] = dict(run_case(G, components, repeat=repeat, render=render), family=family, size=size)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'cases': cases,
+    }
+
+
+def compare_runs(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare a run with a baseline run of the same cases.
+    Returns a list of findings, each a dict with the case, the stage (or
+    'counts'), what changed, and the baseline and current values. Cases or
+    stages missing from either run are skipped.
+    """
+    findings = []
+    for case, result in current['cases'].items():
+        old = baseline['cases'].get(case)
+        if old is None:
+            continue
+        for stage, timing in result['stages'].items():
+            before = old['stages'].get(stage)
+            if before is None:
+                continue
+            for key, floor, label in (('seconds', MIN_REGRESSION_SECONDS, 'slower'),
+                                      ('peak_kb', MIN_REGRESSION_KB, 'more memory')):
+                if timing[key] > before[key] * (1 + tolerance) and timing[key] - before[key] > floor:
+                    findings.append({'case': case, 'stage': stage, 'change': label,
+                                     'baseline': before[key], 'current': timing[key]})
+        for key in ('paths', 'cut_sets', 'max_cut_set_order'):
+            if key in old['counts'] and result['counts'][key] != old['counts'][key]:
+                findings.append({'case': case, 'stage': 'counts', 'change': f"{key} changed",
+                                 'baseline': old['counts'][key], 'current': result['counts'][key]})
+    return findings
+
+
+def format_report(run, findings=None, baseline=None):
+    """Text table of a run, with the ratio to the baseline and the findings if given"""
+    lines = [f"{'case':<16}{'stage':<15}{'seconds':>12}{'peak KB':>12}" + ("   vs baseline" if baseline else "")]
+    for case, result in run['cases'].items():
+        old = baseline['cases'].get(case) if baseline else None
+        for stage, timing in result['stages'].items():
+            line = f"{case:<16}{stage:<15}{timing['seconds']:>12.5f}{timing['peak_kb']:>12.1f}"
+            if old and stage in old['stages'] and old['stages'][stage]['seconds'] > 0:
+                line += f"   x{timing['seconds'] / old['stages'][stage]['seconds']:.2f}"
+            lines.append(line)
+        counts = result['counts']
+        lines.append(f"{'':<16}{counts['paths']} paths, {counts['cut_sets']} cut sets "
+                     f"(max order {counts['max_cut_set_order']}), {counts['connections']} connections")
+    if findings is not None:
+        lines.append("")
+        if not findings:
+            lines.append("No regressions against the baseline.")
+        for f in findings:
+            lines.append(f"REGRESSION {f['case']} {f['stage']}: {f['change']} "
+                         f"({f['baseline']:.5g} -> {f['current']:.5g})")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic diagrams.")
+    parser.add_argument('--family', nargs='+', choices=sorted(FAMILIES), help="families to run (default all)")
+    parser.add_argument('--sizes', nargs='+', type=int, help="sizes to run for every family (default per family)")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per stage, the best is kept (default 3)")
+    parser.add_argument('--no-render', action='store_true', help="skip the render stage")
+    parser.add_argument('-o', '--output', help="write the results as JSON, e.g. to use as a baseline")
+    parser.add_argument('--baseline', help="results of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown before a stage is flagged (default {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    render = not args.no_render
+    if render:
+        try:
+            import matplotlib  # noqa: F401
+        except ImportError:
+            print("matplotlib is not installed, skipping the render stage", file=sys.stderr)
+            render = False
+
+    try:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        run = run_suite(args.family, args.sizes, repeat=args.repeat, render=render,
+                        progress=lambda message: print(message, file=sys.stderr, flush=True))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(run, f, indent=2)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    findings = compare_runs(run, baseline, args.tolerance) if baseline else None
+    print(format_report(run, findings, baseline))
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
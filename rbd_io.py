@@ -0,0 +1,349 @@
+"""
+Reliability Block Diagram files
+Saving and loading diagrams together with their analysis results, and
+importing diagrams from plain edge lists.
+A project file (.rbd) is a short JSON header followed by raw little-endian
+arrays:
+
+    8 bytes   magic b"RBDPROJ1"
+    8 bytes   header length (uint64)
+    header    JSON: the diagram, the small part of the results, and the
+              offset, dtype and length of every array section
+    sections  8-byte aligned arrays, read back with numpy.memmap
+
+The cut sets and success paths are the bulky part of a result, so they are
+stored as packed arrays (offsets into one array of name indices) and the
+cut set probabilities as one float64 array. Loading maps these sections
+instead of parsing them, so reopening an analysis with 100k cut sets is
+instant; each cut set is only decoded when it is read.
+A text report (.txt) lists the results in full: every cut set with its
+probability, the importance table, the kept success paths and the
+reliability expression. It is written line by line, so its size is not
+limited by memory, while the GUI only shows the top of each listing.
+Command line:
+-------------
+    python rbd_io.py edges.csv -o plant.rbd --analyze
+    python rbd_io.py plant.rbd -o plant.json
+    python rbd_io.py plant.rbd -o plant.txt
+converts between edge lists (.csv, .json), diagram files (.json) and
+project files (.rbd), optionally running the exact analysis first, or
+writes the results of a project as a text report.
+An edge list is a CSV file with a from,to,component[,probability] header,
+or a JSON list of {"from", "to", "component", "probability"} objects.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from collections.abc import Sequence
+
+import numpy as np
+
+from rbd_analysis import (DEFAULT_FAILURE_PROB, analyze, diagram_from_dict, diagram_to_dict,
+                          iter_reliability_expression, top_cut_sets)
+
+PROJECT_MAGIC = b"RBDPROJ1"
+SECTION_ALIGNMENT = 8
+
+# Most probable cut sets listed at the top of a text report, ahead of the full listing
+REPORT_TOP_CUT_SETS = 100
+
+
+class PackedNameLists(Sequence):
+    """
+    Read-only list of name lists stored as packed arrays.
+    Item i is [names[j] for j in members[offsets[i]:offsets[i + 1]]],
+    decoded only when it is read, so the arrays can be memory-mapped.
+    Parameters:
+    ----------
+    offsets : numpy.ndarray
+            Start of each list in members, plus the end of the last one
+    members : numpy.ndarray
+            Indices into names
+    names : list of str
+            Name table
+    """
+    def __init__(self, offsets, members, names):
+        self.offsets = offsets
+        self.members = members
+        self.names = names
+
+    @classmethod
+    def pack(cls, lists, names=None):
+        """Pack a list of name lists, building the name table if not given"""
+        index = {name: i for i, name in enumerate(names)} if names is not None else {}
+        names = list(names) if names is not None else []
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        members = []
+        for i, items in enumerate(lists):
+            for name in items:
+                if name not in index:
+                    index[name] = len(names)
+                    names.append(name)
+                members.append(index[name])
+            offsets[i + 1] = len(members)
+        return cls(offsets, np.array(members, dtype=np.int32), names)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("list index out of range")
+        names = self.names
+        return [names[j] for j in self.members[self.offsets[i]:self.offsets[i + 1]].tolist()]
+
+    def tolist(self):
+        return list(self)
+
+
+def _jsonable(value):
+    """json.dump default for the packed and array values in loaded results"""
+    if isinstance(value, PackedNameLists):
+        return value.tolist()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def save_project(path, G, components, results=None, lifetimes=None):
+    """Write a diagram, and optionally the results of analyze(), to a project file.
+
+    The cut sets, their probabilities and the success paths go into
+    binary sections; everything else in results is kept in the header.
+    """
+    header = {'diagram': diagram_to_dict(G, components, lifetimes), 'sections': {}}
+    arrays = []
+    if results is not None:
+        results = dict(results)
+        results.pop('cache', None)
+        cut_sets = PackedNameLists.pack(results.pop('cut_sets'))
+        paths = dict(results['paths'])
+        sequences = PackedNameLists.pack(paths.pop('sequences'), cut_sets.names)
+        results['paths'] = paths
+        arrays = [('cut_offsets', cut_sets.offsets), ('cut_members', cut_sets.members),
+                  ('cut_probs', np.asarray(results.pop('cut_set_probs'), dtype=np.float64)),
+                  ('path_offsets', sequences.offsets), ('path_members', sequences.members)]
+        arrays = [(name, np.ascontiguousarray(data, dtype=data.dtype.newbyteorder('<'))) for name, data in arrays]
+        header['names'] = sequences.names
+        header['results'] = results
+
+    # Section offsets are relative to the end of the header
+    position = 0
+    for name, data in arrays:
+        header['sections'][name] = {'offset': position, 'dtype': data.dtype.str, 'length': len(data)}
+        position += -(-data.nbytes // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+    encoded = json.dumps(header, default=_jsonable).encode('utf-8')
+    encoded += b" " * (-len(encoded) % SECTION_ALIGNMENT)
+    # The sections may be memory-mapped from path itself (a loaded project saved back in place),
+    # so the file is written next to it and only replaces it once complete
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(PROJECT_MAGIC)
+            f.write(len(encoded).to_bytes(8, 'little'))
+            f.write(encoded)
+            for _, data in arrays:
+                f.write(data.tobytes())
+                f.write(b"\0" * (-data.nbytes % SECTION_ALIGNMENT))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load_project(path, mmap=True):
+    """Read a project file and return (G, components, results).
+
+    results is None when the file holds only the diagram. With mmap the
+    cut set and path sections are memory-mapped, so loading does not
+    depend on their size; results['cut_sets'] and the path sequences are
+    then PackedNameLists and results['cut_set_probs'] a float array.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(PROJECT_MAGIC)) != PROJECT_MAGIC:
+            raise ValueError(f"{path} is not a reliability block diagram project file")
+        length = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(length).decode('utf-8'))
+        start = f.tell()
+
+        sections = {}
+        for name, info in header['sections'].items():
+            dtype = np.dtype(info['dtype'])
+            if info['length'] == 0:
+                sections[name] = np.zeros(0, dtype=dtype)
+            elif mmap:
+                sections[name] = np.memmap(path, dtype=dtype, mode='r', offset=start + info['offset'],
+                                           shape=(info['length'],))
+            else:
+                f.seek(start + info['offset'])
+                sections[name] = np.fromfile(f, dtype=dtype, count=info['length'])
+
+    G, components = diagram_from_dict(header['diagram'])
+    results = header.get('results')
+    if results is not None:
+        names = header['names']
+        results['cut_sets'] = PackedNameLists(sections['cut_offsets'], sections['cut_members'], names)
+        results['cut_set_probs'] = sections['cut_probs']
+        results['paths']['sequences'] = PackedNameLists(sections['path_offsets'], sections['path_members'], names)
+    return G, components, results
+
+
+def iter_report(results):
+    """Lines of the text report of analyze() results, one at a time.
+
+    Cut sets and paths are read one by one, so this works the same on
+    the memory-mapped results of a loaded project.
+    """
+    paths = results['paths']
+    cut_sets = results['cut_sets']
+    cut_set_probs = results['cut_set_probs']
+    yield "===== RELIABILITY ANALYSIS REPORT =====\n\n"
+    if not paths['complete'] or results['max_order'] is not None:
+        yield f"System Reliability (lower bound): {results['reliability_lower']:.12f}\n"
+        yield f"System Reliability (upper bound): {results['reliability_upper']:.12f}\n"
+    else:
+        yield f"System Reliability: {results['reliability']:.12f}\n"
+        yield f"System Unreliability: {results['unreliability']:.12f}\n"
+    orders = ", ".join(f"order {order}: {count}" for order, count in results['cut_set_orders'].items())
+    yield f"Minimal Cut Sets: {len(cut_sets)} ({orders or 'none'})\n"
+    if paths['count'] is None:
+        yield "Success Paths: not enumerated (cut sets found by the max-flow search)\n"
+    else:
+        yield f"Success Paths: {paths['count']} ({len(paths['sequences'])} listed)\n"
+    if not paths['complete']:
+        yield f"Path enumeration stopped early ({paths['stop_reason']}); the cut sets are those of the enumerated paths.\n"
+
+    for block in results.get('voting', []):
+        yield f"Voting block {block['name']} = {block['k']}-of-{block['n']}({', '.join(block['members'])}) (q = {block['q']:.9f})\n"
+    for group in results.get('ccf', []):
+        yield f"Common-cause group {group['name']}: β = {group['beta']:g} over {', '.join(group['members'])}\n"
+
+    top = top_cut_sets(cut_set_probs, REPORT_TOP_CUT_SETS)
+    yield f"\nMost Probable Cut Sets (top {len(top)}):\n"
+    for i in top:
+        cut_set = cut_sets[i]
+        yield f"  Cut Set {i + 1}: {{{', '.join(cut_set)}}} (Order {len(cut_set)}, q = {cut_set_probs[i]:.6e})\n"
+
+    yield "\nAll Minimal Cut Sets:\n"
+    for i, (cut_set, prob) in enumerate(zip(cut_sets, cut_set_probs), 1):
+        yield f"  Cut Set {i}: {{{', '.join(cut_set)}}} (Order {len(cut_set)}, q = {prob:.6e})\n"
+
+    if results['importance']:
+        yield "\nComponent Importance (by Birnbaum):\n"
+        yield f"  {'Component':<16}{'Birnbaum':>14}{'F-V':>12}{'RAW':>12}{'RRW':>12}\n"
+        for comp, imp in results['importance'].items():
+            values = [f"{imp[key]:.4g}" if imp[key] is not None else "n/a" for key in ('fussell_vesely', 'raw', 'rrw')]
+            yield f"  {comp:<16}{imp['birnbaum']:>14.6g}{values[0]:>12}{values[1]:>12}{values[2]:>12}\n"
+
+    if paths['sequences']:
+        yield "\nSuccess Paths:\n"
+        for i, path in enumerate(paths['sequences'], 1):
+            yield f"  Path {i}: " + " → ".join(path) + "\n"
+
+    yield "\nReliability Expression:\n"
+    yield from iter_reliability_expression(cut_sets)
+
+
+def write_report(path, results):
+    """Write the text report of analyze() results to a file, streaming it line by line"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(iter_report(results))
+
+
+def import_edge_list(path):
+    """Build (G, components) from a CSV or JSON edge list.
+
+    Each edge has a from node, a to node, a component and optionally the
+    component's failure probability (DEFAULT_FAILURE_PROB if it is never
+    given). A component may appear on several edges, but not with two
+    different probabilities.
+    """
+    if os.path.splitext(path)[1].lower() == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)
+        if isinstance(rows, dict):
+            rows = rows.get('connections', rows.get('edges', []))
+
+    components = {}
+    connections = []
+    for line_no, row in enumerate(rows, 1):
+        try:
+            from_node, to_node, component = (str(row[key]).strip() for key in ('from', 'to', 'component'))
+        except KeyError as e:
+            raise ValueError(f"Edge {line_no} has no '{e.args[0]}' field")
+        prob = row.get('probability')
+        if prob not in (None, ''):
+            prob = float(prob)
+            if components.get(component) not in (None, prob):
+                raise ValueError(f"Component '{component}' is given two failure probabilities "
+                                 f"({components[component]} and {prob})")
+            components[component] = prob
+        else:
+            components.setdefault(component, None)
+        connections.append({'from': from_node, 'to': to_node, 'component': component})
+
+    components = {name: DEFAULT_FAILURE_PROB if prob is None else prob for name, prob in components.items()}
+    return diagram_from_dict({'components': components, 'connections': connections})
+
+
+def read_any(path):
+    """Load a project file, diagram file or edge list; returns (G, components, results)"""
+    with open(path, 'rb') as f:
+        if f.read(len(PROJECT_MAGIC)) == PROJECT_MAGIC:
+            return load_project(path)
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and 'components' in data:
+            return diagram_from_dict(data) + (None,)
+    return import_edge_list(path) + (None,)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between edge lists, diagram files and project files.")
+    parser.add_argument('input', help="project file (.rbd), diagram file (.json) or edge list (.csv or .json)")
+    parser.add_argument('-o', '--output', required=True,
+                        help="project file (.rbd), a .json diagram file with any results included, "
+                             "or a text report of the results (.txt)")
+    parser.add_argument('--analyze', action='store_true', help="run the exact analysis and save its results")
+    parser.add_argument('--max-order', type=int, help="only find cut sets up to this order")
+    args = parser.parse_args(argv)
+
+    try:
+        G, components, results = read_any(args.input)
+        if args.analyze:
+            results = analyze(G, components, max_order=args.max_order)
+        extension = os.path.splitext(args.output)[1].lower()
+        if extension == '.rbd':
+            save_project(args.output, G, components, results)
+        elif extension == '.txt':
+            if results is None:
+                raise ValueError(f"{args.input} holds no results to report; use --analyze")
+            write_report(args.output, results)
+        else:
+            data = diagram_to_dict(G, components)
+            if results is not None:
+                data['results'] = results
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, default=_jsonable)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Reliability Block Diagram layouts
+Node positions for drawing a diagram. Layouts work on the CompactGraph
+adjacency lists, so laying out a diagram of a few thousand nodes takes
+milliseconds and needs neither matplotlib nor, for the layered layout,
+networkx.
+Contents:
+---------
+* layered_layout: source on the left, sink on the right, each node in the
+  column of its longest path from the source, with edge crossings reduced
+  by barycentre sweeps
+* LayoutCache: keeps node positions between redraws, so that adding a node
+  places only that node instead of moving the whole diagram
+* draw_diagram: draws a laid out diagram on matplotlib axes, leaving out
+  labels and arrowheads on large diagrams
+"""
+import math
+
+# Layout kinds understood by LayoutCache
+LAYOUT_KINDS = ('layered', 'spring')
+
+# Level of detail: above these sizes node names, component labels and arrowheads are left out
+NODE_LABEL_LIMIT = 60
+EDGE_LABEL_LIMIT = 80
+ARROW_LIMIT = 200
+
+
+def _layers(G, source, sink):
+    """Column of every node id: its longest path from a node without predecessors"""
+    n = G.number_of_nodes()
+    adjacency = G.adjacency()
+    source_id = G.node_id.get(source)
+    sink_id = G.node_id.get(sink)
+
+    # Nodes other than the source start in column 1, so the source has its column to itself
+    depth = [1] * n
+    if source_id is not None:
+        depth[source_id] = 0
+    order = G.topological_order()
+    if order is not None:
+        for u in order:
+            for v, _ in adjacency[u]:
+                if depth[u] + 1 > depth[v]:
+                    depth[v] = depth[u] + 1
+    else:
+        # Cyclic diagram: breadth-first distance from the source and the other roots
+        has_pred = [False] * n
+        for u in range(n):
+            for v, _ in adjacency[u]:
+                has_pred[v] = True
+        frontier = [u for u in range(n) if u == source_id or not has_pred[u]]
+        seen = set(frontier)
+        while frontier:
+            next_frontier = []
+            for u in frontier:
+                for v, _ in adjacency[u]:
+                    if v not in seen:
+                        seen.add(v)
+                        depth[v] = depth[u] + 1
+                        next_frontier.append(v)
+            frontier = next_frontier
+
+    if sink_id is not None:
+        last = max((d for u, d in enumerate(depth) if u != sink_id), default=0)
+        depth[sink_id] = max(depth[sink_id], last + 1)
+    return depth
+
+
+def layered_layout(G, source='source', sink='sink', sweeps=4, previous=None):
+    """
+    Left-to-right layered layout of a CompactGraph.
+    Parameters:
+    ----------
+    G : CompactGraph
+            The diagram
+    sweeps : int
+            Forward and backward barycentre passes used to order each column
+    previous : dict or None
+            Earlier positions by node name. Nodes still in the same column keep
+            their position and only the others are placed, next to their
+            neighbours, so an edit does not reshuffle the layout
+    Returns:
+    -------
+    dict mapping node name to an (x, y) tuple: x is the column, y the row, centred on 0
+    """
+    n = G.number_of_nodes()
+    if n == 0:
+        return {}
+    names = G.nodes
+    adjacency = G.adjacency()
+    depth = _layers(G, source, sink)
+    preds = [[] for _ in range(n)]
+    for u in range(n):
+        for v, _ in adjacency[u]:
+            preds[v].append(u)
+    succs = [[v for v, _ in pairs] for pairs in adjacency]
+
+    if previous:
+        return _extend_layers(names, depth, preds, succs, previous)
+
+    columns = [[] for _ in range(max(depth) + 1)]
+    for u in range(n):
+        columns[depth[u]].append(u)
+
+    rank = [0.0] * n
+    for column in columns:
+        for i, u in enumerate(column):
+            rank[u] = i
+
+    def reorder(column, neighbours):
+        keys = {}
+        for u in column:
+            placed = neighbours[u]
+            keys[u] = sum(rank[v] for v in placed) / len(placed) if placed else rank[u]
+        column.sort(key=keys.__getitem__)
+        for i, u in enumerate(column):
+            rank[u] = i
+
+    for sweep in range(sweeps):
+        if sweep % 2 == 0:
+            for column in columns[1:]:
+                reorder(column, preds)
+        else:
+            for column in reversed(columns[:-1]):
+                reorder(column, succs)
+
+    # Unit spacing rather than scaling to a fixed box, so a new node only moves its own column
+    positions = {}
+    for x, column in enumerate(columns):
+        offset = (len(column) - 1) / 2
+        for i, u in enumerate(column):
+            positions[names[u]] = (float(x), offset - i)
+    return positions
+
+
+def _extend_layers(names, depth, preds, succs, previous):
+    """Keep the nodes whose column is unchanged and place the rest at the mean row of their neighbours"""
+    positions = {}
+    occupied = {}  # column: rows in use
+    moved = []
+    for u, name in enumerate(names):
+        if name in previous and previous[name][0] == depth[u]:
+            positions[name] = previous[name]
+            occupied.setdefault(depth[u], []).append(previous[name][1])
+        else:
+            moved.append(u)
+
+    for u in sorted(moved, key=depth.__getitem__):
+        rows = [positions[names[v]][1] for v in preds[u] + succs[u] if names[v] in positions]
+        row = round(sum(rows) / len(rows) * 2) / 2 if rows else 0.0
+        in_use = occupied.setdefault(depth[u], [])
+        for i in range(2 * len(in_use) + 1):
+            candidate = row + (i + 1) // 2 * (1 if i % 2 else -1)
+            if all(abs(candidate - other) >= 1 for other in in_use):
+                break
+        positions[names[u]] = (float(depth[u]), candidate)
+        in_use.append(candidate)
+    return positions
+
+
+class LayoutCache:
+    """
+    Node positions kept between redraws of a diagram.
+    Either layout is computed in full once; after that only the nodes that
+    are new (or, in the layered layout, have changed column) are placed,
+    next to the nodes they are connected to, and every other node stays
+    where it was.
+    Parameters:
+    ----------
+    kind : str
+            'layered' or 'spring'
+    Attributes:
+    ----------
+    positions : dict
+            Node name: (x, y) of the last layout
+    """
+    def __init__(self, kind='layered'):
+        if kind not in LAYOUT_KINDS:
+            raise ValueError(f"Unknown layout '{kind}', expected one of {', '.join(LAYOUT_KINDS)}")
+        self.kind = kind
+        self.positions = {}
+        self._floating = set()  # nodes placed before they had any placed neighbour
+        self._key = None
+
+    def reset(self):
+        """Forget all positions, so the next layout starts from scratch"""
+        self.positions = {}
+        self._floating = set()
+        self._key = None
+
+    def layout(self, G, source='source', sink='sink'):
+        """Positions for every node of G, reusing the cached ones where possible"""
+        key = (G.number_of_nodes(), G.number_of_edges())
+        if key == self._key and len(self.positions) == G.number_of_nodes():
+            return self.positions
+        self._key = key
+
+        if self.kind == 'layered':
+            self.positions = layered_layout(G, source, sink, previous=self.positions)
+        elif not self.positions:
+            self.positions = self._spring_layout(G)
+            self._floating = set()
+        else:
+            self._place_new_nodes(G)
+        return self.positions
+
+    @staticmethod
+    def _spring_layout(G):
+        """Full force-directed layout (networkx is only imported for this)"""
+        import networkx as nx
+        pos = nx.spring_layout(G.to_networkx(), seed=42)
+        return {node: (float(x), float(y)) for node, (x, y) in pos.items()}
+
+    def _place_new_nodes(self, G):
+        """Place nodes without a position, and floating nodes that now have placed neighbours"""
+        positions = {node: xy for node, xy in self.positions.items() if G.has_node(node)}
+        adjacency = G.adjacency()
+        preds = {}
+        for u, pairs in enumerate(adjacency):
+            for v, _ in pairs:
+                preds.setdefault(v, []).append(u)
+
+        xs = [x for x, _ in positions.values()] or [0.0]
+        ys = [y for _, y in positions.values()] or [0.0]
+        step = max(max(xs) - min(xs), max(ys) - min(ys), 1.0) / math.sqrt(G.number_of_nodes() + 1)
+
+        def placed(v):
+            return G.nodes[v] in positions and G.nodes[v] not in self._floating
+
+        for u, node in enumerate(G.nodes):
+            if node in positions and node not in self._floating:
+                continue
+            before = [positions[G.nodes[v]] for v in preds.get(u, []) if placed(v)]
+            after = [positions[G.nodes[v]] for v, _ in adjacency[u] if placed(v)]
+            neighbours = before + after
+            if neighbours:
+                x = sum(p[0] for p in neighbours) / len(neighbours)
+                y = sum(p[1] for p in neighbours) / len(neighbours)
+                if not after:
+                    x += step
+                elif not before:
+                    x -= step
+                self._floating.discard(node)
+            elif node in positions:
+                continue
+            else:
+                # Nothing to attach to yet: park it to the right of the diagram until it is connected
+                x, y = max(xs) + step, min(ys)
+                self._floating.add(node)
+            positions[node] = self._free_spot(positions, x, y, step, node)
+        self.positions = positions
+
+    @staticmethod
+    def _free_spot(positions, x, y, step, node):
+        """(x, y), moved up or down in half steps until no other node is closer than half a step"""
+        for i in range(50):
+            candidate_y = y + (i + 1) // 2 * step / 2 * (1 if i % 2 else -1)
+            if all(other == node or abs(px - x) >= step / 2 or abs(py - candidate_y) >= step / 2
+                   for other, (px, py) in positions.items()):
+                return (x, candidate_y)
+        return (x, y)
+
+
+def draw_diagram(ax, G, pos, source='source', sink='sink'):
+    """
+    Draw a CompactGraph on matplotlib axes at the given node positions.
+    Node size shrinks as the diagram grows, and above NODE_LABEL_LIMIT nodes,
+    EDGE_LABEL_LIMIT connections or ARROW_LIMIT connections the node names
+    (except source and sink), component labels or arrowheads are left out.
+    Arrowheads are one patch per edge, while plain edges are drawn as a
+    single line collection. networkx is imported only here.
+    """
+    import networkx as nx
+    D = G.to_networkx()
+    n_nodes = G.number_of_nodes()
+    n_edges = G.number_of_edges()
+    node_size = max(30, min(1500, 45000 // max(n_nodes, 1)))
+
+    nx.draw_networkx_nodes(D, pos, node_size=node_size, ax=ax)
+    if n_edges <= ARROW_LIMIT:
+        nx.draw_networkx_edges(D, pos, width=2, arrowsize=20, node_size=node_size, ax=ax)
+    else:
+        nx.draw_networkx_edges(D, pos, width=1, arrows=False, ax=ax)
+    if n_edges <= EDGE_LABEL_LIMIT:
+        edge_labels = {(u, v): comp for u, v, comp in G.edges()}
+        nx.draw_networkx_edge_labels(D, pos, edge_labels=edge_labels, font_size=10, ax=ax)
+    if n_nodes <= NODE_LABEL_LIMIT:
+        nx.draw_networkx_labels(D, pos, font_size=10, font_weight='bold', ax=ax)
+    else:
+        nx.draw_networkx_labels(D, pos, labels={n: n for n in (source, sink) if n in pos},
+                                font_size=10, font_weight='bold', ax=ax)
+
+    title = "Reliability Block Diagram"
+    if n_nodes > NODE_LABEL_LIMIT or n_edges > EDGE_LABEL_LIMIT:
+        title += f" ({n_nodes} nodes, {n_edges} connections; labels hidden)"
+    ax.set_title(title)
+    ax.axis('off')
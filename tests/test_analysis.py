@@ -0,0 +1,419 @@
+"""
+Brute-force cross-checks of the analysis engines.
+Small random diagrams, with shared components, k-out-of-n voting blocks and
+common-cause groups, are evaluated by enumerating every combination of
+component states; analyze(), approximate_reliability() and ReliabilitySweep
+must agree with that enumeration (or bracket it, where they only bound).
+"""
+import json
+import random
+from itertools import combinations, product
+
+import numpy as np
+import pytest
+
+from rbd_analysis import (AnalysisCache, FlowCutSearch, PathEnumeration, ReliabilitySweep, analyze,
+                          approximate_reliability, choose_cut_strategy, count_paths, diagram_from_dict,
+                          generate_reliability_expression, is_graph_cut, mask_to_names, masks_by_order,
+                          monte_carlo_diagram, monte_carlo_reliability, reliability_curves, remove_superset_masks,
+                          top_cut_sets)
+from rbd_benchmark import bridge_diagram
+
+SEEDS = range(40)
+
+
+def random_diagram(seed, voting=False, ccf=False):
+    """Dict form of a small random diagram of at most 10 basic components"""
+    rnd = random.Random(seed)
+    nodes = [f"n{i}" for i in range(rnd.randint(1, 4))]
+    everywhere = ['source'] + nodes + ['sink']
+    components = {'C0': round(rnd.uniform(0.01, 0.4), 3)}
+    connections = []
+    for _ in range(rnd.randint(3, 8)):
+        u, v = rnd.sample(everywhere, 2)
+        if u == 'sink' or v == 'source':
+            continue
+        if rnd.random() < 0.25:
+            component = rnd.choice(list(components))
+        else:
+            component = f"C{len(components)}"
+            components[component] = round(rnd.uniform(0.01, 0.4), 3)
+        connections.append({'from': u, 'to': v, 'component': component})
+    for node in nodes:
+        # Keep every node on some route, so most diagrams have several paths
+        connections.append({'from': 'source' if rnd.random() < 0.5 else nodes[0], 'to': node,
+                            'component': rnd.choice(list(components))})
+        connections.append({'from': node, 'to': 'sink', 'component': rnd.choice(list(components))})
+    unique = {}
+    for conn in connections:
+        if conn['from'] != conn['to']:
+            unique.setdefault((conn['from'], conn['to']), conn)
+    data = {'components': components, 'nodes': nodes, 'connections': list(unique.values())}
+
+    if voting:
+        members = [f"V{i}" for i in range(3)]
+        data['components'].update({m: round(rnd.uniform(0.05, 0.3), 3) for m in members})
+        data['voting'] = {'Vote': {'k': 2, 'members': members}}
+        data['connections'].append({'from': 'source', 'to': 'sink', 'component': 'Vote'}
+                                   if ('source', 'sink') not in unique else
+                                   {'from': nodes[0], 'to': 'sink', 'component': 'Vote'})
+        data['connections'] = list({(c['from'], c['to']): c for c in data['connections']}.values())
+    if ccf:
+        names = [name for name in data['components'] if not name.startswith('V')]
+        if len(names) >= 2:
+            data['ccf'] = {'Common': {'beta': 0.3, 'members': rnd.sample(names, 2)}}
+    return data
+
+
+def brute_force_unreliability(data, probs=None):
+    """System unreliability by enumerating every state of the components and common-cause events"""
+    probs = dict(data['components'], **(probs or {}))
+    voting = data.get('voting', {})
+    groups = data.get('ccf', {})
+
+    events = {}
+    independent = dict(probs)
+    for name, spec in groups.items():
+        p = spec['beta'] * min(probs[m] for m in spec['members'])
+        events[name] = p
+        for m in spec['members']:
+            independent[m] = (probs[m] - p) / (1 - p)
+
+    names = list(independent) + list(events)
+    variables = dict(independent, **events)
+    failure = 0.0
+    for state in product((False, True), repeat=len(names)):
+        failed = dict(zip(names, state))
+        weight = 1.0
+        for name in names:
+            weight *= variables[name] if failed[name] else 1 - variables[name]
+        if not weight:
+            continue
+        for name, spec in groups.items():
+            if failed[name]:
+                for m in spec['members']:
+                    failed[m] = True
+        for name, spec in voting.items():
+            failed[name] = sum(not failed[m] for m in spec['members']) < spec['k']
+
+        reached = {'source'}
+        frontier = ['source']
+        while frontier:
+            u = frontier.pop()
+            for conn in data['connections']:
+                if conn['from'] == u and not failed[conn['component']] and conn['to'] not in reached:
+                    reached.add(conn['to'])
+                    frontier.append(conn['to'])
+        if 'sink' not in reached:
+            failure += weight
+    return failure
+
+
+def brute_force_cut_sets(data, max_order=None):
+    """Minimal cut sets over the names used on connections, by trying every set of failed names"""
+    names = sorted({conn['component'] for conn in data['connections']})
+    cut_sets = []
+    for order in range(1, len(names) + 1 if max_order is None else max_order + 1):
+        for failed in combinations(names, order):
+            if any(set(cut_set) <= set(failed) for cut_set in cut_sets):
+                continue
+            reached = {'source'}
+            frontier = ['source']
+            while frontier:
+                u = frontier.pop()
+                for conn in data['connections']:
+                    if conn['from'] == u and conn['component'] not in failed and conn['to'] not in reached:
+                        reached.add(conn['to'])
+                        frontier.append(conn['to'])
+            if 'sink' not in reached:
+                cut_sets.append(failed)
+    return sorted(cut_sets)
+
+
+def ladder(rungs):
+    """Dict form of two rails with a rung between them after every step"""
+    connections = []
+    top = bottom = 'source'
+    for i in range(rungs):
+        connections += [{'from': top, 'to': f"t{i}", 'component': f"T{i}"},
+                        {'from': bottom, 'to': f"b{i}", 'component': f"B{i}"},
+                        {'from': f"t{i}", 'to': f"b{i}", 'component': f"R{i}"}]
+        top, bottom = f"t{i}", f"b{i}"
+    connections += [{'from': top, 'to': 'sink', 'component': 'T_end'},
+                    {'from': bottom, 'to': 'sink', 'component': 'B_end'}]
+    return {'components': {conn['component']: 0.05 for conn in connections},
+            'nodes': [node for i in range(rungs) for node in (f"t{i}", f"b{i}")],
+            'connections': connections}
+
+
+def diagrams(**kinds):
+    """(data, G, components, exact unreliability) of every seed whose diagram connects source to sink"""
+    for seed in SEEDS:
+        data = random_diagram(seed, **kinds)
+        unreliability = brute_force_unreliability(data)
+        if unreliability >= 1.0 - 1e-12:
+            continue
+        G, components = diagram_from_dict(data)
+        yield data, G, components, unreliability
+
+
+@pytest.mark.parametrize('kinds', [{}, {'voting': True}, {'ccf': True}, {'voting': True, 'ccf': True}])
+def test_analyze_matches_brute_force(kinds):
+    checked = 0
+    for data, G, components, exact in diagrams(**kinds):
+        for strategy in ('paths', 'flow'):
+            results = analyze(G, components, cut_strategy=strategy)
+            assert results['unreliability'] == pytest.approx(exact, abs=1e-12)
+            assert results['exact']
+        checked += 1
+    assert checked >= 10
+
+
+def test_path_enumeration_streams_every_path():
+    data = ladder(6)
+    G, _ = diagram_from_dict(data)
+    paths = PathEnumeration(G, keep_sequences=5)
+    assert paths.complete and paths.stop_reason is None
+    assert paths.count == count_paths(G) == 8
+    assert len(set(paths.masks)) == len(paths.masks) == paths.count
+    assert len(paths.sequences) == 5
+    for sequence in paths.sequences:
+        # Every kept path really connects: failing all other components leaves it working
+        assert not is_graph_cut(G, set(data['components']) - set(sequence))
+
+
+@pytest.mark.parametrize('limits, reason', [({'max_paths': 3}, "path limit"), ({'max_memory_mb': 1e-4}, "memory limit")])
+def test_path_enumeration_limits(limits, reason):
+    G, components = diagram_from_dict(ladder(12))
+    paths = PathEnumeration(G, **limits)
+    assert not paths.complete and reason in paths.stop_reason
+    assert 0 < paths.count < count_paths(G)
+    if 'max_paths' in limits:
+        assert paths.count == limits['max_paths']
+    results = analyze(G, components, cut_strategy='paths', **limits)
+    assert not results['exact'] and not results['paths']['complete']
+    assert results['reliability_lower'] <= results['reliability_upper']
+
+
+@pytest.mark.parametrize('max_order', [None, 1, 2])
+@pytest.mark.parametrize('strategy', ['paths', 'flow'])
+def test_cut_sets_are_over_original_components(max_order, strategy):
+    for data, G, components, exact in diagrams(voting=True):
+        results = analyze(G, components, max_order=max_order, cut_strategy=strategy)
+        expected = brute_force_cut_sets(data, max_order)
+        assert sorted(tuple(sorted(cut_set)) for cut_set in results['cut_sets']) == expected
+        orders = {}
+        for cut_set in expected:
+            orders[str(len(cut_set))] = orders.get(str(len(cut_set)), 0) + 1
+        assert results['cut_set_orders'] == dict(sorted(orders.items()))
+
+
+def test_parallel_series_branches_have_no_single_point_of_failure():
+    data = {'components': {'A': 0.1, 'B': 0.1, 'C': 0.1, 'D': 0.1},
+            'nodes': ['n1', 'n2'],
+            'connections': [{'from': 'source', 'to': 'n1', 'component': 'A'},
+                            {'from': 'n1', 'to': 'sink', 'component': 'B'},
+                            {'from': 'source', 'to': 'n2', 'component': 'C'},
+                            {'from': 'n2', 'to': 'sink', 'component': 'D'}]}
+    G, components = diagram_from_dict(data)
+    found = []
+    results = analyze(G, components, on_order=lambda order, cut_sets, probs: found.append((order, cut_sets)))
+    assert sorted(sorted(cut_set) for cut_set in results['cut_sets']) == [['A', 'C'], ['A', 'D'], ['B', 'C'],
+                                                                          ['B', 'D']]
+    assert results['cut_set_probs'] == pytest.approx([0.01] * 4)
+    assert results['cut_set_orders'] == {'2': 4}
+    assert [order for order, _ in found] == [2]
+    assert sorted(sorted(cut_set) for cut_set in found[0][1]) == [['A', 'C'], ['A', 'D'], ['B', 'C'], ['B', 'D']]
+
+
+@pytest.mark.parametrize('kinds', [{}, {'voting': True, 'ccf': True}])
+def test_analyze_bounds_bracket_brute_force(kinds):
+    for data, G, components, exact in diagrams(**kinds):
+        reliability = 1 - exact
+        capped = analyze(G, components, max_order=1)
+        assert capped['reliability_lower'] - 1e-12 <= reliability <= capped['reliability_upper'] + 1e-12
+        partial = analyze(G, components, max_paths=1)
+        assert partial['reliability_lower'] - 1e-12 <= reliability <= partial['reliability_upper'] + 1e-12
+
+
+def test_birnbaum_importance_matches_brute_force():
+    for data, G, components, exact in diagrams():
+        importance = analyze(G, components)['importance']
+        for name, imp in importance.items():
+            if name not in data['components']:
+                continue
+            expected = (brute_force_unreliability(data, {name: 1.0})
+                        - brute_force_unreliability(data, {name: 0.0}))
+            assert imp['birnbaum'] == pytest.approx(expected, abs=1e-10)
+
+
+@pytest.mark.parametrize('kinds', [{}, {'voting': True}, {'ccf': True}])
+def test_approximate_reliability_brackets_brute_force(kinds):
+    for data, G, components, exact in diagrams(**kinds):
+        for options in ({}, {'max_order': 2}, {'max_paths': 2}, {'cut_strategy': 'flow'}):
+            bounds = approximate_reliability(G, components, **options)
+            assert bounds['unreliability_lower'] - 1e-12 <= exact <= bounds['unreliability_upper'] + 1e-12
+            json.dumps(bounds)  # plain numbers only
+
+
+@pytest.mark.parametrize('kinds', [{}, {'voting': True}, {'ccf': True}])
+def test_sweep_matches_brute_force(kinds):
+    rnd = random.Random(1)
+    for data, G, components, exact in diagrams(**kinds):
+        sweep = ReliabilitySweep(G)
+        vectors = [{name: rnd.uniform(0.0, 0.5) for name in data['components']} for _ in range(3)]
+        reliability = sweep.reliability({name: np.array([v[name] for v in vectors]) for name in data['components']})
+        for value, probs in zip(reliability, vectors):
+            assert value == pytest.approx(1 - brute_force_unreliability(data, probs), abs=1e-12)
+
+
+@pytest.mark.parametrize('kinds', [{}, {'voting': True, 'ccf': True}])
+def test_monte_carlo_interval_covers_brute_force(kinds):
+    for data, G, components, exact in list(diagrams(**kinds))[:8]:
+        estimate = monte_carlo_diagram(G, components, seed=5, batch_size=20000, target_rel_error=0.05)
+        assert estimate['converged']
+        assert estimate['ci_low'] - 1e-3 <= 1 - exact <= estimate['ci_high'] + 1e-3
+        assert estimate == dict(monte_carlo_diagram(G, components, seed=5, batch_size=20000, target_rel_error=0.05),
+                                samples_per_sec=estimate['samples_per_sec'])
+
+
+def test_monte_carlo_sample_budget():
+    G, components = diagram_from_dict(random_diagram(0))
+    short = monte_carlo_reliability(G, components, seed=1, max_samples=10, target_rel_error=1e-6)
+    assert short['samples'] == 10 and not short['converged']
+    with pytest.raises(ValueError, match="max_samples"):
+        monte_carlo_reliability(G, components, max_samples=0)
+    with pytest.raises(ValueError, match="batch_size"):
+        monte_carlo_reliability(G, components, batch_size=0)
+
+
+def test_sweep_with_common_cause_member_in_unused_voting_block():
+    data = {'components': {'A': 0.05, 'B': 0.1, 'V1': 0.2, 'V2': 0.2, 'V3': 0.2},
+            'connections': [{'from': 'source', 'to': 'sink', 'component': 'A'}],
+            'voting': {'Vote': {'k': 2, 'members': ['V1', 'V2', 'V3']}},
+            'ccf': {'Common': {'beta': 0.5, 'members': ['A', 'V1']}}}
+    G, components = diagram_from_dict(data)
+    assert ReliabilitySweep(G).reliability(components)[0] == pytest.approx(0.95)
+    curves = reliability_curves(G, components, {'A': {'kind': 'exponential', 'rate': 0.01}})
+    assert curves['mttf'] > 0
+
+
+def test_remove_superset_masks_kernel_matches_pairwise_loop():
+    rnd = random.Random(3)
+    for width, count in ((20, 500), (90, 2000)):
+        masks = [rnd.getrandbits(width) & rnd.getrandbits(width) & rnd.getrandbits(width) for _ in range(count)]
+        expected = []
+        for mask in sorted(set(masks), key=lambda m: (m.bit_count(), m)):
+            if not any(mask & other == other for other in expected):
+                expected.append(mask)
+        assert remove_superset_masks(masks) == expected
+
+
+def test_top_cut_sets():
+    probs = [0.1, 0.3, 0.2, 0.3, 0.05]
+    assert top_cut_sets(probs, 2) == [1, 3]
+    assert top_cut_sets(probs, 10) == [1, 3, 2, 0, 4]
+    assert top_cut_sets(probs, 0) == []
+    assert top_cut_sets(np.array(probs), 3) == [1, 3, 2]
+
+
+def test_reliability_expression_limit():
+    cut_sets = [['A'], ['B', 'C']] + [[f"D{i}", f"E{i}"] for i in range(1000)]
+    full = generate_reliability_expression(cut_sets)
+    assert "C1 ∪ C2 ∪ C3 ∪ C4" in full and "Where C1002 = qD999 × qE999" in full
+    short = generate_reliability_expression(cut_sets, limit=2)
+    assert "= 1 - P(C1 ∪ C2 ∪ ... ∪ C1002)" in short
+    assert "Where C2 = qB × qC" in short and "C3 =" not in short
+    assert "... and 1000 more cut sets" in short
+    assert generate_reliability_expression(cut_sets[:2], limit=5) == generate_reliability_expression(cut_sets[:2])
+
+
+def test_cached_results_follow_voting_member_probabilities():
+    data = {'components': {'A': 0.01, 'P1': 0.1, 'P2': 0.3, 'P3': 0.2},
+            'nodes': ['n1'],
+            'connections': [{'from': 'source', 'to': 'n1', 'component': 'A'},
+                            {'from': 'n1', 'to': 'sink', 'component': 'Pumps'}],
+            'voting': {'Pumps': {'k': 2, 'members': ['P1', 'P2', 'P3']}}}
+    cache = AnalysisCache()
+    G, components = diagram_from_dict(data)
+    analyze(G, components, cache=cache)
+    # Swapping two members leaves the block's q unchanged, but not their importances
+    data['components'].update(P1=0.3, P2=0.1)
+    G, components = diagram_from_dict(data)
+    cached = analyze(G, components, cache=cache)
+    fresh = analyze(G, components)
+    assert cached['unreliability'] == pytest.approx(fresh['unreliability'])
+    for name in ('P1', 'P2', 'P3'):
+        assert cached['importance'][name]['birnbaum'] == pytest.approx(fresh['importance'][name]['birnbaum'])
+
+
+def test_analysis_cache_reuses_unchanged_segments():
+    # Two bridges in series, joined at n3: one segment each
+    data = {'components': {f"C{i}": 0.01 * (i + 1) for i in range(10)},
+            'nodes': ['n1', 'n2', 'n3', 'n4', 'n5'],
+            'connections': [{'from': u, 'to': v, 'component': f"C{i}"} for i, (u, v) in enumerate(
+                [('source', 'n1'), ('source', 'n2'), ('n1', 'n2'), ('n1', 'n3'), ('n2', 'n3'),
+                 ('n3', 'n4'), ('n3', 'n5'), ('n4', 'n5'), ('n4', 'sink'), ('n5', 'sink')])]}
+    cache = AnalysisCache()
+
+    def run():
+        results = analyze(*diagram_from_dict(data), cache=cache)
+        assert results['unreliability'] == pytest.approx(brute_force_unreliability(data))
+        return results['cache']
+
+    assert run() == {'structure_hits': 0, 'structure_misses': 2, 'result_hits': 0, 'result_misses': 1,
+                     'evictions': 0}
+    assert run()['result_hits'] == 1
+    # A probability-only change misses the results but reuses both structures
+    data['components']['C0'] = 0.2
+    stats = run()
+    assert (stats['result_misses'], stats['structure_hits'], stats['structure_misses']) == (2, 2, 2)
+    # Rewiring the second bridge only re-enumerates that segment
+    data['connections'][7] = {'from': 'n5', 'to': 'n4', 'component': 'C7'}
+    stats = run()
+    assert (stats['result_misses'], stats['structure_hits'], stats['structure_misses']) == (3, 3, 3)
+
+
+def test_analysis_cache_evicts_least_recently_used():
+    cache = AnalysisCache(maxsize=1)
+    built = []
+    for key in ('a', 'b', 'a'):
+        cache.structure(key, lambda: built.append(key) or key)
+    assert built == ['a', 'b', 'a']
+    assert cache.structure('a', lambda: None) == 'a'
+    assert cache.stats['evictions'] == 2
+    cache.store_result('r', {'reliability': 1.0})
+    assert cache.result('r') == {'reliability': 1.0}
+    cache.clear()
+    assert cache.result('r') is None
+
+
+def test_flow_search_matches_the_paths_on_a_lattice():
+    G, components = bridge_diagram(4)
+    by_paths = analyze(G, components, cut_strategy='paths')
+    by_flow = analyze(G, components, cut_strategy='flow')
+    assert by_flow['cut_strategy'][0]['strategy'] == 'flow' and by_flow['paths']['count'] is None
+    assert sorted(map(sorted, by_flow['cut_sets'])) == sorted(map(sorted, by_paths['cut_sets']))
+    assert by_flow['unreliability'] == pytest.approx(by_paths['unreliability'])
+
+    search = FlowCutSearch(G)
+    stats = {}
+    capped = search.cut_set_masks(max_order=4, stats=stats)
+    assert stats['max_flow_bounds'] > 0
+    assert sorted(sorted(mask_to_names(mask, search.names)) for mask in capped) == sorted(
+        sorted(cut) for cut in by_paths['cut_sets'] if len(cut) <= 4)
+    by_order = [(order, masks) for order, masks in search.iter_cut_set_orders(max_order=4) if masks]
+    assert by_order == masks_by_order(capped)
+
+
+def test_auto_cut_strategy():
+    G = bridge_diagram(3)[0]  # 15 paths
+    assert choose_cut_strategy(G)[0] == 'paths'
+    assert choose_cut_strategy(G, max_paths=10) == ('flow', "15 paths, too many to enumerate: cut sets "
+                                                            "searched with max-flow bounds")
+    assert choose_cut_strategy(G, max_paths=10, strategy='paths') == ('paths', "requested")
+    G.add_edge('r1c1', 'r0c1', 'Back')
+    assert choose_cut_strategy(G)[0] == 'paths'
+    assert choose_cut_strategy(G, max_order=2)[0] == 'flow'
+    with pytest.raises(ValueError, match="Unknown cut set strategy 'bdd'"):
+        choose_cut_strategy(G, strategy='bdd')
@@ -0,0 +1,62 @@
+"""
+The batch runner (rbd_batch): results, per-diagram errors and time limits.
+"""
+import json
+
+import pytest
+
+from rbd_analysis import analyze, diagram_from_dict, diagram_to_dict
+from rbd_batch import iter_diagrams, main, run_batch
+from rbd_benchmark import bridge_diagram
+
+SERIES = {'components': {'A': 0.1, 'B': 0.2},
+          'nodes': ['n1'],
+          'connections': [{'from': 'source', 'to': 'n1', 'component': 'A'},
+                          {'from': 'n1', 'to': 'sink', 'component': 'B'}]}
+
+
+def test_iter_diagrams(tmp_path):
+    lines = tmp_path / 'diagrams.jsonl'
+    lines.write_text(json.dumps(dict(SERIES, id='first')) + "\n\n{not json\n" + json.dumps(SERIES) + "\n",
+                     encoding='utf-8')
+    assert [(diagram_id, type(data)) for diagram_id, data in iter_diagrams(str(lines))] == [
+        ('first', dict), ('3', str), ('4', dict)]
+
+    folder = tmp_path / 'diagrams'
+    folder.mkdir()
+    (folder / 'b.json').write_text(json.dumps(SERIES), encoding='utf-8')
+    (folder / 'a.json').write_text(json.dumps(SERIES), encoding='utf-8')
+    (folder / 'notes.txt').write_text("skipped", encoding='utf-8')
+    assert [diagram_id for diagram_id, _ in iter_diagrams(str(folder))] == ['a', 'b']
+
+
+def test_results_and_errors_per_diagram():
+    tasks = [('good', SERIES), ('text', json.dumps(SERIES)), ('malformed', "{not json"),
+             ('invalid', {'components': {'A': 2.0}})]
+    records = {record['id']: record for record in run_batch(tasks, workers=2)}
+    expected = analyze(*diagram_from_dict(SERIES))['reliability']
+    for diagram_id in ('good', 'text'):
+        assert records[diagram_id]['status'] == 'ok'
+        assert records[diagram_id]['results']['reliability'] == pytest.approx(expected)
+    assert records['malformed']['status'] == 'error'
+    assert records['invalid']['status'] == 'error'
+    assert "Invalid probability" in records['invalid']['error']
+
+
+def test_timeout_replaces_the_worker():
+    slow = diagram_to_dict(*bridge_diagram(7))
+    tasks = [('slow', slow)] + [(f"quick{i}", SERIES) for i in range(3)]
+    records = {record['id']: record for record in run_batch(tasks, workers=1, timeout=1.0, cut_strategy='paths')}
+    assert records['slow']['status'] == 'timeout'
+    assert records['slow']['seconds'] < 10
+    assert all(records[f"quick{i}"]['status'] == 'ok' for i in range(3))
+
+
+def test_command_line(tmp_path, capsys):
+    lines = tmp_path / 'diagrams.jsonl'
+    lines.write_text(json.dumps(SERIES) + "\n{not json\n", encoding='utf-8')
+    out = tmp_path / 'results.jsonl'
+    assert main([str(lines), '-o', str(out), '-j', '1', '--max-order', '2']) == 0
+    records = [json.loads(line) for line in out.read_text(encoding='utf-8').splitlines()]
+    assert sorted(record['status'] for record in records) == ['error', 'ok']
+    assert "1 error, 1 ok" in capsys.readouterr().err
@@ -0,0 +1,80 @@
+"""
+The rbd_analysis command line: every mode writes its results as JSON.
+"""
+import json
+
+import pytest
+
+import rbd_analysis
+from rbd_analysis import analyze, diagram_from_dict
+
+DIAGRAM = {
+    'components': {'A': 0.1, 'B': 0.2, 'C': 0.05},
+    'nodes': ['n1'],
+    'connections': [{'from': 'source', 'to': 'n1', 'component': 'A'},
+                    {'from': 'n1', 'to': 'sink', 'component': 'B'},
+                    {'from': 'source', 'to': 'sink', 'component': 'C'}],
+    'lifetimes': {'A': {'kind': 'exponential', 'rate': 0.01}},
+}
+
+
+@pytest.fixture
+def diagram(tmp_path):
+    path = tmp_path / 'diagram.json'
+    path.write_text(json.dumps(DIAGRAM), encoding='utf-8')
+    return str(path)
+
+
+def run(*argv):
+    """Exit code of rbd_analysis.main, run quietly"""
+    return rbd_analysis.main(list(argv) + ['-q'])
+
+
+def test_analysis_to_stdout(diagram, capsys):
+    assert run(diagram) == 0
+    results = json.loads(capsys.readouterr().out)
+    expected = analyze(*diagram_from_dict(DIAGRAM))
+    assert results['reliability'] == pytest.approx(expected['reliability'])
+    assert results['cut_sets'] == expected['cut_sets']
+
+
+def test_analysis_to_file_with_profile(diagram, tmp_path):
+    out = tmp_path / 'results.json'
+    assert run(diagram, '-o', str(out), '--max-order', '1', '--profile') == 0
+    results = json.loads(out.read_text(encoding='utf-8'))
+    assert results['cut_sets'] == [] and not results['exact']
+    assert {stage['stage'] for stage in results['profile']['stages']} >= {'paths', 'cut_sets', 'bdd'}
+
+
+@pytest.mark.parametrize('mode', [['--approximate'], ['--monte-carlo', '--seed', '3', '--target-rel-error', '0.05'],
+                                  ['--curve', '--points', '50']])
+def test_other_modes(diagram, capsys, mode):
+    assert run(diagram, *mode) == 0
+    results = json.loads(capsys.readouterr().out)
+    exact = analyze(*diagram_from_dict(DIAGRAM))['reliability']
+    if '--approximate' in mode:
+        assert results['reliability_lower'] <= exact <= results['reliability_upper']
+    elif '--monte-carlo' in mode:
+        assert results['ci_low'] <= exact <= results['ci_high']
+    else:
+        # Only A ages, so R(0) is the reliability with A working, and R(t) only falls from there
+        curve = results['reliability']
+        assert len(curve) == 50 and curve[0] == pytest.approx(1 - 0.2 * 0.05)
+        assert all(later <= earlier for earlier, later in zip(curve, curve[1:]))
+
+
+def test_sweep(diagram, tmp_path, capsys):
+    table = tmp_path / 'sweep.csv'
+    table.write_text("A,B,C\n0.1,0.2,0.05\n0,0,1\n1,1,0\n", encoding='utf-8')
+    assert run(diagram, '--sweep', str(table)) == 0
+    results = json.loads(capsys.readouterr().out)
+    exact = analyze(*diagram_from_dict(DIAGRAM))['reliability']
+    assert results['reliability'] == pytest.approx([exact, 1.0, 1.0])
+
+
+def test_errors_exit_with_status_one(tmp_path, capsys):
+    assert run(str(tmp_path / 'missing.json')) == 1
+    bad = tmp_path / 'bad.json'
+    bad.write_text(json.dumps({'components': {'A': 2.0}}), encoding='utf-8')
+    assert run(str(bad)) == 1
+    assert "Invalid probability for component 'A'" in capsys.readouterr().err
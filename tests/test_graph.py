@@ -0,0 +1,90 @@
+"""
+The CompactGraph diagram store and its conversions to networkx and the dict form.
+"""
+import networkx as nx
+import numpy as np
+import pytest
+
+from rbd_analysis import CompactGraph, analyze, as_compact, diagram_from_dict, diagram_to_dict
+
+DIAGRAM = {
+    'components': {'A': 0.1, 'B': 0.2, 'P1': 0.05, 'P2': 0.05, 'P3': 0.1},
+    'nodes': ['n1', 'n2'],
+    'connections': [{'from': 'source', 'to': 'n1', 'component': 'A'},
+                    {'from': 'source', 'to': 'n2', 'component': 'B'},
+                    {'from': 'n1', 'to': 'n2', 'component': 'A'},
+                    {'from': 'n2', 'to': 'sink', 'component': 'Pumps'}],
+    'lifetimes': {'A': {'kind': 'exponential', 'rate': 0.01}},
+    'voting': {'Pumps': {'k': 2, 'members': ['P1', 'P2', 'P3']}},
+    'ccf': {'Common': {'beta': 0.2, 'members': ['P1', 'P2']}},
+}
+
+
+def test_names_are_interned():
+    G = CompactGraph()
+    G.add_edge('source', 'n1', 'A')
+    G.add_edge('n1', 'sink', 'A')
+    G.add_edge('source', 'sink', 'B')
+    assert G.nodes == ['source', 'n1', 'sink'] and G.components == ['A', 'B']
+    assert list(G.edge_ids()) == [(0, 1, 0), (1, 2, 0), (0, 2, 1)]
+    assert G.component_uses().tolist() == [2, 1]
+    assert G.has_edge('n1', 'sink') and not G.has_edge('sink', 'n1') and not G.has_edge('x', 'sink')
+    # A second connection between the same nodes replaces the component
+    G.add_edge('source', 'sink', 'C')
+    assert G.number_of_edges() == 3 and list(G.edges())[2] == ('source', 'sink', 'C')
+
+
+def test_adjacency_is_rebuilt_after_an_edit():
+    G = CompactGraph.from_edges([('source', 'n1', 'A'), ('n1', 'sink', 'B')])
+    indptr, targets, comps = G.csr()
+    assert indptr.tolist() == [0, 1, 2, 2] and targets.tolist() == [1, 2] and comps.tolist() == [0, 1]
+    assert G.topological_order() == [0, 1, 2]
+    G.add_edge('sink', 'source', 'C')
+    assert G.adjacency()[2] == [(0, 2)]
+    assert G.topological_order() is None
+
+
+def test_probabilities():
+    G = CompactGraph.from_edges([('source', 'sink', 'A')], {'A': 0.3, 'B': 0.4})
+    changed = G.with_probabilities({'A': 0.5, 'unused': 1.0})
+    np.testing.assert_array_equal(G.prob, [0.3, 0.4])
+    np.testing.assert_array_equal(changed.prob, [0.5, 0.4])
+    assert as_compact(G) is G
+    np.testing.assert_array_equal(as_compact(G, {'B': 0.1}).prob, [0.3, 0.1])
+
+
+def test_networkx_round_trip():
+    G, components = diagram_from_dict(DIAGRAM)
+    nxG = G.to_networkx()
+    assert isinstance(nxG, nx.DiGraph)
+    assert nxG.edges['n2', 'sink']['component'] == 'Pumps'
+    assert nxG.edges['source', 'n1']['failure_prob'] == 0.1
+    back = as_compact(nxG)
+    assert list(back.edges()) == list(G.edges())
+    # Voting members are on no connection, so only the diagram-level data carries them
+    assert dict(zip(back.components, back.prob)) == {'A': 0.1, 'B': 0.2, 'Pumps': G.prob[G.component_id['Pumps']]}
+    assert back.graph['voting'] == G.graph['voting']
+    assert analyze(nxG, components)['reliability'] == pytest.approx(analyze(G, components)['reliability'])
+
+
+def test_dict_round_trip():
+    G, components = diagram_from_dict(DIAGRAM)
+    data = diagram_to_dict(G, components)
+    assert data['components'] == DIAGRAM['components']
+    assert sorted(map(str, data['connections'])) == sorted(map(str, DIAGRAM['connections']))
+    for key in ('lifetimes', 'voting', 'ccf'):
+        assert data[key].keys() == DIAGRAM[key].keys()
+    G2, components2 = diagram_from_dict(data)
+    assert diagram_to_dict(G2, components2) == data
+    assert components2 == components
+
+
+@pytest.mark.parametrize('change, message', [
+    ({'components': {'A': -0.1}}, "Invalid probability"),
+    ({'connections': [{'from': 'source', 'to': 'sink', 'component': 'Z'}]}, "unknown component 'Z'"),
+    ({'connections': [{'from': 'n1', 'to': 'n1', 'component': 'A'}]}, "to itself"),
+    ({'connections': DIAGRAM['connections'][:1] * 2}, "already exists"),
+])
+def test_invalid_diagrams(change, message):
+    with pytest.raises(ValueError, match=message):
+        diagram_from_dict(dict(DIAGRAM, **change))
@@ -0,0 +1,126 @@
+"""
+Project files, edge list import and text reports (rbd_io).
+"""
+import json
+
+import numpy as np
+import pytest
+
+from rbd_analysis import DEFAULT_FAILURE_PROB, analyze, diagram_from_dict, diagram_to_dict
+from rbd_benchmark import k_out_of_n_diagram
+from rbd_io import (REPORT_TOP_CUT_SETS, PackedNameLists, import_edge_list, iter_report, load_project, main,
+                    save_project, write_report)
+
+BRIDGE = {
+    'components': {'A': 1e-4, 'B': 2e-3, 'C': 0.01, 'D': 0.02, 'E': 0.05},
+    'nodes': ['n1', 'n2'],
+    'connections': [{'from': 'source', 'to': 'n1', 'component': 'A'},
+                    {'from': 'source', 'to': 'n2', 'component': 'B'},
+                    {'from': 'n1', 'to': 'n2', 'component': 'E'},
+                    {'from': 'n1', 'to': 'sink', 'component': 'C'},
+                    {'from': 'n2', 'to': 'sink', 'component': 'D'}],
+}
+
+
+@pytest.fixture
+def bridge():
+    G, components = diagram_from_dict(BRIDGE)
+    return G, components, analyze(G, components)
+
+
+def assert_same_results(loaded, results):
+    assert [list(c) for c in loaded['cut_sets']] == results['cut_sets']
+    np.testing.assert_array_equal(loaded['cut_set_probs'], results['cut_set_probs'])
+    assert [list(p) for p in loaded['paths']['sequences']] == results['paths']['sequences']
+    assert loaded['reliability'] == results['reliability']
+    assert loaded['importance'] == results['importance']
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_project_round_trip(tmp_path, bridge, mmap):
+    G, components, results = bridge
+    path = tmp_path / 'bridge.rbd'
+    save_project(path, G, components, results)
+    G2, components2, loaded = load_project(path, mmap=mmap)
+    assert components2 == components
+    assert diagram_to_dict(G2, components2) == diagram_to_dict(G, components)
+    if mmap:
+        assert isinstance(loaded['cut_sets'], PackedNameLists)
+    assert_same_results(loaded, results)
+
+
+def test_project_without_results(tmp_path, bridge):
+    G, components, _ = bridge
+    save_project(tmp_path / 'bridge.rbd', G, components)
+    assert load_project(tmp_path / 'bridge.rbd')[2] is None
+
+
+def test_project_saved_over_the_file_it_was_loaded_from(tmp_path, bridge):
+    G, components, results = bridge
+    path = tmp_path / 'bridge.rbd'
+    save_project(path, G, components, results)
+    G2, components2, loaded = load_project(path)
+    save_project(path, G2, components2, loaded)
+    assert_same_results(load_project(path)[2], results)
+    assert [p.name for p in tmp_path.iterdir()] == ['bridge.rbd']
+
+
+def test_edge_list_import(tmp_path):
+    path = tmp_path / 'edges.csv'
+    path.write_text("from,to,component,probability\n"
+                    "source,n1,A,0.1\n"
+                    "n1,sink,B,\n"
+                    "source,sink,A,0.1\n", encoding='utf-8')
+    G, components = import_edge_list(str(path))
+    assert components == {'A': 0.1, 'B': DEFAULT_FAILURE_PROB}
+    assert G.number_of_edges() == 3
+
+
+def test_edge_list_with_conflicting_probabilities(tmp_path):
+    path = tmp_path / 'edges.json'
+    path.write_text('[{"from": "source", "to": "n1", "component": "A", "probability": 0.1},'
+                    ' {"from": "n1", "to": "sink", "component": "A", "probability": 0.2}]', encoding='utf-8')
+    with pytest.raises(ValueError, match="two failure probabilities"):
+        import_edge_list(str(path))
+
+
+def test_report_lists_every_cut_set(tmp_path, bridge):
+    G, components, results = bridge
+    save_project(tmp_path / 'bridge.rbd', G, components, results)
+    report = "".join(iter_report(load_project(tmp_path / 'bridge.rbd')[2]))
+    assert f"System Reliability: {results['reliability']:.12f}" in report
+    assert report.count("Cut Set ") == 2 * len(results['cut_sets'])
+
+
+
+def test_report_of_a_large_loaded_project(tmp_path):
+    G, components = k_out_of_n_diagram(9)  # 126 cut sets of order 5
+    results = analyze(G, components)
+    save_project(tmp_path / 'vote.rbd', G, components, results)
+    loaded = load_project(tmp_path / 'vote.rbd')[2]
+    write_report(tmp_path / 'report.txt', loaded)
+    text = (tmp_path / 'report.txt').read_text(encoding='utf-8')
+    assert text == "".join(iter_report(results))
+    top = text.split("Most Probable Cut Sets")[1].split("All Minimal Cut Sets")[0]
+    assert top.count("Cut Set ") == REPORT_TOP_CUT_SETS
+    assert text.count("Cut Set ") == REPORT_TOP_CUT_SETS + 126
+
+
+def test_command_line(tmp_path, capsys):
+    diagram = tmp_path / 'bridge.json'
+    diagram.write_text(json.dumps(BRIDGE), encoding='utf-8')
+    project = tmp_path / 'bridge.rbd'
+    assert main([str(diagram), '-o', str(project), '--analyze']) == 0
+    results = analyze(*diagram_from_dict(BRIDGE))
+    assert_same_results(load_project(project)[2], results)
+
+    report = tmp_path / 'report.txt'
+    assert main([str(project), '-o', str(report)]) == 0
+    assert report.read_text(encoding='utf-8') == "".join(iter_report(results))
+    exported = tmp_path / 'exported.json'
+    assert main([str(project), '-o', str(exported)]) == 0
+    data = json.loads(exported.read_text(encoding='utf-8'))
+    assert data['results']['cut_sets'] == results['cut_sets'] and data['components'] == BRIDGE['components']
+
+    assert main([str(diagram), '-o', str(report)]) == 1
+    assert "holds no results to report; use --analyze" in capsys.readouterr().err
@@ -0,0 +1,74 @@
+"""
+Diagram layouts (rbd_layout): columns, stable positions between edits and drawing.
+"""
+import pytest
+
+from rbd_analysis import CompactGraph
+from rbd_benchmark import ladder_diagram
+from rbd_layout import NODE_LABEL_LIMIT, LayoutCache, draw_diagram, layered_layout
+
+
+def bridge():
+    return CompactGraph.from_edges([('source', 'n1', 'A'), ('source', 'n2', 'B'), ('n1', 'n2', 'E'),
+                                    ('n1', 'sink', 'C'), ('n2', 'sink', 'D')])
+
+
+def test_layered_columns():
+    pos = layered_layout(bridge())
+    assert {node: x for node, (x, _) in pos.items()} == {'source': 0, 'n1': 1, 'n2': 2, 'sink': 3}
+    # A cycle falls back to breadth-first columns
+    G = bridge()
+    G.add_edge('n2', 'n1', 'F')
+    assert {node: x for node, (x, _) in layered_layout(G).items()} == {'source': 0, 'n1': 1, 'n2': 1, 'sink': 2}
+
+
+@pytest.mark.parametrize('kind', ['layered', 'spring'])
+def test_cache_keeps_positions_of_unchanged_nodes(kind):
+    G = bridge()
+    cache = LayoutCache(kind)
+    first = dict(cache.layout(G))
+    assert cache.layout(G) is cache.positions
+    assert cache.layout(G) == first
+
+    # A new parallel branch from n1 only places the new node
+    G.add_edge('n1', 'n3', 'F')
+    G.add_edge('n3', 'sink', 'G')
+    second = cache.layout(G)
+    assert set(second) == set(first) | {'n3'}
+    assert all(second[node] == first[node] for node in first)
+    assert all(second['n3'] != xy for node, xy in second.items() if node != 'n3')
+
+    cache.reset()
+    assert cache.positions == {} and set(cache.layout(G)) == set(second)
+
+
+def test_spring_cache_parks_unconnected_nodes():
+    G = bridge()
+    cache = LayoutCache('spring')
+    cache.layout(G)
+    G.add_node('loose')
+    parked = cache.layout(G)['loose']
+    assert parked[0] > max(x for node, (x, _) in cache.positions.items() if node != 'loose')
+    # Once connected it moves next to its neighbours
+    G.add_edge('n1', 'loose', 'F')
+    assert cache.layout(G)['loose'] != parked
+
+
+def test_unknown_layout():
+    with pytest.raises(ValueError, match="Unknown layout 'circle'"):
+        LayoutCache('circle')
+
+
+def test_large_diagrams_are_drawn_without_labels():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    G = ladder_diagram(NODE_LABEL_LIMIT)[0]
+    fig, ax = plt.subplots()
+    try:
+        draw_diagram(ax, G, LayoutCache().layout(G))
+        assert "labels hidden" in ax.get_title()
+        assert {text.get_text() for text in ax.texts} == {'source', 'sink'}
+    finally:
+        plt.close(fig)